@@ -1,6 +1,9 @@
 from fastapi import APIRouter, HTTPException
+from app.core.config import settings
 from app.schemas.astro import BirthDataRequest, AstroResponse
 from app.services.astro_service import astro_service
+from app.services.deadline import request_deadline
+from app.services.raw_data_store import raw_data_store
 
 router = APIRouter()
 
@@ -10,13 +13,31 @@ async def get_birth_chart(birth_data: BirthDataRequest):
     Get birth chart data from Astro API
     """
     try:
-        chart_data = await astro_service.get_birth_chart(birth_data)
+        with request_deadline(settings.DEADLINE_BIRTH_CHART_SECONDS):
+            chart_data = await astro_service.get_birth_chart(birth_data)
         if not chart_data:
             raise HTTPException(status_code=400, detail="Unable to generate birth chart")
         return chart_data
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating birth chart: {str(e)}")
 
+@router.get("/raw/{ref}")
+async def get_raw_data(ref: str):
+    """
+    Full upstream payload for a chart whose raw_data was stored out-of-line
+    """
+    payload = await raw_data_store.get(ref)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Raw data not found")
+    return payload
+
+@router.get("/stats")
+async def astro_stats():
+    """Chart cache and provider statistics"""
+    return astro_service.get_stats()
+
 @router.get("/health")
 async def astro_health():
     """Health check for astro service"""
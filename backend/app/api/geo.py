@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.schemas.geo import PlaceSearchResponse, ResolveRequest, ResolveResponse, TimezoneResponse
+from app.services.geo_service import geo_service
+
+router = APIRouter()
+
+@router.get("/search", response_model=PlaceSearchResponse)
+async def search_places(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
+    """
+    Search the offline gazetteer ("Paris", "Austin, TX", "Sao Paulo, Brazil")
+    """
+    return {"query": q, "results": geo_service.search(q, limit)}
+
+@router.get("/timezone", response_model=TimezoneResponse)
+async def timezone_at(latitude: float = Query(..., ge=-90, le=90), longitude: float = Query(..., ge=-180, le=180)):
+    """
+    Timezone for a coordinate (from the nearest gazetteer place)
+    """
+    return geo_service.timezone_at(latitude, longitude)
+
+@router.post("/resolve", response_model=ResolveResponse)
+async def resolve_place(request: ResolveRequest):
+    """
+    Resolve a birth place to coordinates and timezone, and the birth date/time to UTC
+    """
+    try:
+        result = geo_service.resolve(request.birth_place, request.birth_date, request.birth_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid birth date/time: {str(e)}")
+    if not result:
+        raise HTTPException(status_code=404, detail=f"Unknown birth place '{request.birth_place}'")
+    if "utc_time" in result:
+        result["utc_time"] = result["utc_time"].isoformat()
+    return result
+
+@router.get("/health")
+async def geo_health():
+    """Health check for geo service"""
+    return {"status": "healthy", "service": "geo"}
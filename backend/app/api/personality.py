@@ -1,44 +1,173 @@
+import asyncio
+import json
+import time
+from enum import Enum
+from typing import Dict, Optional
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
 from app.schemas.astro import BirthDataRequest
-from app.schemas.personality import PersonalityAssessment, PersonalityTestType
+from app.schemas.personality import LLMAssessmentMode, LLMPriority, PersonalityAssessment, PersonalityTestType
 from app.services.astro_service import astro_service
+from app.services.chart_cache import birth_data_fingerprint
+from app.services.coalescer import coalescers
+from app.services.deadline import request_deadline
+from app.services.geo_service import geo_service
+from app.services.llm_executor import current_lane, llm_lane
+from app.services.llm_service import llm_service
+from app.services.persistence import persistent_store
 from app.services.personality_engine import personality_engine
+from app.services.rate_limiter import rate_limits
 
 router = APIRouter()
 
-@router.post("/full-assessment", response_model=PersonalityAssessment)
-async def generate_full_assessment(birth_data: BirthDataRequest):
+ALL_TESTS = ",".join(test.value for test in PersonalityTestType)
+
+class StreamFormat(str, Enum):
+    SSE = "sse"
+    NDJSON = "ndjson"
+
+async def _coalesced_assessment(birth_data: BirthDataRequest,
+                                llm_mode: Optional[LLMAssessmentMode] = None) -> PersonalityAssessment:
     """
-    Generate complete personality assessment from birth data
+    Chart plus all assessments for this birth data. Identical concurrent requests
+    (double submits, frontend retries) in the same LLM lane share one computation
+    and its LLM calls; each caller gets its own copy to personalize.
     """
-    try:
-        # Get birth chart from astro service
+    async def compute() -> PersonalityAssessment:
         astro_data = await astro_service.get_birth_chart(birth_data)
         if not astro_data:
             raise HTTPException(status_code=400, detail="Unable to get astrological data")
+        return await personality_engine.generate_all_assessments(astro_data.birth_chart, llm_mode)
+    
+    mode = (llm_mode or llm_service.default_mode).value
+    # The shared task runs in the first caller's LLM lane and under its deadline,
+    # so only callers of the same lane share it: an interactive request never
+    # waits on a run queued behind batch or background work
+    key = f"{birth_data_fingerprint(birth_data)}:{ALL_TESTS}:{mode}:{current_lane().value}"
+    assessment = await coalescers.get("assessment").run(key, compute)
+    return assessment.model_copy(deep=True)
+
+@router.post("/full-assessment", response_model=PersonalityAssessment)
+async def generate_full_assessment(birth_data: BirthDataRequest, llm_mode: Optional[LLMAssessmentMode] = None,
+                                   priority: LLMPriority = LLMPriority.INTERACTIVE):
+    """
+    Generate complete personality assessment from birth data.
+    llm_mode overrides LLM_ASSESSMENT_MODE (fanout or combined) for this request;
+    priority picks the LLM executor lane (batch jobs should pass priority=batch).
+    """
+    try:
+        birth_data = geo_service.complete_birth_data(birth_data)
         
-        # Generate all personality assessments
-        assessment = await personality_engine.generate_all_assessments(astro_data.birth_chart)
+        # Get birth chart and generate all personality assessments
+        with request_deadline(settings.DEADLINE_ASSESSMENT_SECONDS), llm_lane(priority):
+            assessment = await _coalesced_assessment(birth_data, llm_mode)
         assessment.user_id = f"user_{birth_data.name.replace(' ', '_').lower()}"
         
+        # Keep the (possibly paid-for) assessment across restarts
+        await persistent_store.save_assessment(
+            birth_data_fingerprint(birth_data), assessment.user_id, assessment
+        )
+        
         return assessment
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating assessment: {str(e)}")
 
+@router.post("/full-assessment/stream")
+async def stream_full_assessment(birth_data: BirthDataRequest, llm_mode: Optional[LLMAssessmentMode] = None,
+                                 format: StreamFormat = StreamFormat.SSE,
+                                 priority: LLMPriority = LLMPriority.INTERACTIVE):
+    """
+    The full assessment, delivered progressively: a "chart" event with the birth
+    chart, one "result" event per test as soon as it completes, then a "summary"
+    event with the confidence score. Every event carries elapsed_ms since the
+    request started. format=sse (text/event-stream) or ndjson (one JSON object per line).
+    """
+    started = time.perf_counter()
+    budget = settings.DEADLINE_ASSESSMENT_STREAM_SECONDS
+    try:
+        birth_data = geo_service.complete_birth_data(birth_data)
+        with request_deadline(budget):
+            astro_data = await astro_service.get_birth_chart(birth_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not astro_data:
+        raise HTTPException(status_code=400, detail="Unable to get astrological data")
+    birth_chart = astro_data.birth_chart
+    
+    def event(name: str, data: Dict) -> str:
+        data["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if format == StreamFormat.NDJSON:
+            return json.dumps({"event": name, **data}) + "\n"
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+    
+    async def events():
+        yield event("chart", {"birth_chart": birth_chart.model_dump(mode="json")})
+        results, sources = {}, {}
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def produce():
+            try:
+                async for item in personality_engine.stream_assessments(birth_chart, llm_mode):
+                    queue.put_nowait(item)
+                queue.put_nowait(None)
+            except Exception as e:
+                queue.put_nowait(e)
+        
+        # Assessments run in their own task, which copies the deadline (still counted
+        # from the start of the request) and the LLM lane; a generator cannot hold it across yields
+        with request_deadline(max(budget - (time.perf_counter() - started), 0.001) if budget > 0 else None), \
+                llm_lane(priority):
+            producer = asyncio.create_task(produce())
+        try:
+            while (item := await queue.get()) is not None:
+                if isinstance(item, Exception):
+                    yield event("error", {"detail": f"Error generating assessment: {str(item)}"})
+                    return
+                test, result, source = item
+                results[test.value] = result
+                sources[test.value] = source
+                yield event("result", {"test_type": test.value, "source": source, "result": result.model_dump(mode="json")})
+        finally:
+            # The client went away: stop the remaining LLM calls
+            producer.cancel()
+        
+        assessment = PersonalityAssessment(
+            user_id=f"user_{birth_data.name.replace(' ', '_').lower()}",
+            birth_data=birth_chart.dict(),
+            **results,
+            sources={test.value: sources[test.value] for test in PersonalityTestType},
+            created_at="2024-01-01T00:00:00Z",
+            confidence_score=personality_engine.blended_confidence(sources)
+        )
+        await persistent_store.save_assessment(birth_data_fingerprint(birth_data), assessment.user_id, assessment)
+        yield event("summary", {
+            "user_id": assessment.user_id,
+            "confidence_score": assessment.confidence_score,
+            "sources": assessment.sources
+        })
+    
+    media_type = "application/x-ndjson" if format == StreamFormat.NDJSON else "text/event-stream"
+    # Disable proxy buffering so events reach the client as they are produced
+    return StreamingResponse(events(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @router.post("/assessment/{test_type}")
-async def generate_single_assessment(test_type: PersonalityTestType, birth_data: BirthDataRequest):
+async def generate_single_assessment(test_type: PersonalityTestType, birth_data: BirthDataRequest,
+                                     llm_mode: Optional[LLMAssessmentMode] = None,
+                                     priority: LLMPriority = LLMPriority.INTERACTIVE):
     """
     Generate a single personality test result
     """
     try:
-        # Get birth chart
-        astro_data = await astro_service.get_birth_chart(birth_data)
-        if not astro_data:
-            raise HTTPException(status_code=400, detail="Unable to get astrological data")
+        birth_data = geo_service.complete_birth_data(birth_data)
         
-        # Generate full assessment first
-        full_assessment = await personality_engine.generate_all_assessments(astro_data.birth_chart)
+        # Generate full assessment first (shared with identical in-flight requests)
+        with request_deadline(settings.DEADLINE_ASSESSMENT_SECONDS), llm_lane(priority):
+            full_assessment = await _coalesced_assessment(birth_data, llm_mode)
         
         # Return specific test result
         test_result = getattr(full_assessment, test_type.value)
@@ -48,10 +177,13 @@ async def generate_single_assessment(test_type: PersonalityTestType, birth_data:
         return {
             "test_type": test_type.value,
             "result": test_result,
+            "source": full_assessment.sources.get(test_type.value),
             "birth_data": birth_data.dict(),
             "confidence_score": full_assessment.confidence_score
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating {test_type.value} assessment: {str(e)}")
 
@@ -74,6 +206,16 @@ async def get_available_tests():
         ]
     }
 
+@router.get("/stats")
+async def personality_stats():
+    """Request coalescing, OpenAI budget, LLM mode token/latency and rule table statistics"""
+    return {
+        "coalescing": coalescers.to_dict(),
+        "openai_budget": rate_limits.get("openai").to_dict(),
+        "llm": llm_service.stats(),
+        "rule_table": personality_engine.rule_table().stats()
+    }
+
 @router.get("/health")
 async def personality_health():
     """Health check for personality service"""
@@ -16,8 +16,128 @@ class Settings(BaseSettings):
     
     # LLM Service (OpenAI)
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
-    LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-4o-mini")
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")  # e.g. the local stand-in; empty = api.openai.com
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-4o-mini")  # nuanced tests and the combined call
+    # Per-test routing: simple tests use the fast model; answers failing schema or plausibility checks are retried on the escalation model
+    LLM_FAST_MODEL: str = os.getenv("LLM_FAST_MODEL", "gpt-4o-mini")
+    LLM_ESCALATION_MODEL: str = os.getenv("LLM_ESCALATION_MODEL", "gpt-4o")
+    LLM_ESCALATION_ENABLED: bool = os.getenv("LLM_ESCALATION_ENABLED", "true").lower() == "true"
+    LLM_ROUTES: str = os.getenv("LLM_ROUTES", "")  # overrides, e.g. "disc=gpt-4o-mini:800:0.5,mbti=gpt-4o"
     USE_LLM: bool = os.getenv("USE_LLM", "true").lower() == "true"
+    LLM_ASSESSMENT_MODE: str = os.getenv("LLM_ASSESSMENT_MODE", "fanout")  # fanout (9 requests) | combined (1 request)
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "18"))  # in-flight completions per process
+    # Per-lane caps within LLM_MAX_CONCURRENCY; free slots go to interactive, then batch, then background
+    LLM_INTERACTIVE_MAX_IN_FLIGHT: int = int(os.getenv("LLM_INTERACTIVE_MAX_IN_FLIGHT", "18"))
+    LLM_BATCH_MAX_IN_FLIGHT: int = int(os.getenv("LLM_BATCH_MAX_IN_FLIGHT", "6"))
+    LLM_BACKGROUND_MAX_IN_FLIGHT: int = int(os.getenv("LLM_BACKGROUND_MAX_IN_FLIGHT", "3"))
+    LLM_CALL_TIMEOUT_SECONDS: float = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "60"))
+    LLM_TEMPERATURE: float = float(os.getenv("LLM_TEMPERATURE", "0.8"))
+    # Deterministic mode: temperature 0 and a fixed seed, so cached answers are what a new call would return.
+    # Opt-in: it changes the style of every answer. The LLM result cache is only active while it is on
+    LLM_DETERMINISTIC: bool = os.getenv("LLM_DETERMINISTIC", "false").lower() == "true"
+    LLM_SEED: int = int(os.getenv("LLM_SEED", "42"))
+    # Failed tests are served rule-based and retried in the background (backoff doubles per attempt) to fill
+    # the LLM result cache for the next assessment of the chart; no retries while the cache is inactive
+    LLM_RETRY_ATTEMPTS: int = int(os.getenv("LLM_RETRY_ATTEMPTS", "3"))
+    LLM_RETRY_BACKOFF_SECONDS: float = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "2"))
+    # LLM result cache (in-memory LRU, optionally backed by the persistent store); inactive unless LLM_DETERMINISTIC is on
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "4096"))
+    LLM_CACHE_PERSISTENT: bool = os.getenv("LLM_CACHE_PERSISTENT", "true").lower() == "true"
+    # Pricing for cost reporting (USD per million tokens); 0 = built-in table for the model
+    LLM_PRICE_INPUT_PER_MTOK: float = float(os.getenv("LLM_PRICE_INPUT_PER_MTOK", "0"))
+    LLM_PRICE_OUTPUT_PER_MTOK: float = float(os.getenv("LLM_PRICE_OUTPUT_PER_MTOK", "0"))
+    
+    # Rule-based assessments: fill the whole rule table at startup (~1s) instead of on first use
+    RULE_TABLE_PRECOMPUTE: bool = os.getenv("RULE_TABLE_PRECOMPUTE", "false").lower() == "true"
+    
+    # Request deadlines per endpoint (0 = none); each upstream call gets what is left of it
+    DEADLINE_BIRTH_CHART_SECONDS: float = float(os.getenv("DEADLINE_BIRTH_CHART_SECONDS", "10"))
+    DEADLINE_ASSESSMENT_SECONDS: float = float(os.getenv("DEADLINE_ASSESSMENT_SECONDS", "45"))
+    DEADLINE_ASSESSMENT_STREAM_SECONDS: float = float(os.getenv("DEADLINE_ASSESSMENT_STREAM_SECONDS", "60"))
+    DEADLINE_MIN_HOP_SECONDS: float = float(os.getenv("DEADLINE_MIN_HOP_SECONDS", "0.25"))  # astrology providers are skipped below this
+    LLM_MIN_CALL_BUDGET_SECONDS: float = float(os.getenv("LLM_MIN_CALL_BUDGET_SECONDS", "3"))  # tests go rule-based below this
+    
+    # Outbound HTTP (shared async clients, one pool per provider)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+    ASTRO_API_HTTP2: bool = os.getenv("ASTRO_API_HTTP2", "true").lower() == "true"
+    PROKERALA_HTTP2: bool = os.getenv("PROKERALA_HTTP2", "true").lower() == "true"
+    
+    # Prokerala OAuth token: renewed in the background this long before the 5-minute safety window
+    PROKERALA_TOKEN_REFRESH_ENABLED: bool = os.getenv("PROKERALA_TOKEN_REFRESH_ENABLED", "true").lower() == "true"
+    PROKERALA_TOKEN_REFRESH_LEAD_SECONDS: float = float(os.getenv("PROKERALA_TOKEN_REFRESH_LEAD_SECONDS", "300"))
+    PROKERALA_TOKEN_RETRY_SECONDS: float = float(os.getenv("PROKERALA_TOKEN_RETRY_SECONDS", "30"))
+    
+    # Provider chain order (mock data is always the last resort)
+    ASTRO_PROVIDER_ORDER: str = os.getenv("ASTRO_PROVIDER_ORDER", "astroapi,prokerala,local")
+    
+    # Offline local ephemeris provider
+    LOCAL_EPHEMERIS_ENABLED: bool = os.getenv("LOCAL_EPHEMERIS_ENABLED", "true").lower() == "true"
+    LOCAL_EPHEMERIS_ZODIAC: str = os.getenv("LOCAL_EPHEMERIS_ZODIAC", "tropical")  # tropical | sidereal (Lahiri)
+    LOCAL_EPHEMERIS_HOUSE_SYSTEM: str = os.getenv("LOCAL_EPHEMERIS_HOUSE_SYSTEM", "porphyry")  # porphyry | equal | whole_sign
+    # Precomputed, memory-mapped longitude table (python -m app.services.ephemeris_table build)
+    EPHEMERIS_TABLE_ENABLED: bool = os.getenv("EPHEMERIS_TABLE_ENABLED", "true").lower() == "true"
+    EPHEMERIS_TABLE_PATH: str = os.getenv("EPHEMERIS_TABLE_PATH", "./ephemeris_1900_2100.bin")
+    
+    # Aspect engine (aspects are recomputed for every chart, whatever the provider)
+    ASPECT_ENGINE_ENABLED: bool = os.getenv("ASPECT_ENGINE_ENABLED", "true").lower() == "true"
+    ASPECT_INCLUDE_MINOR: bool = os.getenv("ASPECT_INCLUDE_MINOR", "true").lower() == "true"
+    ASPECT_ORBS: str = os.getenv("ASPECT_ORBS", "")  # overrides, e.g. "Conjunction=10,Sextile=4"
+    
+    # Offline gazetteer for place search and coordinate -> timezone lookup
+    GAZETTEER_PATH: str = os.getenv(
+        "GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "gazetteer.csv")
+    )
+    
+    # Hedged provider requests: race the secondary provider once the primary is slower than its p95
+    ASTRO_HEDGING_ENABLED: bool = os.getenv("ASTRO_HEDGING_ENABLED", "false").lower() == "true"
+    ASTRO_HEDGE_PERCENTILE: float = float(os.getenv("ASTRO_HEDGE_PERCENTILE", "95"))
+    ASTRO_HEDGE_DELAY_MS: float = float(os.getenv("ASTRO_HEDGE_DELAY_MS", "1500"))  # used until enough samples exist
+    ASTRO_HEDGE_MIN_DELAY_MS: float = float(os.getenv("ASTRO_HEDGE_MIN_DELAY_MS", "100"))
+    ASTRO_HEDGE_MAX_DELAY_MS: float = float(os.getenv("ASTRO_HEDGE_MAX_DELAY_MS", "5000"))
+    ASTRO_HEDGE_MIN_SAMPLES: int = int(os.getenv("ASTRO_HEDGE_MIN_SAMPLES", "20"))
+    
+    # Per-provider circuit breakers
+    CB_ENABLED: bool = os.getenv("CB_ENABLED", "true").lower() == "true"
+    CB_WINDOW_SIZE: int = int(os.getenv("CB_WINDOW_SIZE", "20"))
+    CB_MIN_CALLS: int = int(os.getenv("CB_MIN_CALLS", "5"))
+    CB_ERROR_RATE_THRESHOLD: float = float(os.getenv("CB_ERROR_RATE_THRESHOLD", "0.5"))
+    CB_SLOW_CALL_MS: float = float(os.getenv("CB_SLOW_CALL_MS", "5000"))
+    CB_SLOW_CALL_RATE_THRESHOLD: float = float(os.getenv("CB_SLOW_CALL_RATE_THRESHOLD", "0.8"))
+    CB_OPEN_SECONDS: float = float(os.getenv("CB_OPEN_SECONDS", "30"))
+    CB_PROBE_INTERVAL_SECONDS: float = float(os.getenv("CB_PROBE_INTERVAL_SECONDS", "5"))
+    
+    # Upstream quota budgets: token bucket (requests/second, burst) plus a daily cap; 0 = unlimited.
+    # Limits apply per process and are opt-in; a 429 pauses the upstream either way
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_THROTTLE_SECONDS: float = float(os.getenv("RATE_LIMIT_THROTTLE_SECONDS", "30"))  # pause after a 429 without Retry-After
+    ASTRO_API_RATE_PER_SECOND: float = float(os.getenv("ASTRO_API_RATE_PER_SECOND", "0"))
+    ASTRO_API_BURST: float = float(os.getenv("ASTRO_API_BURST", "5"))
+    ASTRO_API_DAILY_LIMIT: int = int(os.getenv("ASTRO_API_DAILY_LIMIT", "0"))
+    PROKERALA_RATE_PER_SECOND: float = float(os.getenv("PROKERALA_RATE_PER_SECOND", "0"))
+    PROKERALA_BURST: float = float(os.getenv("PROKERALA_BURST", "3"))
+    PROKERALA_DAILY_LIMIT: int = int(os.getenv("PROKERALA_DAILY_LIMIT", "0"))
+    OPENAI_RATE_PER_SECOND: float = float(os.getenv("OPENAI_RATE_PER_SECOND", "0"))
+    OPENAI_BURST: float = float(os.getenv("OPENAI_BURST", "30"))  # one full assessment reserves 9 calls
+    OPENAI_DAILY_LIMIT: int = int(os.getenv("OPENAI_DAILY_LIMIT", "0"))
+    
+    # Birth chart cache (in-memory LRU keyed by birth data fingerprint)
+    CHART_CACHE_ENABLED: bool = os.getenv("CHART_CACHE_ENABLED", "true").lower() == "true"
+    CHART_CACHE_MAX_ENTRIES: int = int(os.getenv("CHART_CACHE_MAX_ENTRIES", "2048"))
+    CHART_CACHE_TTL_SECONDS: float = float(os.getenv("CHART_CACHE_TTL_SECONDS", "86400"))
+    CHART_CACHE_COORD_PRECISION: int = int(os.getenv("CHART_CACHE_COORD_PRECISION", "4"))
+    
+    # Upstream raw payload in AstroResponse.raw_data: full | trim | drop | ref (compressed, fetched via /api/astro/raw/{ref}).
+    # Anything but full changes what clients get in raw_data, so deployments opt in
+    RAW_DATA_POLICY: str = os.getenv("RAW_DATA_POLICY", "full")
+    RAW_DATA_MEMORY_BYTES: int = int(os.getenv("RAW_DATA_MEMORY_BYTES", str(16 * 1024 * 1024)))
+    
+    # Persistent chart/assessment store (uses DATABASE_URL)
+    PERSISTENCE_ENABLED: bool = os.getenv("PERSISTENCE_ENABLED", "true").lower() == "true"
+    SQLITE_WAL: bool = os.getenv("SQLITE_WAL", "true").lower() == "true"
     
     class Config:
         env_file = ".env"
@@ -5,11 +5,12 @@ from typing import Optional, Dict, List, Union
 class BirthDataRequest(BaseModel):
     name: str
     birth_date: str  # YYYY-MM-DD
-    birth_time: str  # HH:MM
+    birth_time: str  # HH:MM or HH:MM:SS
     birth_place: str
-    latitude: float
-    longitude: float
-    timezone: str
+    # Optional: resolved server-side from birth_place when omitted
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    timezone: Optional[str] = None
 
 class PlanetPosition(BaseModel):
     name: str
@@ -25,6 +26,7 @@ class BirthChart(BaseModel):
     planets: List[PlanetPosition]
     houses: Dict[str, str]
     aspects: List[Dict[str, Union[str, float]]]
+    aspect_patterns: List[Dict[str, Union[str, List[str]]]] = []
 
 class AstroResponse(BaseModel):
     birth_chart: BirthChart
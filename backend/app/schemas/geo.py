@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class Place(BaseModel):
+    name: str
+    label: str
+    country_code: str
+    country: str
+    admin1: str
+    latitude: float
+    longitude: float
+    timezone: str
+    population: int
+
+class PlaceSearchResponse(BaseModel):
+    query: str
+    results: List[Place]
+
+class TimezoneResponse(BaseModel):
+    timezone: str
+    nearest_place: Place
+    distance_km: float
+
+class ResolveRequest(BaseModel):
+    birth_place: str
+    birth_date: Optional[str] = None  # YYYY-MM-DD
+    birth_time: Optional[str] = None  # HH:MM
+
+class ResolveResponse(BaseModel):
+    place: Place
+    latitude: float
+    longitude: float
+    timezone: str
+    # Set when birth_date and birth_time are given
+    utc_time: Optional[str] = None
+    utc_timestamp_us: Optional[int] = None
+    utc_offset_seconds: Optional[int] = None
+    dst: Optional[bool] = None
+    ambiguous: Optional[bool] = None
+    nonexistent: Optional[bool] = None
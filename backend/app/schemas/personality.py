@@ -13,6 +13,15 @@ class PersonalityTestType(str, Enum):
     EMOTIONAL_INTELLIGENCE = "emotional_intelligence"
     CAREER_PERSONALITY = "career_personality"
 
+class LLMAssessmentMode(str, Enum):
+    FANOUT = "fanout"      # one request per test, run concurrently
+    COMBINED = "combined"  # one request returning all nine results
+
+class LLMPriority(str, Enum):
+    INTERACTIVE = "interactive"  # a user is waiting on the answer
+    BATCH = "batch"              # bulk/offline jobs
+    BACKGROUND = "background"    # retries and other work nobody is waiting on
+
 class MBTIResult(BaseModel):
     type: str  # e.g., "ENFP"
     description: str
@@ -74,6 +83,18 @@ class CareerPersonalityResult(BaseModel):
     career_matches: List[str]
     work_environments: List[str]
 
+class CombinedAssessmentResult(BaseModel):
+    """All nine results in one object: the LLM response format of the combined mode"""
+    mbti: MBTIResult
+    big_five: BigFiveResult
+    enneagram: EnneagramResult
+    disc: DISCResult
+    strengths_finder: StrengthsFinderResult
+    love_languages: LoveLanguagesResult
+    attachment_styles: AttachmentStyleResult
+    emotional_intelligence: EmotionalIntelligenceResult
+    career_personality: CareerPersonalityResult
+
 class PersonalityAssessment(BaseModel):
     user_id: str
     birth_data: Dict
@@ -86,5 +107,6 @@ class PersonalityAssessment(BaseModel):
     attachment_styles: Optional[AttachmentStyleResult] = None
     emotional_intelligence: Optional[EmotionalIntelligenceResult] = None
     career_personality: Optional[CareerPersonalityResult] = None
+    sources: Dict[str, str] = {}  # test -> "llm" | "rule_based"
     created_at: str
     confidence_score: float  # 0-1
\ No newline at end of file
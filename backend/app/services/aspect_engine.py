@@ -0,0 +1,280 @@
+"""
+Aspect engine: classifies every planet pair of a chart (or of N charts at once)
+into major/minor aspects with configurable orbs, ranks them by tightness and
+detects the classic aspect patterns.
+
+Aspects are always recomputed from planet positions, so every provider
+(including ones that omit aspects) yields the same complete, ordered data.
+"""
+import math
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from app.core.config import settings
+from app.schemas.astro import BirthChart
+from app.services import ephemeris
+
+# (name, exact angle, default orb in degrees, major)
+ASPECTS = [
+    ("Conjunction", 0.0, 8.0, True),
+    ("Opposition", 180.0, 8.0, True),
+    ("Trine", 120.0, 7.0, True),
+    ("Square", 90.0, 7.0, True),
+    ("Sextile", 60.0, 5.0, True),
+    ("Quincunx", 150.0, 3.0, False),
+    ("Semi-sextile", 30.0, 2.0, False),
+    ("Semi-square", 45.0, 2.0, False),
+    ("Sesquiquadrate", 135.0, 2.0, False),
+    ("Quintile", 72.0, 1.5, False),
+    ("Bi-quintile", 144.0, 1.5, False),
+]
+
+STELLIUM_MIN_PLANETS = 3
+
+def _parse_orbs(value: str) -> Dict[str, float]:
+    """Parse orb overrides such as "Conjunction=10,Sextile=4" """
+    orbs = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, orb = item.split("=", 1)
+            try:
+                orb = float(orb)
+            except ValueError:
+                orb = None
+            # Deviations are divided by the orb: it must be a positive, finite number of degrees
+            if orb is None or not math.isfinite(orb) or orb <= 0:
+                print(f"Ignoring invalid aspect orb '{item.strip()}'")
+                continue
+            orbs[name.strip().lower()] = orb
+    return orbs
+
+@lru_cache(maxsize=16)
+def _combos(bodies: int, size: int) -> np.ndarray:
+    return np.array(list(combinations(range(bodies), size)), dtype=np.intp).reshape(-1, size)
+
+@lru_cache(maxsize=16)
+def _pairs(bodies: int):
+    """Upper-triangle pair indices and the (P, P) body -> pair column lookup"""
+    first, second = np.triu_indices(bodies, 1)
+    pair_index = np.zeros((bodies, bodies), dtype=np.intp)
+    pair_index[first, second] = np.arange(len(first))
+    pair_index[second, first] = np.arange(len(first))
+    return first, second, pair_index
+
+@lru_cache(maxsize=16)
+def _triangle_pairs(bodies: int):
+    """Pair columns (ab, bc, ac) of every body triple"""
+    pair_index = _pairs(bodies)[2]
+    triples = _combos(bodies, 3)
+    a, b, c = triples[:, 0], triples[:, 1], triples[:, 2]
+    return pair_index[a, b], pair_index[b, c], pair_index[a, c]
+
+@lru_cache(maxsize=16)
+def _cross_pairs(bodies: int):
+    """For every body quadruple, the pair columns of its three opposition pairings"""
+    pair_index = _pairs(bodies)[2]
+    quads = _combos(bodies, 4)
+    w, x, y, z = (quads[:, k] for k in range(4))
+    return [
+        (pair_index[p, q], pair_index[r, t], pair_index[p, r], pair_index[p, t], pair_index[q, r], pair_index[q, t])
+        for p, q, r, t in ((w, x, y, z), (w, y, x, z), (w, z, x, y))
+    ]
+
+class AspectBatch:
+    """
+    Aspects for N charts over the same P bodies.
+
+    `kind` and `orb` are (N, pairs) arrays over the upper-triangle body pairs
+    (kind is an index into engine.aspects, -1 for no aspect). Per-chart lists are
+    built with aspects(i) / patterns(i).
+    """
+
+    def __init__(self, engine: "AspectEngine", bodies: List[str], longitudes: np.ndarray,
+                 kind: np.ndarray, orb: np.ndarray, strength: np.ndarray):
+        self.engine = engine
+        self.bodies = bodies
+        self.longitudes = longitudes
+        self.kind = kind
+        self.orb = orb
+        self.strength = strength
+        self.first, self.second, _ = _pairs(len(bodies))
+        self._patterns = None
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def aspects(self, i: int) -> List[Dict]:
+        """Aspects of chart i, strongest (tightest relative to its orb) first"""
+        found = np.flatnonzero(self.kind[i] >= 0)
+        # Stable sort keeps body order for ties, so ordering is deterministic
+        found = found[np.argsort(-self.strength[i, found], kind="stable")]
+        result = []
+        for pair in found:
+            name, angle, _, major = self.engine.aspects[self.kind[i, pair]]
+            result.append({
+                "planet1": self.bodies[self.first[pair]],
+                "planet2": self.bodies[self.second[pair]],
+                "aspect": name,
+                "angle": angle,
+                "orb": round(float(self.orb[i, pair]), 2),
+                "strength": round(float(self.strength[i, pair]), 3),
+                "type": "major" if major else "minor"
+            })
+        return result
+
+    def patterns(self, i: int) -> List[Dict]:
+        """Aspect patterns of chart i: grand crosses, grand trines, T-squares, yods, stelliums"""
+        detected = self._detect_patterns()
+        names = self.bodies
+        result = []
+
+        quads = _combos(len(names), 4)
+        for q in np.flatnonzero(detected["grand_cross"][i]):
+            result.append({"pattern": "Grand Cross", "planets": [names[b] for b in quads[q]]})
+
+        triples = _combos(len(names), 3)
+        for t in np.flatnonzero(detected["grand_trine"][i]):
+            result.append({"pattern": "Grand Trine", "planets": [names[b] for b in triples[t]]})
+        # T-squares that are part of a grand cross are not reported separately
+        crosses = [set(pattern["planets"]) for pattern in result if pattern["pattern"] == "Grand Cross"]
+        for label, key in (("T-Square", "t_square"), ("Yod", "yod")):
+            for t, apex in zip(*np.nonzero(detected[key][i])):
+                planets = [names[b] for b in triples[t]]
+                if label == "T-Square" and any(set(planets) <= cross for cross in crosses):
+                    continue
+                result.append({"pattern": label, "planets": planets, "apex": planets[apex]})
+
+        signs = detected["signs"][i]
+        for sign in np.flatnonzero(detected["stellium"][i]):
+            result.append({
+                "pattern": "Stellium",
+                "planets": [names[b] for b in np.flatnonzero(signs == sign)],
+                "sign": ephemeris.ZODIAC_SIGNS[sign]
+            })
+        return result
+
+    def _detect_patterns(self) -> Dict[str, np.ndarray]:
+        if self._patterns is not None:
+            return self._patterns
+
+        n, count = len(self.kind), len(self.bodies)
+
+        def hits(aspect_name: str) -> np.ndarray:
+            index = self.engine.index_of(aspect_name)
+            return self.kind == index if index is not None else np.zeros(self.kind.shape, dtype=bool)
+
+        opposition, square, trine = hits("Opposition"), hits("Square"), hits("Trine")
+        sextile, quincunx = hits("Sextile"), hits("Quincunx")
+
+        def candidates(*minimums) -> np.ndarray:
+            """Rows with enough aspects of each kind to possibly form the pattern"""
+            keep = np.ones(n, dtype=bool)
+            for matrix, minimum in minimums:
+                keep &= matrix.sum(axis=1) >= minimum
+            return np.flatnonzero(keep)
+
+        triples = _combos(count, 3)
+        ab, bc, ac = _triangle_pairs(count)
+        # (base pair, leg, leg, apex column) for each choice of apex in the triple
+        rotations = [(ab, ac, bc, 2), (bc, ab, ac, 0), (ac, ab, bc, 1)]
+
+        def with_apex(base: np.ndarray, legs: np.ndarray, rows: np.ndarray) -> np.ndarray:
+            result = np.zeros((n, len(triples), 3), dtype=bool)
+            if not len(rows):
+                return result
+            for base_pair, leg1, leg2, column in rotations:
+                result[rows, :, column] = base[rows][:, base_pair] & legs[rows][:, leg1] & legs[rows][:, leg2]
+            return result
+
+        grand_trine = np.zeros((n, len(triples)), dtype=bool)
+        rows = candidates((trine, 3))
+        if len(rows):
+            grand_trine[rows] = trine[rows][:, ab] & trine[rows][:, bc] & trine[rows][:, ac]
+
+        quads = _combos(count, 4)
+        grand_cross = np.zeros((n, len(quads)), dtype=bool)
+        rows = candidates((opposition, 2), (square, 4))
+        if len(quads) and len(rows):
+            opp, sq = opposition[rows], square[rows]
+            found = np.zeros((len(rows), len(quads)), dtype=bool)
+            for opp1, opp2, sq1, sq2, sq3, sq4 in _cross_pairs(count):
+                found |= opp[:, opp1] & opp[:, opp2] & sq[:, sq1] & sq[:, sq2] & sq[:, sq3] & sq[:, sq4]
+            grand_cross[rows] = found
+
+        signs = (self.longitudes // 30.0).astype(np.int64) % 12
+        sign_counts = (signs[:, :, None] == np.arange(12)).sum(axis=1)
+
+        self._patterns = {
+            "grand_trine": grand_trine,
+            "t_square": with_apex(opposition, square, candidates((opposition, 1), (square, 2))),
+            "yod": with_apex(sextile, quincunx, candidates((sextile, 1), (quincunx, 2))),
+            "grand_cross": grand_cross,
+            "signs": signs,
+            "stellium": sign_counts >= STELLIUM_MIN_PLANETS,
+        }
+        return self._patterns
+
+class AspectEngine:
+    """Vectorized aspect classification over (N, P) longitude matrices"""
+
+    def __init__(self):
+        overrides = _parse_orbs(settings.ASPECT_ORBS)
+        self.aspects = [
+            (name, angle, overrides.get(name.lower(), orb), major)
+            for name, angle, orb, major in ASPECTS
+            if major or settings.ASPECT_INCLUDE_MINOR
+        ]
+        self.angles = np.array([aspect[1] for aspect in self.aspects])
+        self.orbs = np.array([aspect[2] for aspect in self.aspects])
+
+    def index_of(self, name: str) -> Optional[int]:
+        for index, aspect in enumerate(self.aspects):
+            if aspect[0] == name:
+                return index
+        return None
+
+    def compute(self, longitudes, bodies: Sequence[str] = ephemeris.PLANETS) -> AspectBatch:
+        """Classify all body pairs for an (N, P) (or (P,)) array of ecliptic longitudes"""
+        longitudes = np.atleast_2d(np.asarray(longitudes, dtype=np.float64))
+        first, second, _ = _pairs(longitudes.shape[1])
+        difference = longitudes[:, first] - longitudes[:, second]
+        separation = np.abs(difference - 360.0 * np.floor((difference + 180.0) / 360.0))  # (N, pairs) in [0, 180]
+
+        deviation = np.abs(separation[:, :, None] - self.angles)  # (N, pairs, aspects)
+        ratio = deviation / self.orbs
+        best = ratio.argmin(axis=2)[:, :, None]
+        best_ratio = np.take_along_axis(ratio, best, axis=2)[:, :, 0]
+        kind = np.where(best_ratio <= 1.0, best[:, :, 0], -1).astype(np.int8)
+        orb = np.take_along_axis(deviation, best, axis=2)[:, :, 0]
+        return AspectBatch(self, list(bodies), longitudes, kind, orb, 1.0 - best_ratio)
+
+    def annotate(self, birth_chart: BirthChart) -> BirthChart:
+        """Replace the chart's aspects with the computed, ranked set and add its patterns"""
+        bodies, longitudes = self._chart_longitudes(birth_chart)
+        if len(bodies) < 2:
+            return birth_chart
+        batch = self.compute(longitudes, bodies)
+        birth_chart.aspects = batch.aspects(0)
+        birth_chart.aspect_patterns = batch.patterns(0)
+        return birth_chart
+
+    def _chart_longitudes(self, birth_chart: BirthChart):
+        """Absolute longitudes of the known bodies, in ephemeris.PLANETS order"""
+        by_name = {planet.name.capitalize(): planet for planet in birth_chart.planets}
+        bodies, longitudes = [], []
+        for name in ephemeris.PLANETS:
+            planet = by_name.get(name)
+            if planet is None or planet.sign.capitalize() not in ephemeris.ZODIAC_SIGNS:
+                continue
+            degree = planet.degree
+            # Some providers give absolute longitude instead of degree within sign
+            if not 0.0 <= degree < 30.0:
+                longitude = degree % 360.0
+            else:
+                longitude = ephemeris.ZODIAC_SIGNS.index(planet.sign.capitalize()) * 30.0 + degree
+            bodies.append(name)
+            longitudes.append(longitude)
+        return bodies, longitudes
+
+aspect_engine = AspectEngine()
@@ -1,40 +1,322 @@
-import requests
+import asyncio
 import json
-from typing import Dict, Optional
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from app.core.config import settings
 from app.schemas.astro import BirthDataRequest, AstroResponse, BirthChart, PlanetPosition
+from app.services.circuit_breaker import circuit_breakers
+from app.services.coalescer import coalescers
+from app.services.deadline import deadline_bucket, deadline_stats, hop_timeout
+from app.services import ephemeris_batch
+from app.services.aspect_engine import aspect_engine
+from app.services.ephemeris_table import ephemeris_table
+from app.services.chart_cache import chart_cache, birth_data_fingerprint
+from app.services.geo_service import geo_service
+from app.services.http_client import http_clients
+from app.services.llm_executor import current_lane
+from app.services.local_ephemeris_service import local_ephemeris_service
+from app.services.persistence import persistent_store
 from app.services.prokerala_service import prokerala_service
+from app.services.provider_stats import provider_metrics
+from app.services.rate_limiter import rate_limits
+from app.services.raw_data_store import raw_data_store
 
 class AstroService:
     def __init__(self):
         self.api_key = settings.ASTRO_API_KEY
         self.base_url = settings.ASTRO_API_URL
+        self.hedges_fired = 0
         
     async def get_birth_chart(self, birth_data: BirthDataRequest) -> Optional[AstroResponse]:
+        """
+        Get birth chart data, serving repeat requests from the in-memory chart cache,
+        then the persistent store, and otherwise using the multi-provider fallback chain.
+        Missing coordinates/timezone are resolved offline from birth_place first.
+        """
+        birth_data = geo_service.complete_birth_data(birth_data)
+        fingerprint = birth_data_fingerprint(birth_data)
+        if settings.CHART_CACHE_ENABLED:
+            cached = chart_cache.get(fingerprint)
+            if cached:
+                provider, response = cached
+                print(f"Chart cache hit (provider: {provider})")
+                return response
+        
+        # Second tier: charts persisted by a previous process
+        stored = await persistent_store.get_chart(fingerprint)
+        if stored:
+            provider, response = stored
+            print(f"Persistent store hit (provider: {provider})")
+            self._annotate_aspects(response)
+            response = await raw_data_store.apply(response, provider)
+            if settings.CHART_CACHE_ENABLED:
+                chart_cache.set(fingerprint, response, provider)
+            return response
+        
+        # Concurrent requests for the same chart share one provider fetch. It runs under
+        # the first caller's deadline, so only callers whose deadlines (and LLM lanes)
+        # match share it: a full assessment never inherits a birth-chart request's timeout
+        key = f"{fingerprint}:{deadline_bucket()}:{current_lane().value}"
+        return await coalescers.get("birth_chart").run(
+            key, lambda: self._fetch_and_store(birth_data, fingerprint)
+        )
+    
+    async def _fetch_and_store(self, birth_data: BirthDataRequest, fingerprint: str) -> Optional[AstroResponse]:
+        result, provider = await self._fetch_from_providers(birth_data)
+        self._annotate_aspects(result)
+        
+        # Never cache mock/fallback charts as if they were real provider data
+        if provider != "mock" and self._is_provider_data(result):
+            # Slim the upstream payload before it is cached, persisted and returned
+            result = await raw_data_store.apply(result, provider)
+            if settings.CHART_CACHE_ENABLED:
+                chart_cache.set(fingerprint, result, provider)
+            await persistent_store.save_chart(fingerprint, provider, result)
+        
+        return result
+    
+    async def _fetch_from_providers(self, birth_data: BirthDataRequest) -> Tuple[AstroResponse, str]:
         """
         Get birth chart data using multi-provider fallback system:
         1. Primary API (AstroAPI.com)
         2. Secondary API (Prokerala)
-        3. Mock data
+        3. Local ephemeris (offline calculation)
+        4. Mock data
+        
+        The order of the first three is set by ASTRO_PROVIDER_ORDER. With ASTRO_HEDGING_ENABLED the first two providers are raced instead of
+        tried strictly one after the other (see _hedged_fetch).
+        
+        Returns the response together with the name of the provider that produced it.
         """
         print("Starting multi-provider astrology data fetch...")
+        providers = self._provider_chain()
+        degraded = (None, None)  # parse-fallback chart, used only if no later provider does better
         
-        # Try primary provider first (AstroAPI.com)
-        primary_result = await self._try_primary_api(birth_data)
-        if primary_result:
-            print("Successfully retrieved data from primary API (AstroAPI.com)")
-            return primary_result
+        if settings.ASTRO_HEDGING_ENABLED and len(providers) >= 2:
+            result, provider = await self._hedged_fetch(providers[0], providers[1], birth_data)
+            if self._is_provider_data(result):
+                return result, provider
+            if result:
+                degraded = (result, provider)
+            providers = providers[2:]
         
-        # Try secondary provider (Prokerala)
-        print("Primary API failed, trying secondary provider (Prokerala)...")
-        secondary_result = await self._try_secondary_api(birth_data)
-        if secondary_result:
-            print("Successfully retrieved data from secondary API (Prokerala)")
-            return secondary_result
+        for name, fetch in providers:
+            result = await self._call_provider(name, fetch, birth_data)
+            if self._is_provider_data(result):
+                print(f"Successfully retrieved data from {name}")
+                provider_metrics.get(name).served += 1
+                return result, name
+            if result and not degraded[0]:
+                degraded = (result, name)
+            print(f"Provider {name} failed, trying next provider...")
+        
+        if degraded[0]:
+            print(f"All API providers failed, using the fallback chart from {degraded[1]}")
+            provider_metrics.get(degraded[1]).served += 1
+            return degraded
         
         # Fall back to mock data
         print("All API providers failed, falling back to mock data")
-        return self._get_mock_chart_data(birth_data)
+        return self._get_mock_chart_data(birth_data), "mock"
+    
+    def _provider_chain(self) -> List[Tuple[str, Callable[[BirthDataRequest], Awaitable[Optional[AstroResponse]]]]]:
+        """
+        Ordered (name, fetch) pairs for the providers in ASTRO_PROVIDER_ORDER that
+        are configured, whose circuit breaker is not open and whose request budget
+        is not spent
+        """
+        available = {
+            "astroapi": (self._primary_configured(), self._try_primary_api),
+            "prokerala": (prokerala_service.is_configured(), self._try_secondary_api),
+            "local": (local_ephemeris_service.is_configured(), self._try_local_ephemeris)
+        }
+        candidates = []
+        for name in settings.ASTRO_PROVIDER_ORDER.split(","):
+            name = name.strip()
+            if name not in available:
+                if name:
+                    print(f"Unknown astrology provider '{name}' in ASTRO_PROVIDER_ORDER")
+                continue
+            configured, fetch = available[name]
+            if configured:
+                candidates.append((name, fetch))
+        
+        chain = []
+        for name, fetch in candidates:
+            breaker = circuit_breakers.get(name)
+            if not breaker.is_available():
+                breaker.rejected += 1
+                print(f"Circuit breaker {breaker.state.value} for {name}, routing around it")
+                continue
+            if not rate_limits.get(name).is_available():
+                print(f"Request budget for {name} is spent, routing around it")
+                continue
+            chain.append((name, fetch))
+        return chain
+    
+    def _primary_configured(self) -> bool:
+        return bool(self.api_key) and self.api_key != "YOUR_ACTUAL_API_KEY_HERE"
+    
+    async def _call_provider(self, name: str, fetch, birth_data: BirthDataRequest) -> Optional[AstroResponse]:
+        """
+        Call one provider through its circuit breaker and request budget, recording
+        latency and outcome
+        """
+        # Remote calls get what is left of the request deadline; the local ephemeris is never cut short
+        timeout = None if name == "local" else hop_timeout(settings.HTTP_TIMEOUT_SECONDS)
+        if timeout is not None and timeout < settings.DEADLINE_MIN_HOP_SECONDS:
+            deadline_stats.record_skipped(name)
+            print(f"Request deadline too close to call {name}, skipping it")
+            return None
+        
+        breaker = circuit_breakers.get(name)
+        if not breaker.allow_request():
+            print(f"Circuit breaker for {name} rejected the request")
+            return None
+        if not rate_limits.get(name).try_acquire():
+            # Not the provider's fault: give back a half-open trial slot untouched
+            breaker.release()
+            return None
+        
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(fetch(birth_data), timeout=timeout)
+        except asyncio.TimeoutError:
+            # Cut short by our own deadline rather than the provider's timeout: not held against it
+            deadline_stats.record_timed_out(name)
+            breaker.release()
+            print(f"Provider {name} did not answer within the request deadline ({timeout:.1f}s)")
+            return None
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        latency_ms = (time.perf_counter() - started) * 1000
+        success = self._is_provider_data(result)
+        provider_metrics.get(name).record(latency_ms, success)
+        breaker.record(success, latency_ms)
+        return result
+    
+    def _hedge_delay(self, provider: str) -> float:
+        """
+        Seconds to wait for a provider before firing the hedge request: its recent
+        latency percentile, clamped to the configured bounds
+        """
+        stats = provider_metrics.get(provider)
+        observed = stats.percentile(settings.ASTRO_HEDGE_PERCENTILE)
+        if observed is None or len(stats.latencies_ms) < settings.ASTRO_HEDGE_MIN_SAMPLES:
+            delay_ms = settings.ASTRO_HEDGE_DELAY_MS
+        else:
+            delay_ms = min(max(observed, settings.ASTRO_HEDGE_MIN_DELAY_MS), settings.ASTRO_HEDGE_MAX_DELAY_MS)
+        return delay_ms / 1000.0
+    
+    async def _hedged_fetch(self, primary, secondary, birth_data: BirthDataRequest) -> Tuple[Optional[AstroResponse], Optional[str]]:
+        """
+        Start the primary provider; if it hasn't answered within the hedge delay,
+        also start the secondary and use whichever valid response arrives first,
+        cancelling the other request.
+        """
+        primary_name, primary_fetch = primary
+        secondary_name, secondary_fetch = secondary
+        tasks = {
+            asyncio.create_task(self._call_provider(primary_name, primary_fetch, birth_data)): primary_name
+        }
+        raced = False
+        degraded = (None, None)  # parse-fallback chart, used only if nothing better arrives
+        
+        try:
+            pending = set(tasks)
+            done, pending = await asyncio.wait(pending, timeout=self._hedge_delay(primary_name))
+            
+            if not done or not self._is_provider_data(next(iter(done)).result()):
+                if done:
+                    print(f"Provider {primary_name} failed, trying {secondary_name}...")
+                else:
+                    self.hedges_fired += 1
+                    raced = True
+                    print(f"Provider {primary_name} slow, hedging with {secondary_name}...")
+                    for name in (primary_name, secondary_name):
+                        provider_metrics.get(name).races += 1
+                secondary_task = asyncio.create_task(
+                    self._call_provider(secondary_name, secondary_fetch, birth_data)
+                )
+                tasks[secondary_task] = secondary_name
+                pending.add(secondary_task)
+            
+            while True:
+                for task in done:
+                    result = task.result()
+                    if self._is_provider_data(result):
+                        name = tasks[task]
+                        provider_metrics.get(name).served += 1
+                        if raced:
+                            provider_metrics.get(name).wins += 1
+                        print(f"Successfully retrieved data from {name}")
+                        return result, name
+                    if result and not degraded[0]:
+                        degraded = (result, tasks[task])
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            
+            return degraded
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def get_birth_charts_batch(self, timestamps, latitudes, longitudes, zodiac: str = None,
+                               house_system: str = None) -> ephemeris_batch.ChartBatch:
+        """
+        Compute charts for arrays of UTC instants (datetime64 or Unix seconds) and
+        coordinates with the vectorized local ephemeris. Returns columnar results;
+        BirthChart objects are built lazily via .chart(i).
+        """
+        return ephemeris_batch.compute_charts(
+            ephemeris_batch.to_julian_days(timestamps),
+            latitudes,
+            longitudes,
+            zodiac or local_ephemeris_service.zodiac,
+            house_system or local_ephemeris_service.house_system
+        )
+    
+    def _annotate_aspects(self, response: Optional[AstroResponse]):
+        """Replace provider aspects with the locally computed, ranked aspects and patterns"""
+        if response is None or not settings.ASPECT_ENGINE_ENABLED:
+            return
+        try:
+            aspect_engine.annotate(response.birth_chart)
+        except Exception as e:
+            print(f"Error computing aspects, keeping provider aspects: {e}")
+    
+    def _is_provider_data(self, response: Optional[AstroResponse]) -> bool:
+        """
+        True if a response holds real provider data rather than a mock/fallback chart
+        (the response parsers substitute mock data when parsing fails)
+        """
+        if response is None:
+            return False
+        raw_data = response.raw_data or {}
+        return not (raw_data.get("mock") or raw_data.get("fallback"))
+    
+    def get_stats(self) -> Dict:
+        """Operational statistics for the astro service"""
+        return {
+            "cache": chart_cache.stats(),
+            "store": persistent_store.stats(),
+            "raw_data": raw_data_store.stats(),
+            "providers": provider_metrics.to_dict(),
+            "circuit_breakers": circuit_breakers.to_dict(),
+            "coalescing": coalescers.to_dict(),
+            "deadlines": deadline_stats.to_dict(),
+            "rate_limits": rate_limits.to_dict(),
+            "prokerala_token": prokerala_service.token_stats(),
+            "ephemeris_table": ephemeris_table.get().info() if ephemeris_table.get() else None,
+            "hedging": {
+                "enabled": settings.ASTRO_HEDGING_ENABLED,
+                "current_delay_ms": round(self._hedge_delay("astroapi") * 1000, 1),
+                "hedges_fired": self.hedges_fired
+            }
+        }
     
     async def _try_primary_api(self, birth_data: BirthDataRequest) -> Optional[AstroResponse]:
         """
@@ -62,11 +344,15 @@ class AstroService:
             }
             
             print(f"Making primary API call to {self.base_url}/birth-chart")
-            response = requests.post(f"{self.base_url}/birth-chart", 
-                                   json=payload, headers=headers)
+            client = http_clients.get_client("astroapi")
+            response = await client.post(f"{self.base_url}/birth-chart", 
+                                         json=payload, headers=headers)
             
             if response.status_code == 200:
                 return self._parse_api_response(response.json())
+            elif response.status_code == 429:
+                rate_limits.get("astroapi").record_throttled(response.headers.get("Retry-After"))
+                return None
             else:
                 print(f"Primary API call failed with status {response.status_code}: {response.text}")
                 return None
@@ -85,6 +371,12 @@ class AstroService:
             print(f"Error calling secondary API: {e}")
             return None
     
+    async def _try_local_ephemeris(self, birth_data: BirthDataRequest) -> Optional[AstroResponse]:
+        """
+        Compute the chart offline with the local ephemeris
+        """
+        return await local_ephemeris_service.get_birth_chart(birth_data)
+    
     def _get_mock_chart_data(self, birth_data: BirthDataRequest) -> AstroResponse:
         """Mock birth chart data for development"""
         planets = [
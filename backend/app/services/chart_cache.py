@@ -0,0 +1,112 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+from app.schemas.astro import BirthDataRequest, AstroResponse
+from app.services.geo_service import parse_local_datetime
+
+def birth_data_fingerprint(birth_data: BirthDataRequest, precision: Optional[int] = None) -> str:
+    """
+    Content-addressed key for a birth chart.
+
+    Only the fields that determine the chart are used (date, time, coordinates and
+    timezone); `name` and `birth_place` are left out. Coordinates are rounded so
+    tiny geocoding differences still hit the same entry.
+    """
+    if precision is None:
+        precision = settings.CHART_CACHE_COORD_PRECISION
+
+    try:
+        date = datetime.strptime(birth_data.birth_date.strip(), "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        date = birth_data.birth_date.strip()
+    try:
+        # Seconds are part of the key only when set, so "14:30" and "14:30:00" share an entry
+        local = parse_local_datetime("2000-01-01", birth_data.birth_time)
+        time_of_day = local.strftime("%H:%M:%S" if local.second else "%H:%M")
+    except ValueError:
+        time_of_day = birth_data.birth_time.strip()
+
+    latitude = round(float(birth_data.latitude), precision)
+    longitude = round(float(birth_data.longitude), precision)
+    canonical = "|".join([
+        date,
+        time_of_day,
+        f"{latitude:.{precision}f}",
+        f"{longitude:.{precision}f}",
+        birth_data.timezone.strip()
+    ])
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class ChartCache:
+    """
+    Bounded in-memory LRU cache of provider birth charts with a TTL.
+
+    Entries remember which provider produced them. Only real provider data should
+    be stored here; mock/fallback charts are rejected by the caller.
+    """
+
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None):
+        self.max_entries = max_entries if max_entries is not None else settings.CHART_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.CHART_CACHE_TTL_SECONDS
+        # fingerprint -> (stored_at, provider, response)
+        self._entries: "OrderedDict[str, Tuple[float, str, AstroResponse]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.hits_by_provider: Dict[str, int] = {}
+
+    def get(self, fingerprint: str) -> Optional[Tuple[str, AstroResponse]]:
+        """Return (provider, response) for a fingerprint, or None on a miss"""
+        entry = self._entries.get(fingerprint)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, provider, response = entry
+        if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[fingerprint]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(fingerprint)
+        self.hits += 1
+        self.hits_by_provider[provider] = self.hits_by_provider.get(provider, 0) + 1
+        return provider, response
+
+    def set(self, fingerprint: str, response: AstroResponse, provider: str):
+        """Store a provider response, evicting the least recently used entries if full"""
+        if self.max_entries <= 0:
+            return
+        self._entries[fingerprint] = (time.monotonic(), provider, response)
+        self._entries.move_to_end(fingerprint)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        entries_by_provider: Dict[str, int] = {}
+        for _, provider, _ in self._entries.values():
+            entries_by_provider[provider] = entries_by_provider.get(provider, 0) + 1
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries_by_provider": entries_by_provider,
+            "hits_by_provider": dict(self.hits_by_provider)
+        }
+
+chart_cache = ChartCache()
@@ -0,0 +1,177 @@
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker for one upstream provider.
+
+    The breaker opens when the error rate or slow-call rate over a rolling window
+    crosses its threshold. While open, requests fail fast. After the cooldown a
+    probe (if one is registered) or a single live trial request decides whether
+    the breaker closes again.
+    """
+
+    def __init__(self, name: str, probe: Optional[Callable[[], Awaitable[bool]]] = None):
+        self.name = name
+        self.probe = probe
+        self.state = CircuitState.CLOSED
+        self.opened_at = 0.0
+        self.last_transition_reason = ""
+        self._outcomes = deque(maxlen=settings.CB_WINDOW_SIZE)  # (success, slow)
+        self._trial_in_flight = False
+        self.rejected = 0
+        self.probes = 0
+        self.transitions: Dict[str, int] = {}
+
+    def is_available(self) -> bool:
+        """Side-effect free check used for routing: False while the breaker would reject"""
+        if not settings.CB_ENABLED:
+            return True
+        if self.state == CircuitState.OPEN:
+            return time.monotonic() - self.opened_at >= settings.CB_OPEN_SECONDS
+        if self.state == CircuitState.HALF_OPEN:
+            return not self._trial_in_flight
+        return True
+
+    def allow_request(self) -> bool:
+        """True if a request may go to the provider now"""
+        if not settings.CB_ENABLED:
+            return True
+
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self.opened_at < settings.CB_OPEN_SECONDS:
+                self.rejected += 1
+                return False
+            self._transition(CircuitState.HALF_OPEN, "cooldown elapsed")
+
+        if self.state == CircuitState.HALF_OPEN:
+            if self._trial_in_flight:
+                self.rejected += 1
+                return False
+            self._trial_in_flight = True
+
+        return True
+
+    def record(self, success: bool, latency_ms: float):
+        """Record the outcome of a request that allow_request() let through"""
+        slow = latency_ms > settings.CB_SLOW_CALL_MS
+
+        if self.state == CircuitState.HALF_OPEN:
+            self._trial_in_flight = False
+            if success and not slow:
+                self._transition(CircuitState.CLOSED, "trial request succeeded")
+            else:
+                self._open("trial request failed" if not success else "trial request too slow")
+            return
+
+        self._outcomes.append((success, slow))
+        if self.state != CircuitState.CLOSED or len(self._outcomes) < settings.CB_MIN_CALLS:
+            return
+
+        total = len(self._outcomes)
+        error_rate = sum(1 for ok, _ in self._outcomes if not ok) / total
+        slow_rate = sum(1 for _, is_slow in self._outcomes if is_slow) / total
+        if error_rate >= settings.CB_ERROR_RATE_THRESHOLD:
+            self._open(f"error rate {error_rate:.0%} over last {total} calls")
+        elif slow_rate >= settings.CB_SLOW_CALL_RATE_THRESHOLD:
+            self._open(f"slow-call rate {slow_rate:.0%} over last {total} calls")
+
+    def release(self):
+        """Give back a half-open trial slot for a request that never completed (e.g. cancelled)"""
+        self._trial_in_flight = False
+
+    async def probe_if_due(self):
+        """Run the background health probe once the open cooldown has elapsed"""
+        if self.state != CircuitState.OPEN or self.probe is None:
+            return
+        if time.monotonic() - self.opened_at < settings.CB_OPEN_SECONDS:
+            return
+
+        self.probes += 1
+        try:
+            healthy = await self.probe()
+        except Exception as e:
+            print(f"Circuit breaker probe for {self.name} raised: {e}")
+            healthy = False
+
+        if healthy:
+            self._transition(CircuitState.CLOSED, "background probe succeeded")
+        else:
+            self._open("background probe failed")
+
+    def _open(self, reason: str):
+        self.opened_at = time.monotonic()
+        self._transition(CircuitState.OPEN, reason)
+
+    def _transition(self, new_state: CircuitState, reason: str):
+        if new_state == CircuitState.CLOSED:
+            self._outcomes.clear()
+        if new_state == self.state:
+            self.last_transition_reason = reason
+            return
+        key = f"{self.state.value}->{new_state.value}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        print(f"Circuit breaker {self.name}: {key} ({reason})")
+        self.state = new_state
+        self.last_transition_reason = reason
+
+    def to_dict(self) -> Dict:
+        total = len(self._outcomes)
+        return {
+            "state": self.state.value,
+            "last_transition_reason": self.last_transition_reason,
+            "open_for_seconds": round(time.monotonic() - self.opened_at, 1) if self.state == CircuitState.OPEN else 0,
+            "window_calls": total,
+            "window_error_rate": round(sum(1 for ok, _ in self._outcomes if not ok) / total, 4) if total else 0.0,
+            "rejected": self.rejected,
+            "probes": self.probes,
+            "transitions": dict(self.transitions)
+        }
+
+class CircuitBreakerRegistry:
+    """Per-provider breakers plus the background task that runs their probes"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._monitor_task: Optional[asyncio.Task] = None
+
+    def get(self, name: str) -> CircuitBreaker:
+        if name not in self._breakers:
+            self._breakers[name] = CircuitBreaker(name)
+        return self._breakers[name]
+
+    def register_probe(self, name: str, probe: Callable[[], Awaitable[bool]]):
+        self.get(name).probe = probe
+
+    async def start(self):
+        if settings.CB_ENABLED and self._monitor_task is None:
+            self._monitor_task = asyncio.create_task(self._monitor())
+
+    async def stop(self):
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            try:
+                await self._monitor_task
+            except asyncio.CancelledError:
+                pass
+            self._monitor_task = None
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(settings.CB_PROBE_INTERVAL_SECONDS)
+            for breaker in list(self._breakers.values()):
+                await breaker.probe_if_due()
+
+    def to_dict(self) -> Dict:
+        return {name: breaker.to_dict() for name, breaker in self._breakers.items()}
+
+circuit_breakers = CircuitBreakerRegistry()
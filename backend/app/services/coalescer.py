@@ -0,0 +1,63 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+class RequestCoalescer:
+    """
+    Shares one in-flight computation among concurrent identical requests.
+
+    The first caller for a key starts the work as its own task; callers arriving
+    while it runs await the same task. Callers await it through asyncio.shield,
+    so a disconnecting caller (cancelled request) never cancels the shared work
+    for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.create_task(work())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesce_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+            "in_flight": len(self._in_flight)
+        }
+
+class CoalescerRegistry:
+    """Named coalescers, one per kind of computation"""
+
+    def __init__(self):
+        self._coalescers: Dict[str, RequestCoalescer] = {}
+
+    def get(self, name: str) -> RequestCoalescer:
+        if name not in self._coalescers:
+            self._coalescers[name] = RequestCoalescer(name)
+        return self._coalescers[name]
+
+    def to_dict(self) -> Dict:
+        return {name: coalescer.stats() for name, coalescer in self._coalescers.items()}
+
+coalescers = CoalescerRegistry()
@@ -0,0 +1,74 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Monotonic instant by which the current request must be answered (None = no deadline).
+# Tasks created while handling the request copy it, so it follows the work into
+# coalesced fetches, hedged provider calls and the LLM fan-out.
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """Too little of the request's time budget is left to start an upstream call"""
+
+@contextmanager
+def request_deadline(seconds: Optional[float]):
+    """
+    Run the block under a deadline `seconds` from now. An enclosing deadline that
+    is sooner still applies; None or a non-positive value adds no deadline.
+    """
+    current = _deadline.get()
+    deadline = current
+    if seconds is not None and seconds > 0:
+        candidate = time.monotonic() + seconds
+        deadline = candidate if current is None else min(current, candidate)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+@contextmanager
+def no_deadline():
+    """Run the block without a deadline (background work started by a request)"""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None if there is none"""
+    deadline = _deadline.get()
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+def deadline_bucket(resolution: float = 1.0) -> str:
+    """
+    The current deadline rounded to `resolution` seconds, for keys of work shared
+    between requests: callers in the same bucket have deadlines at most that far apart
+    """
+    deadline = _deadline.get()
+    return "none" if deadline is None else str(int(deadline // resolution))
+
+def hop_timeout(default: float) -> float:
+    """Timeout for one upstream call: its own limit, capped by the remaining budget"""
+    left = remaining()
+    return default if left is None else min(default, left)
+
+class DeadlineStats:
+    """Upstream calls skipped or cut short because the request deadline was near"""
+
+    def __init__(self):
+        self.skipped: Dict[str, int] = {}
+        self.timed_out: Dict[str, int] = {}
+
+    def record_skipped(self, hop: str):
+        self.skipped[hop] = self.skipped.get(hop, 0) + 1
+
+    def record_timed_out(self, hop: str):
+        self.timed_out[hop] = self.timed_out.get(hop, 0) + 1
+
+    def to_dict(self) -> Dict:
+        return {"skipped": dict(self.skipped), "timed_out": dict(self.timed_out)}
+
+deadline_stats = DeadlineStats()
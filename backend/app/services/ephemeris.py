@@ -0,0 +1,369 @@
+"""
+Truncated analytical ephemeris for the Sun, Moon and planets.
+
+Positions come from slowly varying mean orbital elements plus the dominant
+periodic perturbation terms (the Moon's evection, variation, yearly equation,
+etc. and the Jupiter/Saturn great inequality), following the simplified theory
+popularised by Paul Schlyter. Accuracy is roughly 1-2 arcminutes for the
+planets and a few arcminutes for the Moon between 1900 and 2100, far below the
+precision a birth chart is read at.
+
+All longitudes are geocentric, ecliptic and tropical (equinox of date) in degrees.
+"""
+import math
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+
+ZODIAC_SIGNS = [
+    "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+    "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
+]
+
+PLANETS = ["Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto"]
+
+# Bodies that can never appear retrograde from Earth
+NEVER_RETROGRADE = {"Sun", "Moon"}
+
+# Mean orbital elements as (constant, rate per day) pairs:
+# N (ascending node), i (inclination), w (argument of perihelion),
+# a (semi-major axis, AU), e (eccentricity), M (mean anomaly)
+ORBITAL_ELEMENTS = {
+    "Mercury": ((48.3313, 3.24587e-5), (7.0047, 5.00e-8), (29.1241, 1.01444e-5),
+                (0.387098, 0.0), (0.205635, 5.59e-10), (168.6562, 4.0923344368)),
+    "Venus": ((76.6799, 2.46590e-5), (3.3946, 2.75e-8), (54.8910, 1.38374e-5),
+              (0.723330, 0.0), (0.006773, -1.302e-9), (48.0052, 1.6021302244)),
+    "Mars": ((49.5574, 2.11081e-5), (1.8497, -1.78e-8), (286.5016, 2.92961e-5),
+             (1.523688, 0.0), (0.093405, 2.516e-9), (18.6021, 0.5240207766)),
+    "Jupiter": ((100.4542, 2.76854e-5), (1.3030, -1.557e-7), (273.8777, 1.64505e-5),
+                (5.20256, 0.0), (0.048498, 4.469e-9), (19.8950, 0.0830853001)),
+    "Saturn": ((113.6634, 2.38980e-5), (2.4886, -1.081e-7), (339.3939, 2.97661e-5),
+               (9.55475, 0.0), (0.055546, -9.499e-9), (316.9670, 0.0334442282)),
+    "Uranus": ((74.0005, 1.3978e-5), (0.7733, 1.9e-8), (96.6612, 3.0565e-5),
+               (19.18171, -1.55e-8), (0.047318, 7.45e-9), (142.5905, 0.011725806)),
+    "Neptune": ((131.7806, 3.0173e-5), (1.7700, -2.55e-7), (272.8461, -6.027e-6),
+                (30.05826, 3.313e-8), (0.008606, 2.15e-9), (260.2471, 0.005995147)),
+}
+
+# Step used to estimate apparent motion (and so retrograde status)
+MOTION_STEP_DAYS = 0.25
+
+# Lahiri ayanamsa at J2000.0 and its precession rate (degrees per Julian century)
+LAHIRI_AYANAMSA_J2000 = 23.85306
+PRECESSION_PER_CENTURY = 1.39697
+
+_RAD = math.pi / 180.0
+_DEG = 180.0 / math.pi
+
+# Math namespace for scalar evaluation. Every series below is written against an
+# `xp` namespace (sin, cos, tan, atan2, hypot, sqrt, clip) so the same code also
+# runs element-wise over NumPy arrays for batch evaluation (see ephemeris_batch).
+SCALAR_MATH = SimpleNamespace(
+    sin=math.sin, cos=math.cos, tan=math.tan, atan2=math.atan2,
+    hypot=math.hypot, sqrt=math.sqrt,
+    clip=lambda value, low, high: max(low, min(high, value))
+)
+
+def julian_day(year: int, month: int, day: int, hour_utc: float = 0.0) -> float:
+    """Julian Day for a proleptic Gregorian UTC date and fractional hour"""
+    if month <= 2:
+        year -= 1
+        month += 12
+    a = year // 100
+    b = 2 - a + a // 4
+    return (math.floor(365.25 * (year + 4716)) + math.floor(30.6001 * (month + 1))
+            + day + b - 1524.5 + hour_utc / 24.0)
+
+def _day_number(jd: float) -> float:
+    """Days since 2000 Jan 0.0 UT, the time argument of the element tables"""
+    return jd - 2451543.5
+
+def _sin(deg, xp=SCALAR_MATH):
+    return xp.sin(deg * _RAD)
+
+def _cos(deg, xp=SCALAR_MATH):
+    return xp.cos(deg * _RAD)
+
+def _eccentric_anomaly(mean_anomaly, e, xp=SCALAR_MATH):
+    """
+    Solve Kepler's equation (degrees in, radians out). The third-order starting
+    value plus two Newton steps converges to ~1e-10 rad for every e used here.
+    """
+    m = mean_anomaly * _RAD
+    ecc = m + e * xp.sin(m) * (1.0 + e * xp.cos(m))
+    for _ in range(2):
+        ecc -= (ecc - e * xp.sin(ecc) - m) / (1.0 - e * xp.cos(ecc))
+    return ecc
+
+def _sun(d, xp=SCALAR_MATH) -> Tuple:
+    """Geocentric ecliptic (longitude, distance, mean anomaly) of the Sun"""
+    w = 282.9404 + 4.70935e-5 * d
+    e = 0.016709 - 1.151e-9 * d
+    m = (356.0470 + 0.9856002585 * d) % 360.0
+    ecc = _eccentric_anomaly(m, e, xp)
+    xv = xp.cos(ecc) - e
+    yv = xp.sqrt(1.0 - e * e) * xp.sin(ecc)
+    v = xp.atan2(yv, xv) * _DEG
+    return (v + w) % 360.0, xp.hypot(xv, yv), m
+
+def _moon(d, sun_mean_anomaly, xp=SCALAR_MATH):
+    """Geocentric ecliptic longitude of the Moon including the main perturbations"""
+    n = 125.1228 - 0.0529538083 * d
+    i = 5.1454
+    w = 318.0634 + 0.1643573223 * d
+    e = 0.054900
+    m = (115.3654 + 13.0649929509 * d) % 360.0
+
+    ecc = _eccentric_anomaly(m, e, xp)
+    xv = xp.cos(ecc) - e
+    yv = xp.sqrt(1.0 - e * e) * xp.sin(ecc)
+    v = xp.atan2(yv, xv) * _DEG
+    cos_n, sin_n = _cos(n, xp), _sin(n, xp)
+    cos_vw, sin_vw = _cos(v + w, xp), _sin(v + w, xp)
+    cos_i = _cos(i, xp)
+    xh = cos_n * cos_vw - sin_n * sin_vw * cos_i
+    yh = sin_n * cos_vw + cos_n * sin_vw * cos_i
+    lon = xp.atan2(yh, xh) * _DEG
+
+    ms = sun_mean_anomaly
+    ls = ms + 282.9404 + 4.70935e-5 * d
+    lm = m + w + n
+    dd = lm - ls
+    f = lm - n
+    lon += (-1.274 * _sin(m - 2 * dd, xp)
+            + 0.658 * _sin(2 * dd, xp)
+            - 0.186 * _sin(ms, xp)
+            - 0.059 * _sin(2 * m - 2 * dd, xp)
+            - 0.057 * _sin(m - 2 * dd + ms, xp)
+            + 0.053 * _sin(m + 2 * dd, xp)
+            + 0.046 * _sin(2 * dd - ms, xp)
+            + 0.041 * _sin(m - ms, xp)
+            - 0.035 * _sin(dd, xp)
+            - 0.031 * _sin(m + ms, xp)
+            - 0.015 * _sin(2 * f - 2 * dd, xp)
+            + 0.011 * _sin(m - 4 * dd, xp))
+    return lon % 360.0
+
+def _heliocentric(name: str, d, xp=SCALAR_MATH) -> Tuple:
+    """Heliocentric ecliptic rectangular coordinates (AU) of a planet"""
+    elements = ORBITAL_ELEMENTS[name]
+    n, i, w, a, e, m = (c + rate * d for c, rate in elements)
+    ecc = _eccentric_anomaly(m % 360.0, e, xp)
+    xv = a * (xp.cos(ecc) - e)
+    yv = a * xp.sqrt(1.0 - e * e) * xp.sin(ecc)
+    v = xp.atan2(yv, xv) * _DEG
+    r = xp.hypot(xv, yv)
+    cos_n, sin_n = _cos(n, xp), _sin(n, xp)
+    cos_vw, sin_vw = _cos(v + w, xp), _sin(v + w, xp)
+    cos_i, sin_i = _cos(i, xp), _sin(i, xp)
+    return (r * (cos_n * cos_vw - sin_n * sin_vw * cos_i),
+            r * (sin_n * cos_vw + cos_n * sin_vw * cos_i),
+            r * sin_vw * sin_i)
+
+def _outer_planet_perturbation(name: str, d, xp=SCALAR_MATH):
+    """Longitude correction (degrees) from the mutual Jupiter/Saturn/Uranus perturbations"""
+    mj = 19.8950 + 0.0830853001 * d
+    ms = 316.9670 + 0.0334442282 * d
+    if name == "Jupiter":
+        return (-0.332 * _sin(2 * mj - 5 * ms - 67.6, xp)
+                - 0.056 * _sin(2 * mj - 2 * ms + 21, xp)
+                + 0.042 * _sin(3 * mj - 5 * ms + 21, xp)
+                - 0.036 * _sin(mj - 2 * ms, xp)
+                + 0.022 * _cos(mj - ms, xp)
+                + 0.023 * _sin(2 * mj - 3 * ms + 52, xp)
+                - 0.016 * _sin(mj - 5 * ms - 69, xp))
+    if name == "Saturn":
+        return (0.812 * _sin(2 * mj - 5 * ms - 67.6, xp)
+                - 0.229 * _cos(2 * mj - 4 * ms - 2, xp)
+                + 0.119 * _sin(mj - 2 * ms - 3, xp)
+                + 0.046 * _sin(2 * mj - 6 * ms - 69, xp)
+                + 0.014 * _sin(mj - 3 * ms + 32, xp))
+    if name == "Uranus":
+        mu = 142.5905 + 0.011725806 * d
+        return (0.040 * _sin(ms - 2 * mu + 6, xp)
+                + 0.035 * _sin(ms - 3 * mu + 33, xp)
+                - 0.015 * _sin(mj - mu + 20, xp))
+    return 0.0
+
+def _pluto_heliocentric(d, xp=SCALAR_MATH) -> Tuple:
+    """Heliocentric ecliptic rectangular coordinates of Pluto from a fitted periodic series"""
+    s = 50.03 + 0.033459652 * d
+    p = 238.95 + 0.003968789 * d
+    # sin(kP), cos(kP) for k = 1..6 by the angle-addition recurrence
+    sp = [0.0, _sin(p, xp)]
+    cp = [1.0, _cos(p, xp)]
+    for k in range(2, 7):
+        sp.append(sp[k - 1] * cp[1] + cp[k - 1] * sp[1])
+        cp.append(cp[k - 1] * cp[1] - sp[k - 1] * sp[1])
+    sin_sp, cos_sp = _sin(s - p, xp), _cos(s - p, xp)
+
+    lon = (238.9508 + 0.00400703 * d
+           - 19.799 * sp[1] + 19.848 * cp[1]
+           + 0.897 * sp[2] - 4.956 * cp[2]
+           + 0.610 * sp[3] + 1.211 * cp[3]
+           - 0.341 * sp[4] - 0.190 * cp[4]
+           + 0.128 * sp[5] - 0.034 * cp[5]
+           - 0.038 * sp[6] + 0.031 * cp[6]
+           + 0.020 * sin_sp - 0.010 * cos_sp)
+    lat = (-3.9082
+           - 5.453 * sp[1] - 14.975 * cp[1]
+           + 3.527 * sp[2] + 1.673 * cp[2]
+           - 1.051 * sp[3] + 0.328 * cp[3]
+           + 0.179 * sp[4] - 0.292 * cp[4]
+           + 0.019 * sp[5] + 0.100 * cp[5]
+           - 0.031 * sp[6] - 0.026 * cp[6]
+           + 0.011 * cos_sp)
+    r = (40.72
+         + 6.68 * sp[1] + 6.90 * cp[1]
+         - 1.18 * sp[2] - 0.03 * cp[2]
+         + 0.15 * sp[3] - 0.14 * cp[3])
+    # The series is referred to the J2000.0 equinox; precess to the equinox of date
+    lon += 3.82394e-5 * d
+    cos_lat = _cos(lat, xp)
+    return (r * _cos(lon, xp) * cos_lat, r * _sin(lon, xp) * cos_lat, r * _sin(lat, xp))
+
+def geocentric_longitudes(jd, xp=SCALAR_MATH, include_luminaries: bool = True) -> Dict:
+    """
+    Tropical geocentric ecliptic longitudes at a Julian Day (UT): all ten bodies,
+    or only Mercury through Pluto with include_luminaries=False
+    """
+    d = _day_number(jd)
+    sun_lon, sun_r, sun_m = _sun(d, xp)
+    xs = sun_r * _cos(sun_lon, xp)
+    ys = sun_r * _sin(sun_lon, xp)
+
+    longitudes = {}
+    if include_luminaries:
+        longitudes["Sun"] = sun_lon
+        longitudes["Moon"] = _moon(d, sun_m, xp)
+    for name in ("Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune"):
+        xh, yh, _ = _heliocentric(name, d, xp)
+        if name in ("Jupiter", "Saturn", "Uranus"):
+            # Apply the perturbations to the heliocentric longitude
+            lon = xp.atan2(yh, xh) * _DEG + _outer_planet_perturbation(name, d, xp)
+            r_xy = xp.hypot(xh, yh)
+            xh, yh = r_xy * _cos(lon, xp), r_xy * _sin(lon, xp)
+        longitudes[name] = (xp.atan2(yh + ys, xh + xs) * _DEG) % 360.0
+
+    xh, yh, _ = _pluto_heliocentric(d, xp)
+    longitudes["Pluto"] = (xp.atan2(yh + ys, xh + xs) * _DEG) % 360.0
+    return longitudes
+
+def obliquity(jd: float) -> float:
+    """Mean obliquity of the ecliptic in degrees"""
+    return 23.4393 - 3.563e-7 * _day_number(jd)
+
+def local_sidereal_time(jd: float, longitude: float) -> float:
+    """Local mean sidereal time in degrees (the right ascension of the meridian)"""
+    gmst = 280.46061837 + 360.98564736629 * (jd - 2451545.0)
+    return (gmst + longitude) % 360.0
+
+def ascendant_and_midheaven(jd, latitude, longitude, xp=SCALAR_MATH) -> Tuple:
+    """Tropical ecliptic longitudes of the ascendant and midheaven"""
+    ramc = local_sidereal_time(jd, longitude)
+    eps = obliquity(jd)
+    mc = xp.atan2(_sin(ramc, xp), _cos(ramc, xp) * _cos(eps, xp)) * _DEG
+    # Clamp the latitude to keep tan() finite at the poles
+    lat = xp.clip(latitude, -89.9, 89.9)
+    asc = xp.atan2(-_cos(ramc, xp), _sin(eps, xp) * xp.tan(lat * _RAD) + _cos(eps, xp) * _sin(ramc, xp)) * _DEG + 180.0
+    return asc % 360.0, mc % 360.0
+
+def house_cusps(ascendant: float, midheaven: float, system: str = "porphyry") -> List[float]:
+    """
+    Longitudes of the twelve house cusps.
+
+    Supported systems: "porphyry" (each quadrant between the angles trisected),
+    "equal" (30° houses from the ascendant) and "whole_sign".
+    """
+    if system == "whole_sign":
+        first = math.floor(ascendant / 30.0) * 30.0
+        return [(first + 30.0 * k) % 360.0 for k in range(12)]
+    if system == "equal":
+        return [(ascendant + 30.0 * k) % 360.0 for k in range(12)]
+
+    ic = (midheaven + 180.0) % 360.0
+    upper = (ascendant - midheaven) % 360.0  # MC -> ASC (houses 10-12)
+    lower = (ic - ascendant) % 360.0         # ASC -> IC (houses 1-3)
+    cusps = [0.0] * 12
+    cusps[0] = ascendant
+    cusps[1] = ascendant + lower / 3.0
+    cusps[2] = ascendant + 2.0 * lower / 3.0
+    cusps[3] = ic
+    cusps[9] = midheaven
+    cusps[10] = midheaven + upper / 3.0
+    cusps[11] = midheaven + 2.0 * upper / 3.0
+    for k in (4, 5, 6, 7, 8):
+        cusps[k] = cusps[k - 6] + 180.0
+    return [c % 360.0 for c in cusps]
+
+def house_of(longitude: float, cusps: List[float]) -> int:
+    """1-based house containing an ecliptic longitude"""
+    for k in range(12):
+        start = cusps[k]
+        span = (cusps[(k + 1) % 12] - start) % 360.0
+        if (longitude - start) % 360.0 < span:
+            return k + 1
+    return 1
+
+def lahiri_ayanamsa(jd: float) -> float:
+    """Lahiri (Chitrapaksha) ayanamsa in degrees"""
+    return LAHIRI_AYANAMSA_J2000 + PRECESSION_PER_CENTURY * (jd - 2451545.0) / 36525.0
+
+def sign_of(longitude: float) -> Tuple[str, float]:
+    """Zodiac sign and degree within the sign for an ecliptic longitude"""
+    longitude %= 360.0
+    index = int(longitude // 30.0) % 12
+    return ZODIAC_SIGNS[index], longitude - 30.0 * index
+
+def longitudes_and_speeds(jd: float) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Tropical longitudes of all ten bodies and the apparent daily motion of the
+    planets (Sun and Moon have no speed entry: they are never retrograde)
+    """
+    positions = geocentric_longitudes(jd)
+    # Apparent motion over the following hours
+    after = geocentric_longitudes(jd + MOTION_STEP_DAYS, include_luminaries=False)
+    speeds = {
+        name: ((after[name] - positions[name] + 180.0) % 360.0 - 180.0) / MOTION_STEP_DAYS
+        for name in after
+    }
+    return positions, speeds
+
+def compute_chart(jd: float, latitude: float, longitude: float,
+                  zodiac: str = "tropical", house_system: str = "porphyry",
+                  motion: Tuple[Dict[str, float], Dict[str, float]] = None) -> Dict:
+    """
+    Full chart at a Julian Day (UT): planet longitudes with retrograde flags,
+    ascendant, midheaven and house cusps, in the requested zodiac.
+
+    `motion` optionally supplies precomputed (longitudes, speeds) as returned
+    by longitudes_and_speeds, e.g. interpolated from the ephemeris table.
+    """
+    positions, speeds = motion or longitudes_and_speeds(jd)
+    asc, mc = ascendant_and_midheaven(jd, latitude, longitude)
+
+    offset = lahiri_ayanamsa(jd) if zodiac == "sidereal" else 0.0
+    asc = (asc - offset) % 360.0
+    mc = (mc - offset) % 360.0
+    cusps = house_cusps(asc, mc, house_system)
+
+    planets = {}
+    for name in PLANETS:
+        lon = (positions[name] - offset) % 360.0
+        speed = speeds.get(name)
+        planets[name] = {
+            "longitude": lon,
+            "speed": speed,
+            "retrograde": speed is not None and speed < 0,
+            "house": house_of(lon, cusps)
+        }
+
+    return {
+        "julian_day": jd,
+        "zodiac": zodiac,
+        "ayanamsa": offset,
+        "house_system": house_system,
+        "ascendant": asc,
+        "midheaven": mc,
+        "house_cusps": cusps,
+        "planets": planets
+    }
@@ -0,0 +1,227 @@
+"""
+Vectorized chart computation for bulk jobs (backfills, cohort analytics, re-scoring).
+
+Evaluates the same series as `ephemeris` element-wise over NumPy arrays and
+returns columnar results. `BirthChart` objects are only built when asked for.
+"""
+from types import SimpleNamespace
+from typing import Dict, Iterator, Optional
+import numpy as np
+from app.schemas.astro import BirthChart, PlanetPosition
+from app.services import ephemeris
+from app.services.aspect_engine import AspectBatch, aspect_engine
+from app.services.ephemeris_table import ephemeris_table
+
+_TWO_PI = 2.0 * np.pi
+
+def _reduce(radians) -> np.ndarray:
+    """Reduce angles to [0, 2pi) in float64, then narrow to float32"""
+    radians = np.asarray(radians, dtype=np.float64)
+    return (radians - _TWO_PI * np.floor(radians / _TWO_PI)).astype(np.float32)
+
+def _sin(radians) -> np.ndarray:
+    return np.sin(_reduce(radians)).astype(np.float64)
+
+def _cos(radians) -> np.ndarray:
+    return np.cos(_reduce(radians)).astype(np.float64)
+
+# sin/cos are evaluated in float32 after an exact float64 range reduction: NumPy
+# vectorizes float32 trig with SIMD (an order of magnitude faster than float64)
+# and the ~1e-7 relative error is ~1e-5 degrees, far inside the theory's error.
+# Everything else stays float64.
+NUMPY_MATH = SimpleNamespace(
+    sin=_sin, cos=_cos, tan=np.tan, atan2=np.arctan2,
+    hypot=np.hypot, sqrt=np.sqrt, clip=np.clip
+)
+
+_MOVING_BODIES = [name for name in ephemeris.PLANETS if name not in ephemeris.NEVER_RETROGRADE]
+_MOVING_COLUMNS = [ephemeris.PLANETS.index(name) for name in _MOVING_BODIES]
+
+def _wrap(degrees: np.ndarray) -> np.ndarray:
+    """Angles modulo 360 (faster than np.remainder for float arrays)"""
+    return degrees - 360.0 * np.floor(degrees / 360.0)
+
+def to_julian_days(timestamps) -> np.ndarray:
+    """
+    Julian Days (UT) from an array of UTC instants: numpy datetime64 values or
+    Unix timestamps in seconds
+    """
+    values = np.asarray(timestamps)
+    if np.issubdtype(values.dtype, np.datetime64):
+        seconds = values.astype("datetime64[ms]").astype(np.int64) / 1000.0
+    else:
+        seconds = values.astype(np.float64)
+    return seconds / 86400.0 + 2440587.5
+
+def longitude_matrix(jd: np.ndarray) -> np.ndarray:
+    """(N, 10) tropical geocentric longitudes in ephemeris.PLANETS order"""
+    positions = ephemeris.geocentric_longitudes(jd, NUMPY_MATH)
+    return np.column_stack([positions[name] for name in ephemeris.PLANETS])
+
+def speed_matrix(jd: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    (N, 10) apparent motion in degrees/day, same estimate as ephemeris.compute_chart;
+    NaN for the Sun and Moon, which are never retrograde
+    """
+    later = ephemeris.geocentric_longitudes(jd + ephemeris.MOTION_STEP_DAYS, NUMPY_MATH, include_luminaries=False)
+    speeds = np.full(longitudes.shape, np.nan)
+    for name, column in zip(_MOVING_BODIES, _MOVING_COLUMNS):
+        speeds[:, column] = (_wrap(later[name] - longitudes[:, column] + 180.0) - 180.0) / ephemeris.MOTION_STEP_DAYS
+    return speeds
+
+def house_cusps(ascendant: np.ndarray, midheaven: np.ndarray, system: str = "porphyry") -> np.ndarray:
+    """(N, 12) house cusp longitudes; same systems as ephemeris.house_cusps"""
+    steps = 30.0 * np.arange(12)
+    if system == "whole_sign":
+        return _wrap(np.floor(ascendant / 30.0)[:, None] * 30.0 + steps)
+    if system == "equal":
+        return _wrap(ascendant[:, None] + steps)
+
+    ic = _wrap(midheaven + 180.0)
+    upper = _wrap(ascendant - midheaven)
+    lower = _wrap(ic - ascendant)
+    first_half = np.column_stack([
+        ascendant,
+        ascendant + lower / 3.0,
+        ascendant + 2.0 * lower / 3.0,
+        ic,
+        midheaven + 180.0 + upper / 3.0,
+        midheaven + 180.0 + 2.0 * upper / 3.0,
+    ])
+    return _wrap(np.concatenate([first_half, first_half + 180.0], axis=1))
+
+def houses(longitudes: np.ndarray, cusps: np.ndarray) -> np.ndarray:
+    """(N, P) 1-based house numbers for (N, P) longitudes given (N, 12) cusps"""
+    # Measured from the first cusp the cusps are increasing, so the house is the
+    # number of cusps at or before the body
+    relative_cusps = _wrap(cusps - cusps[:, :1])
+    relative_bodies = _wrap(longitudes - cusps[:, :1])
+    result = np.zeros(longitudes.shape, dtype=np.int8)
+    for k in range(12):
+        result += relative_cusps[:, k:k + 1] <= relative_bodies
+    return result
+
+class ChartBatch:
+    """
+    Columnar charts for N births.
+
+    Arrays are indexed [chart] or [chart, body] with bodies in ephemeris.PLANETS
+    order. Use chart(i) / charts() to materialize BirthChart objects lazily.
+    """
+
+    def __init__(self, julian_days: np.ndarray, longitudes: np.ndarray, speeds: np.ndarray,
+                 ascendant: np.ndarray, midheaven: np.ndarray, house_cusps: np.ndarray,
+                 houses: np.ndarray, zodiac: str, house_system: str):
+        self.julian_days = julian_days
+        self.longitudes = longitudes
+        self.speeds = speeds
+        self.ascendant = ascendant
+        self.midheaven = midheaven
+        self.house_cusps = house_cusps
+        self.houses = houses
+        self.zodiac = zodiac
+        self.house_system = house_system
+        self.retrograde = speeds < 0  # NaN (Sun, Moon) compares False
+        self.sign_indices = (longitudes // 30.0).astype(np.int8) % 12
+        self.rising_sign_indices = (ascendant // 30.0).astype(np.int8) % 12
+
+    def __len__(self) -> int:
+        return len(self.julian_days)
+
+    @property
+    def sun_sign_indices(self) -> np.ndarray:
+        return self.sign_indices[:, ephemeris.PLANETS.index("Sun")]
+
+    @property
+    def moon_sign_indices(self) -> np.ndarray:
+        return self.sign_indices[:, ephemeris.PLANETS.index("Moon")]
+
+    def chart(self, i: int) -> BirthChart:
+        """Build the BirthChart for row i"""
+        signs = ephemeris.ZODIAC_SIGNS
+        planets = [
+            PlanetPosition(
+                name=name,
+                sign=signs[self.sign_indices[i, k]],
+                degree=round(float(self.longitudes[i, k] % 30.0), 2),
+                house=int(self.houses[i, k]),
+                retrograde=bool(self.retrograde[i, k])
+            )
+            for k, name in enumerate(ephemeris.PLANETS)
+        ]
+        cusp_signs = (self.house_cusps[i] // 30.0).astype(int) % 12
+        aspects = aspect_engine.compute(self.longitudes[i])
+        return BirthChart(
+            sun_sign=signs[self.sun_sign_indices[i]],
+            moon_sign=signs[self.moon_sign_indices[i]],
+            rising_sign=signs[self.rising_sign_indices[i]],
+            planets=planets,
+            houses={str(k + 1): signs[cusp_signs[k]] for k in range(12)},
+            aspects=aspects.aspects(0),
+            aspect_patterns=aspects.patterns(0)
+        )
+
+    def charts(self) -> Iterator[BirthChart]:
+        for i in range(len(self)):
+            yield self.chart(i)
+
+    def aspects(self) -> AspectBatch:
+        """Aspects and patterns for all rows in one vectorized pass"""
+        return aspect_engine.compute(self.longitudes)
+
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        """Plain column dict, e.g. for writing to storage or a dataframe"""
+        columns = {
+            "julian_day": self.julian_days,
+            "ascendant": self.ascendant,
+            "midheaven": self.midheaven,
+            "rising_sign_index": self.rising_sign_indices,
+        }
+        for k, name in enumerate(ephemeris.PLANETS):
+            key = name.lower()
+            columns[f"{key}_longitude"] = self.longitudes[:, k]
+            columns[f"{key}_sign_index"] = self.sign_indices[:, k]
+            columns[f"{key}_house"] = self.houses[:, k]
+            columns[f"{key}_retrograde"] = self.retrograde[:, k]
+        return columns
+
+def compute_charts(julian_days, latitudes, longitudes, zodiac: str = "tropical",
+                   house_system: str = "porphyry", chunk_size: Optional[int] = 65536) -> ChartBatch:
+    """
+    Vectorized equivalent of ephemeris.compute_chart for arrays of Julian Days
+    and coordinates. Work is done in chunks to bound temporary memory.
+    """
+    jd = np.atleast_1d(np.asarray(julian_days, dtype=np.float64))
+    lat = np.broadcast_to(np.asarray(latitudes, dtype=np.float64), jd.shape)
+    lon = np.broadcast_to(np.asarray(longitudes, dtype=np.float64), jd.shape)
+    n = len(jd)
+    chunk_size = chunk_size or n or 1
+
+    parts = []
+    for start in range(0, max(n, 1), chunk_size):
+        window = slice(start, min(start + chunk_size, n))
+        parts.append(_compute_chunk(jd[window], lat[window], lon[window], zodiac, house_system))
+
+    def stack(index):
+        return np.concatenate([part[index] for part in parts])
+
+    return ChartBatch(stack(0), stack(1), stack(2), stack(3), stack(4), stack(5), stack(6), zodiac, house_system)
+
+def _compute_chunk(jd, lat, lon, zodiac, house_system):
+    table = ephemeris_table.get()
+    if table is not None and table.covers(jd):
+        positions = table.longitude_matrix(jd)
+        speeds = table.speed_matrix(jd, positions)
+    else:
+        positions = longitude_matrix(jd)
+        speeds = speed_matrix(jd, positions)
+    asc, mc = ephemeris.ascendant_and_midheaven(jd, lat, lon, NUMPY_MATH)
+
+    if zodiac == "sidereal":
+        offset = ephemeris.lahiri_ayanamsa(jd)
+        positions = _wrap(positions - offset[:, None])
+        asc = _wrap(asc - offset)
+        mc = _wrap(mc - offset)
+
+    cusps = house_cusps(asc, mc, house_system)
+    return jd, positions, speeds, asc, mc, cusps, houses(positions, cusps)
@@ -0,0 +1,256 @@
+"""
+Precomputed ephemeris table: planetary longitudes sampled on a fixed grid,
+memory-mapped at runtime and interpolated for any instant.
+
+The file is a 64-byte header followed by a row-major float32 array of
+(rows, 10) tropical longitudes in ephemeris.PLANETS order. Because it is
+opened with numpy.memmap, every uvicorn worker shares the same page-cache
+copy and only touches the rows it reads.
+
+Build / verify:
+
+    python -m app.services.ephemeris_table build [--path PATH] [--step DAYS]
+    python -m app.services.ephemeris_table verify [--path PATH] [--samples N]
+"""
+import argparse
+import os
+import struct
+from types import SimpleNamespace
+from typing import Dict, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.services import ephemeris
+
+MAGIC = b"ORACLEPH"
+FORMAT_VERSION = 1
+HEADER_SIZE = 64
+_HEADER = struct.Struct("<8sIIddII")  # magic, version, header size, start JD, step days, rows, bodies
+
+START_JD = ephemeris.julian_day(1900, 1, 1)
+END_JD = ephemeris.julian_day(2101, 1, 1)
+
+_MOVING_COLUMNS = [k for k, name in enumerate(ephemeris.PLANETS) if name not in ephemeris.NEVER_RETROGRADE]
+
+# Full float64 NumPy evaluation used when building (and verifying) the table
+_EXACT_MATH = SimpleNamespace(
+    sin=np.sin, cos=np.cos, tan=np.tan, atan2=np.arctan2,
+    hypot=np.hypot, sqrt=np.sqrt, clip=np.clip
+)
+
+def _direct_longitudes(jd: np.ndarray) -> np.ndarray:
+    positions = ephemeris.geocentric_longitudes(jd, _EXACT_MATH)
+    return np.column_stack([positions[name] for name in ephemeris.PLANETS])
+
+def _wrap180(degrees: np.ndarray) -> np.ndarray:
+    return degrees - 360.0 * np.floor((degrees + 180.0) / 360.0)
+
+def build_table(path: str, step_days: float = 1.0, start_jd: float = START_JD,
+                end_jd: float = END_JD, chunk_rows: int = 65536) -> int:
+    """
+    Write the table to `path` (atomically, via a temp file) and return the row count.
+    One extra sample on each side of the range keeps the cubic stencil inside it.
+    """
+    first_jd = start_jd - step_days
+    rows = int(np.ceil((end_jd - start_jd) / step_days)) + 3
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, HEADER_SIZE, first_jd, step_days, rows, len(ephemeris.PLANETS))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        for start in range(0, rows, chunk_rows):
+            jd = first_jd + step_days * np.arange(start, min(start + chunk_rows, rows))
+            f.write(_direct_longitudes(jd).astype("<f4").tobytes())
+    os.replace(tmp_path, path)
+    return rows
+
+class EphemerisTable:
+    """
+    Read-only view of a table file with cubic (4-point Lagrange) interpolation.
+
+    Longitudes are stored wrapped to [0, 360); each stencil is unwrapped relative
+    to its second sample before interpolating, which is valid because no body
+    moves anywhere near 180 degrees per grid step.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, header_size, first_jd, step_days, rows, bodies = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not an ephemeris table (format v{FORMAT_VERSION})")
+        if bodies != len(ephemeris.PLANETS):
+            raise ValueError(f"{path} has {bodies} bodies, expected {len(ephemeris.PLANETS)}")
+
+        self.first_jd = first_jd
+        self.step_days = step_days
+        self.rows = rows
+        self.data = np.memmap(path, dtype="<f4", mode="r", offset=header_size, shape=(rows, bodies))
+        # Usable range: the cubic stencil needs one sample before and two after
+        self.start_jd = first_jd + step_days
+        self.end_jd = first_jd + (rows - 3) * step_days
+
+    def covers(self, jd) -> bool:
+        jd = np.asarray(jd)
+        return bool(jd.size) and bool(np.all((jd >= self.start_jd) & (jd + ephemeris.MOTION_STEP_DAYS < self.end_jd)))
+
+    def longitude_matrix(self, jd) -> np.ndarray:
+        """(N, 10) interpolated tropical longitudes; jd must be inside the covered range"""
+        t = (np.atleast_1d(np.asarray(jd, dtype=np.float64)) - self.first_jd) / self.step_days
+        base = np.floor(t)
+        u = (t - base)[:, None]
+        index = base.astype(np.int64)
+
+        stencil = self.data[index[:, None] + np.arange(-1, 3)].astype(np.float64)  # (N, 4, bodies)
+        anchor = stencil[:, 1, :]
+        d_before = _wrap180(stencil[:, 0, :] - anchor)
+        d_next = _wrap180(stencil[:, 2, :] - anchor)
+        d_after = _wrap180(stencil[:, 3, :] - anchor)
+
+        # Lagrange weights for nodes -1, 0, 1, 2 (the node-0 term is the anchor itself)
+        w_before = -u * (u - 1.0) * (u - 2.0) / 6.0
+        w_next = -(u + 1.0) * u * (u - 2.0) / 2.0
+        w_after = (u + 1.0) * u * (u - 1.0) / 6.0
+        result = anchor + w_before * d_before + w_next * d_next + w_after * d_after
+        return result - 360.0 * np.floor(result / 360.0)
+
+    def speed_matrix(self, jd, longitudes: np.ndarray) -> np.ndarray:
+        """(N, 10) apparent daily motion, same estimate as ephemeris; NaN for the Sun and Moon"""
+        later = self.longitude_matrix(np.asarray(jd, dtype=np.float64) + ephemeris.MOTION_STEP_DAYS)
+        speeds = np.full(longitudes.shape, np.nan)
+        speeds[:, _MOVING_COLUMNS] = _wrap180(later[:, _MOVING_COLUMNS] - longitudes[:, _MOVING_COLUMNS]) / ephemeris.MOTION_STEP_DAYS
+        return speeds
+
+    def longitudes_and_speeds(self, jd: float) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """
+        Single-instant equivalent of ephemeris.longitudes_and_speeds. Plain Python
+        over a few table rows: for one instant this beats NumPy's per-call overhead.
+        """
+        t = (jd - self.first_jd) / self.step_days
+        base = int(t)
+        rows = self.data[base - 1:base + 3].tolist()
+        now = self._interpolate_row(rows, t - base)
+        # On a fine grid the later instant can be several rows on: read its own stencil
+        later_t = t + ephemeris.MOTION_STEP_DAYS / self.step_days
+        later_base = int(later_t)
+        later_rows = rows if later_base == base else self.data[later_base - 1:later_base + 3].tolist()
+        later = self._interpolate_row(later_rows, later_t - later_base)
+
+        positions = {name: now[k] for k, name in enumerate(ephemeris.PLANETS)}
+        speeds = {}
+        for k in _MOVING_COLUMNS:
+            speeds[ephemeris.PLANETS[k]] = ((later[k] - now[k] + 180.0) % 360.0 - 180.0) / ephemeris.MOTION_STEP_DAYS
+        return positions, speeds
+
+    @staticmethod
+    def _interpolate_row(rows, u: float):
+        """Cubic interpolation at fraction u between rows[1] and rows[2]"""
+        w_before = -u * (u - 1.0) * (u - 2.0) / 6.0
+        w_next = -(u + 1.0) * u * (u - 2.0) / 2.0
+        w_after = (u + 1.0) * u * (u - 1.0) / 6.0
+        result = []
+        for before, anchor, following, after in zip(rows[0], rows[1], rows[2], rows[3]):
+            value = (anchor
+                     + w_before * ((before - anchor + 180.0) % 360.0 - 180.0)
+                     + w_next * ((following - anchor + 180.0) % 360.0 - 180.0)
+                     + w_after * ((after - anchor + 180.0) % 360.0 - 180.0))
+            result.append(value % 360.0)
+        return result
+
+    def verify(self, samples: int = 200000, seed: int = 0,
+               scalar_samples: int = 2000) -> Dict[str, Dict[str, float]]:
+        """
+        Interpolation error (degrees) against direct computation at random instants,
+        per body for the vectorized path and pooled over all bodies ("scalar") for
+        longitudes_and_speeds on the first `scalar_samples` instants. The scalar
+        entry's speed_max is its largest speed difference from speed_matrix (deg/day).
+        """
+        rng = np.random.default_rng(seed)
+        jd = rng.uniform(self.start_jd, self.end_jd - ephemeris.MOTION_STEP_DAYS, samples)
+        direct = _direct_longitudes(jd)
+        error = np.abs(_wrap180(self.longitude_matrix(jd) - direct))
+        result = {
+            name: {
+                "max": float(error[:, k].max()),
+                "p99": float(np.percentile(error[:, k], 99)),
+                "mean": float(error[:, k].mean())
+            }
+            for k, name in enumerate(ephemeris.PLANETS)
+        }
+
+        checked = jd[:scalar_samples]
+        if len(checked):
+            vector_longitudes = self.longitude_matrix(checked)
+            vector_speeds = self.speed_matrix(checked, vector_longitudes)
+            scalar_error, speed_error = [], []
+            for i, instant in enumerate(checked.tolist()):
+                positions, speeds = self.longitudes_and_speeds(instant)
+                scalar_error.append([positions[name] for name in ephemeris.PLANETS])
+                speed_error.append([speeds[ephemeris.PLANETS[k]] - vector_speeds[i, k] for k in _MOVING_COLUMNS])
+            scalar_error = np.abs(_wrap180(np.array(scalar_error) - direct[:len(checked)]))
+            result["scalar"] = {
+                "max": float(scalar_error.max()),
+                "p99": float(np.percentile(scalar_error, 99)),
+                "mean": float(scalar_error.mean()),
+                "speed_max": float(np.abs(np.array(speed_error)).max())
+            }
+        return result
+
+    def info(self) -> Dict:
+        return {
+            "path": self.path,
+            "step_days": self.step_days,
+            "rows": self.rows,
+            "start_jd": self.start_jd,
+            "end_jd": self.end_jd,
+            "size_bytes": self.data.nbytes + HEADER_SIZE
+        }
+
+class EphemerisTableLoader:
+    """Opens the configured table once per process; None if disabled or missing"""
+
+    def __init__(self):
+        self._table: Optional[EphemerisTable] = None
+        self._loaded = False
+
+    def get(self) -> Optional[EphemerisTable]:
+        if not self._loaded:
+            self._loaded = True
+            if settings.EPHEMERIS_TABLE_ENABLED:
+                self._table = self._open(settings.EPHEMERIS_TABLE_PATH)
+        return self._table
+
+    def _open(self, path: str) -> Optional[EphemerisTable]:
+        if not os.path.exists(path):
+            print(f"Ephemeris table not found at {path}; computing positions directly "
+                  f"(build it with: python -m app.services.ephemeris_table build)")
+            return None
+        try:
+            table = EphemerisTable(path)
+            print(f"Ephemeris table loaded from {path} ({table.rows} rows, step {table.step_days} days)")
+            return table
+        except Exception as e:
+            print(f"Error loading ephemeris table {path}: {e}")
+            return None
+
+ephemeris_table = EphemerisTableLoader()
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or verify the precomputed ephemeris table")
+    parser.add_argument("command", choices=["build", "verify"])
+    parser.add_argument("--path", default=settings.EPHEMERIS_TABLE_PATH)
+    parser.add_argument("--step", type=float, default=1.0, help="grid step in days (build only)")
+    parser.add_argument("--samples", type=int, default=200000, help="random instants to check (verify only)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        rows = build_table(args.path, step_days=args.step)
+        print(f"Wrote {rows} rows ({os.path.getsize(args.path)} bytes) to {args.path}")
+
+    table = EphemerisTable(args.path)
+    print(f"Max interpolation error over {args.samples} instants (arcseconds):")
+    for name, error in table.verify(args.samples).items():
+        print(f"  {name:8s} max {error['max'] * 3600:8.3f}  p99 {error['p99'] * 3600:8.3f}  mean {error['mean'] * 3600:8.3f}"
+              + (f"  speed vs vectorized {error['speed_max'] * 3600:.3f}/day" if "speed_max" in error else ""))
+
+if __name__ == "__main__":
+    main()
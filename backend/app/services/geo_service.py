@@ -0,0 +1,434 @@
+"""
+Offline geocoding and historical timezone resolution.
+
+Place names are looked up in a bundled gazetteer (app/data/gazetteer.csv)
+through a sorted prefix index with a trigram index as fuzzy fallback.
+Coordinates map to a timezone through a KD-tree over the gazetteer's places.
+Local birth times are converted to UTC with cached zoneinfo lookups, which
+apply the historical offset/DST rules of the zone.
+
+Regenerate or extend the gazetteer (e.g. from a GeoNames cities dump):
+
+    python -m app.services.geo_service build [--geonames cities15000.txt]
+"""
+import argparse
+import bisect
+import csv
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from app.core.config import settings
+from app.schemas.astro import BirthDataRequest
+
+EARTH_RADIUS_KM = 6371.0088
+
+FIELDS = ["name", "ascii_name", "alternate_names", "country_code", "country", "admin1",
+          "latitude", "longitude", "timezone", "population"]
+
+# Common ways of writing a country that are not its ISO code or tzdata name
+COUNTRY_ALIASES = {
+    "usa": "US", "united states": "US", "united states of america": "US", "america": "US",
+    "uk": "GB", "united kingdom": "GB", "great britain": "GB", "britain": "GB",
+    "england": "GB", "scotland": "GB", "wales": "GB", "northern ireland": "GB",
+    "uae": "AE", "holland": "NL", "russia": "RU", "south korea": "KR", "korea": "KR",
+}
+
+# Display names for countries whose iso3166.tab name is unusual
+COUNTRY_NAMES = {
+    "GB": "United Kingdom", "KR": "South Korea", "KP": "North Korea", "MM": "Myanmar",
+    "CD": "DR Congo", "CG": "Republic of the Congo", "SZ": "Eswatini",
+}
+
+def normalize(text: str) -> str:
+    """Case-, accent- and punctuation-insensitive form of a place name"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+class KDTree:
+    """
+    Static 3-d tree over points on the unit sphere; nearest neighbour by chord
+    length, which orders points the same way as great-circle distance
+    """
+
+    def __init__(self, points: List[Tuple[float, float, float]]):
+        self.points = points
+        # Flat node arrays: point index, split axis, left child, right child (-1 = none)
+        self.index: List[int] = []
+        self.axis: List[int] = []
+        self.left: List[int] = []
+        self.right: List[int] = []
+        self.root = self._build(list(range(len(points))), 0)
+
+    def _build(self, ids: List[int], depth: int) -> int:
+        if not ids:
+            return -1
+        axis = depth % 3
+        ids.sort(key=lambda i: self.points[i][axis])
+        middle = len(ids) // 2
+        node = len(self.index)
+        self.index.append(ids[middle])
+        self.axis.append(axis)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.left[node] = self._build(ids[:middle], depth + 1)
+        self.right[node] = self._build(ids[middle + 1:], depth + 1)
+        return node
+
+    def nearest(self, point: Tuple[float, float, float]) -> Tuple[int, float]:
+        """(point index, squared chord distance) of the nearest point"""
+        best_id, best_distance = -1, float("inf")
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                continue
+            candidate = self.points[self.index[node]]
+            distance = ((candidate[0] - point[0]) ** 2 + (candidate[1] - point[1]) ** 2
+                        + (candidate[2] - point[2]) ** 2)
+            if distance < best_distance:
+                best_id, best_distance = self.index[node], distance
+            delta = point[self.axis[node]] - candidate[self.axis[node]]
+            near, far = (self.left[node], self.right[node]) if delta < 0 else (self.right[node], self.left[node])
+            # Far side is visited only if the splitting plane is closer than the best so far
+            if delta * delta < best_distance:
+                stack.append(far)
+            stack.append(near)
+        return best_id, best_distance
+
+def parse_local_datetime(birth_date: str, birth_time: str) -> datetime:
+    """Naive local datetime from "YYYY-MM-DD" and "HH:MM" or "HH:MM:SS" (seconds are kept)"""
+    text = birth_time.strip()
+    if len(text) >= 8 and text[5] == ":":
+        return datetime.strptime(f"{birth_date.strip()} {text[:8]}", "%Y-%m-%d %H:%M:%S")
+    return datetime.strptime(f"{birth_date.strip()} {text[:5]}", "%Y-%m-%d %H:%M")
+
+@lru_cache(maxsize=512)
+def get_timezone(tz_name: str) -> Optional[tzinfo]:
+    """
+    Cached tzinfo for an IANA zone name ("America/New_York") or a fixed offset
+    ("+05:30", "UTC-4", "GMT+1"); None if unrecognized
+    """
+    tz_name = (tz_name or "").strip()
+    if tz_name.upper() in ("", "UTC", "GMT", "Z"):
+        return timezone.utc
+    try:
+        return ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        pass
+
+    match = re.fullmatch(r"(?:UTC|GMT)?\s*([+-])(\d{1,2})(?::?(\d{2}))?", tz_name, re.IGNORECASE)
+    if match:
+        sign = 1 if match.group(1) == "+" else -1
+        offset = timedelta(hours=int(match.group(2)), minutes=int(match.group(3) or 0))
+        return timezone(sign * offset)
+    return None
+
+@lru_cache(maxsize=65536)
+def _local_to_utc(tz_name: str, local: datetime) -> Tuple[datetime, int, bool, bool, bool]:
+    zone = get_timezone(tz_name) or timezone.utc
+    aware = local.replace(tzinfo=zone)
+    utc_time = aware.astimezone(timezone.utc)
+    # PEP 495: a wall time that occurs twice gives different offsets for fold=0/1;
+    # one that never occurs (spring-forward gap) does not survive a round trip
+    ambiguous = aware.utcoffset() != local.replace(tzinfo=zone, fold=1).utcoffset()
+    nonexistent = utc_time.astimezone(zone).replace(tzinfo=None) != local
+    dst = bool(aware.dst())
+    if nonexistent:
+        ambiguous = False
+    return utc_time, int(aware.utcoffset().total_seconds()), dst, ambiguous, nonexistent
+
+class Gazetteer:
+    """In-memory view of the gazetteer CSV with name and coordinate indexes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, newline="", encoding="utf-8") as f:
+            self.rows = [self._parse_row(row) for row in csv.DictReader(f)]
+
+        # Prefix index: sorted (normalized name, row) over names and alternate names
+        self._names: List[Tuple[str, int]] = []
+        self._trigram_index: Dict[str, List[int]] = {}
+        for row_id, row in enumerate(self.rows):
+            names = {normalize(row["name"]), normalize(row["ascii_name"])}
+            names.update(normalize(alt) for alt in row["alternate_names"])
+            names.discard("")
+            for name in names:
+                self._names.append((name, row_id))
+                for trigram in _trigrams(name):
+                    self._trigram_index.setdefault(trigram, []).append(row_id)
+        self._names.sort()
+        self._keys = [name for name, _ in self._names]
+
+        self._countries = {}
+        for row in self.rows:
+            self._countries.setdefault(normalize(row["country"]), row["country_code"])
+        self._tree = KDTree([_unit_vector(row["latitude"], row["longitude"]) for row in self.rows])
+
+    @staticmethod
+    def _parse_row(row: Dict[str, str]) -> Dict:
+        return {
+            "name": row["name"],
+            "ascii_name": row["ascii_name"] or row["name"],
+            "alternate_names": [alt for alt in row["alternate_names"].split(";") if alt],
+            "country_code": row["country_code"],
+            "country": row["country"],
+            "admin1": row["admin1"],
+            "latitude": float(row["latitude"]),
+            "longitude": float(row["longitude"]),
+            "timezone": row["timezone"],
+            "population": int(row["population"] or 0),
+        }
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Places matching "City", "City, Country" or "City, State, Country", best first:
+        exact names, then name prefixes, then fuzzy (trigram) matches; larger places first
+        """
+        parts = [normalize(part) for part in query.split(",")]
+        city, qualifiers = parts[0], [part for part in parts[1:] if part]
+        if not city:
+            return []
+
+        exact, prefixed = set(), set()
+        start = bisect.bisect_left(self._keys, city)
+        for key, row_id in self._names[start:]:
+            if not key.startswith(city):
+                break
+            (exact if key == city else prefixed).add(row_id)
+        prefixed -= exact
+
+        def ranked(row_ids) -> List[int]:
+            matching = [row_id for row_id in row_ids if self._qualifies(self.rows[row_id], qualifiers)]
+            return sorted(matching, key=lambda row_id: -self.rows[row_id]["population"])
+
+        results = ranked(exact) + ranked(prefixed)
+        if len(results) < limit:
+            seen = set(results)
+            results += [row_id for row_id in self._fuzzy(city, qualifiers) if row_id not in seen]
+        return [self._to_place(row_id) for row_id in results[:limit]]
+
+    def _fuzzy(self, city: str, qualifiers: List[str], threshold: float = 0.4) -> List[int]:
+        query = _trigrams(city)
+        shared = Counter()
+        for trigram in query:
+            shared.update(set(self._trigram_index.get(trigram, ())))
+        scored = []
+        for row_id, count in shared.items():
+            row = self.rows[row_id]
+            if not self._qualifies(row, qualifiers):
+                continue
+            similarity = count / (len(query) + len(_trigrams(normalize(row["ascii_name"]))) - count)
+            if similarity >= threshold:
+                scored.append((-similarity, -row["population"], row_id))
+        return [row_id for _, _, row_id in sorted(scored)]
+
+    def _qualifies(self, row: Dict, qualifiers: List[str]) -> bool:
+        """Every qualifier must name the row's country (code, name or alias) or first-level region"""
+        for qualifier in qualifiers:
+            country_code = COUNTRY_ALIASES.get(qualifier) or self._countries.get(qualifier) or qualifier.upper()
+            if country_code != row["country_code"] and qualifier != normalize(row["admin1"]):
+                return False
+        return True
+
+    def nearest(self, latitude: float, longitude: float) -> Tuple[Dict, float]:
+        """Nearest gazetteer place and its great-circle distance in km"""
+        row_id, chord_squared = self._tree.nearest(_unit_vector(latitude, longitude))
+        distance = 2.0 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord_squared) / 2.0))
+        return self._to_place(row_id), distance
+
+    def _to_place(self, row_id: int) -> Dict:
+        row = self.rows[row_id]
+        label = ", ".join(part for part in (row["name"], row["admin1"], row["country"]) if part)
+        return {
+            "name": row["name"],
+            "label": label,
+            "country_code": row["country_code"],
+            "country": row["country"],
+            "admin1": row["admin1"],
+            "latitude": row["latitude"],
+            "longitude": row["longitude"],
+            "timezone": row["timezone"],
+            "population": row["population"],
+        }
+
+class GeoService:
+    """Place search, coordinate-to-timezone and local-to-UTC resolution, all offline"""
+
+    def __init__(self):
+        self._gazetteer: Optional[Gazetteer] = None
+
+    @property
+    def gazetteer(self) -> Gazetteer:
+        # Loaded on first use so startup stays fast
+        if self._gazetteer is None:
+            self._gazetteer = Gazetteer(settings.GAZETTEER_PATH)
+            print(f"Gazetteer loaded from {settings.GAZETTEER_PATH} ({len(self._gazetteer.rows)} places)")
+        return self._gazetteer
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        return self.gazetteer.search(query, limit)
+
+    def timezone_at(self, latitude: float, longitude: float) -> Dict:
+        """Timezone of the nearest gazetteer place"""
+        place, distance = self.gazetteer.nearest(latitude, longitude)
+        return {"timezone": place["timezone"], "nearest_place": place, "distance_km": round(distance, 1)}
+
+    def to_utc(self, birth_date: str, birth_time: str, tz_name: str) -> Dict:
+        """
+        Convert a local date/time to UTC with the zone's historical rules. Ambiguous
+        wall times (DST fall-back) resolve to the first occurrence; times skipped by a
+        spring-forward gap use the offset in force before the transition.
+        """
+        local = parse_local_datetime(birth_date, birth_time)
+        utc_time, offset, dst, ambiguous, nonexistent = _local_to_utc((tz_name or "").strip(), local)
+        return {
+            "utc_time": utc_time,
+            "utc_timestamp_us": (utc_time - datetime(1970, 1, 1, tzinfo=timezone.utc)) // timedelta(microseconds=1),
+            "utc_offset_seconds": offset,
+            "dst": dst,
+            "ambiguous": ambiguous,
+            "nonexistent": nonexistent
+        }
+
+    def resolve(self, birth_place: str, birth_date: Optional[str] = None, birth_time: Optional[str] = None) -> Optional[Dict]:
+        """Best place for a free-text birth place, plus the UTC instant when date and time are given"""
+        matches = self.search(birth_place, limit=1)
+        if not matches:
+            return None
+        place = matches[0]
+        result = {"place": place, "latitude": place["latitude"], "longitude": place["longitude"],
+                  "timezone": place["timezone"]}
+        if birth_date and birth_time:
+            result.update(self.to_utc(birth_date, birth_time, place["timezone"]))
+        return result
+
+    def complete_birth_data(self, birth_data: BirthDataRequest) -> BirthDataRequest:
+        """
+        Fill in missing coordinates and timezone from birth_place (or the timezone
+        from the coordinates). Raises ValueError if the place cannot be resolved.
+        """
+        if birth_data.latitude is not None and birth_data.longitude is not None and birth_data.timezone:
+            return birth_data
+
+        updates = {}
+        if birth_data.latitude is None or birth_data.longitude is None:
+            matches = self.search(birth_data.birth_place, limit=1)
+            if not matches:
+                raise ValueError(f"Unknown birth place '{birth_data.birth_place}'; provide latitude/longitude")
+            place = matches[0]
+            updates["latitude"], updates["longitude"] = place["latitude"], place["longitude"]
+            if not birth_data.timezone:
+                updates["timezone"] = place["timezone"]
+        elif not birth_data.timezone:
+            updates["timezone"] = self.timezone_at(birth_data.latitude, birth_data.longitude)["timezone"]
+        return birth_data.model_copy(update=updates)
+
+geo_service = GeoService()
+
+def _read_zone_tab(tzdata_dir: str) -> Tuple[Dict[str, str], List[Dict]]:
+    """Country names and the principal city of every zone from the system tzdata tables"""
+    countries, rows = {}, []
+    with open(os.path.join(tzdata_dir, "iso3166.tab"), encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                code, name = line.rstrip("\n").split("\t")[:2]
+                countries[code] = COUNTRY_NAMES.get(code, name)
+    with open(os.path.join(tzdata_dir, "zone.tab"), encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            code, coordinates, tz_name = line.rstrip("\n").split("\t")[:3]
+            match = re.fullmatch(r"([+-]\d{4,6})([+-]\d{5,7})", coordinates)
+            latitude, longitude = (_parse_iso6709(part) for part in match.groups())
+            name = tz_name.split("/")[-1].replace("_", " ")
+            rows.append({"name": name, "ascii_name": name, "alternate_names": "", "country_code": code,
+                         "admin1": "", "latitude": latitude, "longitude": longitude,
+                         "timezone": tz_name, "population": 0})
+    return countries, rows
+
+def _parse_iso6709(value: str) -> float:
+    """+DDMM[SS] / +DDDMM[SS] as used in zone.tab"""
+    sign = -1.0 if value[0] == "-" else 1.0
+    digits = value[1:]
+    degree_digits = 2 if len(digits) in (4, 6) else 3
+    degrees = int(digits[:degree_digits])
+    minutes = int(digits[degree_digits:degree_digits + 2])
+    seconds = int(digits[degree_digits + 2:] or 0)
+    return round(sign * (degrees + minutes / 60.0 + seconds / 3600.0), 4)
+
+def _read_geonames(path: str) -> List[Dict]:
+    """Rows of a GeoNames cities dump (cities500/1000/5000/15000.txt)"""
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) < 18 or not parts[17]:
+                continue
+            alternates = [alt for alt in parts[3].split(",") if alt.isascii() and 0 < len(alt) <= 40][:8]
+            rows.append({"name": parts[1], "ascii_name": parts[2], "alternate_names": ";".join(alternates),
+                         "country_code": parts[8], "admin1": parts[10], "latitude": float(parts[4]),
+                         "longitude": float(parts[5]), "timezone": parts[17], "population": int(parts[14] or 0)})
+    return rows
+
+def build_gazetteer(path: str, geonames: Optional[str] = None, tzdata_dir: str = "/usr/share/zoneinfo") -> int:
+    """
+    Merge the existing gazetteer, the tzdata zone cities and optionally a GeoNames
+    dump into `path`. Earlier sources win for duplicate (name, country) entries.
+    """
+    existing = []
+    if os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            existing = list(csv.DictReader(f))
+
+    countries, zone_rows = _read_zone_tab(tzdata_dir)
+    for row in existing:
+        countries.setdefault(row["country_code"], row["country"])
+    sources = [_read_geonames(geonames)] if geonames else []
+    sources += [existing, zone_rows]
+
+    merged, seen = [], set()
+    for rows in sources:
+        for row in rows:
+            key = (normalize(row["ascii_name"] or row["name"]), row["country_code"])
+            if key in seen or get_timezone(row["timezone"]) is None:
+                continue
+            seen.add(key)
+            row["country"] = countries.get(row["country_code"], row.get("country", ""))
+            merged.append(row)
+    merged.sort(key=lambda row: (row["country_code"], -int(row["population"] or 0), row["name"]))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(merged)
+    os.replace(tmp_path, path)
+    return len(merged)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--path", default=settings.GAZETTEER_PATH)
+    parser.add_argument("--geonames", help="GeoNames cities dump to merge in (e.g. cities15000.txt)")
+    parser.add_argument("--tzdata", default="/usr/share/zoneinfo", help="directory with zone.tab and iso3166.tab")
+    args = parser.parse_args()
+    count = build_gazetteer(args.path, args.geonames, args.tzdata)
+    print(f"Wrote {count} places to {args.path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import httpx
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+class HTTPClientPool:
+    """
+    Long-lived async HTTP clients, one per upstream provider.
+
+    Each client keeps its own keep-alive connection pool so repeated calls to the
+    same provider reuse connections instead of paying a new TCP/TLS handshake.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        # provider name -> (base_url, http2)
+        self._providers: Dict[str, Tuple[str, bool]] = {
+            "astroapi": (settings.ASTRO_API_URL, settings.ASTRO_API_HTTP2),
+            "prokerala": (settings.PROKERALA_API_URL, settings.PROKERALA_HTTP2),
+        }
+
+    def get_client(self, provider: str) -> httpx.AsyncClient:
+        """
+        Return the shared client for a provider, creating it on first use
+        """
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._create_client(provider)
+            self._clients[provider] = client
+        return client
+
+    def _create_client(self, provider: str) -> httpx.AsyncClient:
+        base_url, http2 = self._providers.get(provider, ("", False))
+
+        if http2 and not self._http2_available():
+            print(f"HTTP/2 requested for {provider} but the 'h2' package is not installed, using HTTP/1.1")
+            http2 = False
+
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        )
+
+        print(f"Creating pooled HTTP client for {provider} (http2={http2}, "
+              f"max_connections={settings.HTTP_MAX_CONNECTIONS})")
+        return httpx.AsyncClient(
+            base_url=base_url,
+            http2=http2,
+            limits=limits,
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS)
+        )
+
+    def _http2_available(self) -> bool:
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    async def startup(self):
+        """Open a client for every known provider so the first request doesn't pay for it"""
+        for provider in self._providers:
+            self.get_client(provider)
+
+    async def shutdown(self):
+        """Close all clients and their pooled connections"""
+        for provider, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"Error closing HTTP client for {provider}: {e}")
+        self._clients.clear()
+
+http_clients = HTTPClientPool()
@@ -0,0 +1,133 @@
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.persistence import persistent_store
+
+# USD per million (input, output) tokens; longest matching prefix wins.
+# LLM_PRICE_INPUT_PER_MTOK / LLM_PRICE_OUTPUT_PER_MTOK override the table.
+MODEL_PRICES_PER_MTOK = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+def completion_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Approximate USD cost of one completion"""
+    if settings.LLM_PRICE_INPUT_PER_MTOK or settings.LLM_PRICE_OUTPUT_PER_MTOK:
+        prices = (settings.LLM_PRICE_INPUT_PER_MTOK, settings.LLM_PRICE_OUTPUT_PER_MTOK)
+    else:
+        matches = [prefix for prefix in MODEL_PRICES_PER_MTOK if model.startswith(prefix)]
+        prices = MODEL_PRICES_PER_MTOK[max(matches, key=len)] if matches else (0.0, 0.0)
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class LLMResultCache:
+    """
+    Validated LLM results keyed by (chart hash, test type, model, prompt version,
+    temperature).
+
+    The chart hash covers the formatted chart sent to the model. The prompt
+    version hashes the prompt with the chart removed, plus the system prompt, so
+    editing a template invalidates its entries automatically. Entries live in an
+    in-memory LRU and, with LLM_CACHE_PERSISTENT, in the persistent store.
+    Hits are credited with the tokens and dollars the original completion cost.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries if max_entries is not None else settings.LLM_CACHE_MAX_ENTRIES
+        # key -> (result JSON, prompt tokens, completion tokens, model)
+        self._entries: "OrderedDict[str, Tuple[str, int, int, str]]" = OrderedDict()
+        self.hits = {"memory": 0, "persistent": 0}
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.tokens_saved = 0
+        self.dollars_saved = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        # Only deterministic answers are reusable: a sampled answer is one draw of many
+        return settings.LLM_CACHE_ENABLED and settings.LLM_DETERMINISTIC and self.max_entries > 0
+
+    @staticmethod
+    def make_key(chart_data: str, prompt: str, system_prompt: str, test_type: str,
+                 model: str, temperature: float) -> str:
+        prompt_version = _sha256(system_prompt + "\0" + prompt.replace(chart_data, "{chart_data}"))[:16]
+        return _sha256("|".join([_sha256(chart_data), test_type, model, prompt_version, f"{temperature:g}"]))
+
+    async def get(self, key: str, count_miss: bool = True) -> Optional[str]:
+        """Cached result JSON for a key, or None on a miss"""
+        return await self.get_first([key], count_miss)
+
+    async def get_first(self, keys: List[str], count_miss: bool = True) -> Optional[str]:
+        """Cached result JSON for the first of `keys` that is cached; one lookup, so at most one miss"""
+        if not self.enabled:
+            return None
+        for key in keys:
+            entry = self._entries.get(key)
+            tier = "memory"
+            if entry is not None:
+                self._entries.move_to_end(key)
+            elif settings.LLM_CACHE_PERSISTENT:
+                entry = await persistent_store.get_llm_result(key)
+                tier = "persistent"
+                if entry is not None:
+                    self._remember(key, entry)
+            if entry is not None:
+                result, prompt_tokens, completion_tokens, model = entry
+                self.hits[tier] += 1
+                self.tokens_saved += prompt_tokens + completion_tokens
+                self.dollars_saved += completion_cost(model, prompt_tokens, completion_tokens)
+                return result
+        if count_miss:
+            self.misses += 1
+        return None
+
+    async def set(self, key: str, test_type: str, result: str, prompt_tokens: int,
+                  completion_tokens: int, model: str):
+        """Store a validated result with the token usage it cost"""
+        if not self.enabled:
+            return
+        entry = (result, prompt_tokens, completion_tokens, model)
+        self._remember(key, entry)
+        self.writes += 1
+        if settings.LLM_CACHE_PERSISTENT:
+            await persistent_store.save_llm_result(key, test_type, entry)
+
+    def _remember(self, key: str, entry: Tuple[str, int, int, str]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        hits = sum(self.hits.values())
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "persistent": settings.LLM_CACHE_PERSISTENT,
+            "deterministic": settings.LLM_DETERMINISTIC,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "tokens_saved": self.tokens_saved,
+            "dollars_saved": round(self.dollars_saved, 4)
+        }
+
+llm_cache = LLMResultCache()
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict
+from app.core.config import settings
+from app.schemas.personality import LLMPriority
+from app.services.deadline import DeadlineExceeded, deadline_stats, remaining
+from app.services.provider_stats import ProviderStats
+
+# Lane of the work being done; tasks created while handling a request inherit it
+_lane: ContextVar[LLMPriority] = ContextVar("llm_lane", default=LLMPriority.INTERACTIVE)
+
+# Free slots go to the first lane in this order that has waiters and room
+LANE_ORDER = (LLMPriority.INTERACTIVE, LLMPriority.BATCH, LLMPriority.BACKGROUND)
+
+def current_lane() -> LLMPriority:
+    return _lane.get()
+
+@contextmanager
+def llm_lane(lane: LLMPriority):
+    """Run the block's LLM calls in `lane`"""
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+class LaneState:
+    """Waiters, in-flight count and queueing metrics of one lane"""
+
+    def __init__(self, lane: LLMPriority, max_in_flight: int):
+        self.lane = lane
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.wait_stats = ProviderStats(f"llm_lane_{lane.value}")  # wait time of calls that got a slot
+        self.started = 0
+        self.shed = 0
+        self.max_queue_depth = 0
+
+    def has_room(self) -> bool:
+        return self.in_flight < self.max_in_flight
+
+    def to_dict(self) -> Dict:
+        waits = self.wait_stats.to_dict()
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self.waiters),
+            "max_queue_depth": self.max_queue_depth,
+            "started": self.started,
+            "shed": self.shed,
+            "wait_p50_ms": waits["latency_p50_ms"],
+            "wait_p95_ms": waits["latency_p95_ms"]
+        }
+
+class LLMExecutor:
+    """
+    Bulkhead for OpenAI calls: at most LLM_MAX_CONCURRENCY in flight overall and
+    a per-lane cap for interactive, batch and background work. When a slot frees
+    up it goes to the highest-priority lane with waiters and room, so batch jobs
+    and retries cannot starve interactive requests. Work still queued when too
+    little of its request deadline is left to make the call is shed.
+    """
+
+    def __init__(self):
+        self.max_in_flight = settings.LLM_MAX_CONCURRENCY
+        self.in_flight = 0
+        self.lanes = {
+            LLMPriority.INTERACTIVE: LaneState(LLMPriority.INTERACTIVE, settings.LLM_INTERACTIVE_MAX_IN_FLIGHT),
+            LLMPriority.BATCH: LaneState(LLMPriority.BATCH, settings.LLM_BATCH_MAX_IN_FLIGHT),
+            LLMPriority.BACKGROUND: LaneState(LLMPriority.BACKGROUND, settings.LLM_BACKGROUND_MAX_IN_FLIGHT)
+        }
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one in-flight slot in the current lane for the duration of the block"""
+        lane = self.lanes[_lane.get()]
+        await self._acquire(lane)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            lane.in_flight -= 1
+            self._dispatch()
+
+    async def _acquire(self, lane: LaneState):
+        queued_at = time.perf_counter()
+        # Start at once only if nobody of this priority or higher is already waiting
+        if self._can_start(lane) and not any(self.lanes[name].waiters for name in LANE_ORDER[:LANE_ORDER.index(lane.lane) + 1]):
+            self._start(lane, queued_at)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        lane.waiters.append(waiter)
+        lane.max_queue_depth = max(lane.max_queue_depth, len(lane.waiters))
+        left = remaining()
+        patience = None if left is None else max(left - settings.LLM_MIN_CALL_BUDGET_SECONDS, 0.0)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=patience)
+        except asyncio.TimeoutError:
+            self._abandon(lane, waiter)
+            lane.shed += 1
+            deadline_stats.record_skipped("openai_queue")
+            lane.wait_stats.record((time.perf_counter() - queued_at) * 1000, False)
+            raise DeadlineExceeded(f"Shed from the {lane.lane.value} LLM queue: request deadline too close")
+        except asyncio.CancelledError:
+            self._abandon(lane, waiter)
+            raise
+        lane.wait_stats.record((time.perf_counter() - queued_at) * 1000, True)
+
+    def _abandon(self, lane: LaneState, waiter: asyncio.Future):
+        """Drop a waiter that gave up; if it was granted a slot meanwhile, hand the slot on"""
+        if waiter.done() and not waiter.cancelled():
+            self.in_flight -= 1
+            lane.in_flight -= 1
+            self._dispatch()
+        else:
+            waiter.cancel()
+            try:
+                lane.waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def _can_start(self, lane: LaneState) -> bool:
+        return self.in_flight < self.max_in_flight and lane.has_room()
+
+    def _start(self, lane: LaneState, queued_at: float = None):
+        self.in_flight += 1
+        lane.in_flight += 1
+        lane.started += 1
+        if queued_at is not None:
+            lane.wait_stats.record((time.perf_counter() - queued_at) * 1000, True)
+
+    def _dispatch(self):
+        """Hand free slots to waiters, highest-priority lane first"""
+        for name in LANE_ORDER:
+            lane = self.lanes[name]
+            while lane.waiters and self._can_start(lane):
+                waiter = lane.waiters.popleft()
+                if waiter.done():
+                    continue
+                self._start(lane)
+                waiter.set_result(None)
+
+    def stats(self) -> Dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "lanes": {name.value: lane.to_dict() for name, lane in self.lanes.items()}
+        }
+
+llm_executor = LLMExecutor()
@@ -0,0 +1,182 @@
+import re
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.schemas.personality import *
+from app.services.llm_cache import completion_cost
+from app.services.provider_stats import ProviderStats
+
+COMBINED_ROUTE = "combined"
+
+# Structurally simple tests (a handful of scores or a label) start on the fast model
+FAST_TESTS = {
+    PersonalityTestType.BIG_FIVE, PersonalityTestType.DISC, PersonalityTestType.LOVE_LANGUAGES,
+    PersonalityTestType.ATTACHMENT_STYLES, PersonalityTestType.EMOTIONAL_INTELLIGENCE,
+    PersonalityTestType.CAREER_PERSONALITY
+}
+
+RESULT_CLASS_TESTS = {
+    MBTIResult: PersonalityTestType.MBTI,
+    BigFiveResult: PersonalityTestType.BIG_FIVE,
+    EnneagramResult: PersonalityTestType.ENNEAGRAM,
+    DISCResult: PersonalityTestType.DISC,
+    StrengthsFinderResult: PersonalityTestType.STRENGTHS_FINDER,
+    LoveLanguagesResult: PersonalityTestType.LOVE_LANGUAGES,
+    AttachmentStyleResult: PersonalityTestType.ATTACHMENT_STYLES,
+    EmotionalIntelligenceResult: PersonalityTestType.EMOTIONAL_INTELLIGENCE,
+    CareerPersonalityResult: PersonalityTestType.CAREER_PERSONALITY
+}
+
+LOVE_LANGUAGES = {"words of affirmation", "quality time", "receiving gifts", "acts of service", "physical touch"}
+ATTACHMENT_STYLES = {"secure", "anxious", "avoidant", "disorganized"}
+DISC_SUM_TOLERANCE = 5
+
+class LLMRoute:
+    """Model, token limit and temperature for one test, plus the model to escalate to"""
+
+    def __init__(self, name: str, model: str, max_tokens: int, temperature: Optional[float] = None,
+                 escalation_model: Optional[str] = None):
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+        self._temperature = temperature
+        self.escalation_model = escalation_model if escalation_model != model else None
+
+    @property
+    def temperature(self) -> float:
+        """An explicit route temperature wins; otherwise 0 in deterministic mode, else LLM_TEMPERATURE"""
+        if self._temperature is not None:
+            return self._temperature
+        return 0.0 if settings.LLM_DETERMINISTIC else settings.LLM_TEMPERATURE
+
+    @property
+    def deterministic(self) -> bool:
+        """Whether answers are reproducible, and so cacheable"""
+        return settings.LLM_DETERMINISTIC and self.temperature == 0
+
+    @property
+    def models(self) -> List[str]:
+        """Models in the order they are tried"""
+        return [self.model] + ([self.escalation_model] if self.escalation_model else [])
+
+    def to_dict(self) -> Dict:
+        return {
+            "model": self.model,
+            "escalation_model": self.escalation_model,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "deterministic": self.deterministic
+        }
+
+class RouteStats:
+    """Latency, token and cost accounting for one route, split by model"""
+
+    def __init__(self, name: str):
+        self.latency = ProviderStats(f"llm_route_{name}")
+        self.requests: Dict[str, int] = {}
+        self.tokens: Dict[str, int] = {}
+        self.cost_usd = 0.0
+        self.escalations = 0
+        self.rejected = {"invalid": 0, "implausible": 0}
+
+    def record_usage(self, usage, model: str):
+        self.requests[model] = self.requests.get(model, 0) + 1
+        if usage is not None:
+            prompt_tokens, completion_tokens = usage.prompt_tokens or 0, usage.completion_tokens or 0
+            self.tokens[model] = self.tokens.get(model, 0) + prompt_tokens + completion_tokens
+            self.cost_usd += completion_cost(model, prompt_tokens, completion_tokens)
+
+    def to_dict(self) -> Dict:
+        latency = self.latency.to_dict()
+        return {
+            "results": self.latency.successes,
+            "failed": self.latency.failures,
+            "requests": dict(self.requests),
+            "tokens": dict(self.tokens),
+            "cost_usd": round(self.cost_usd, 4),
+            "escalations": self.escalations,
+            "rejected": dict(self.rejected),
+            "latency_p50_ms": latency["latency_p50_ms"],
+            "latency_p95_ms": latency["latency_p95_ms"]
+        }
+
+def default_routes() -> Dict[str, LLMRoute]:
+    """
+    Fast model for simple tests, LLM_MODEL for the nuanced ones and the combined
+    call; everything escalates to LLM_ESCALATION_MODEL when escalation is on.
+    LLM_ROUTES overrides entries: "disc=gpt-4o-mini:800:0.5,mbti=gpt-4o".
+    """
+    escalation = settings.LLM_ESCALATION_MODEL if settings.LLM_ESCALATION_ENABLED else None
+    routes = {}
+    for test in PersonalityTestType:
+        if test in FAST_TESTS:
+            routes[test.value] = LLMRoute(test.value, settings.LLM_FAST_MODEL, 1000, escalation_model=escalation)
+        else:
+            routes[test.value] = LLMRoute(test.value, settings.LLM_MODEL, 2000, escalation_model=escalation)
+    routes[COMBINED_ROUTE] = LLMRoute(COMBINED_ROUTE, settings.LLM_MODEL, 6000, escalation_model=escalation)
+
+    for entry in filter(None, (item.strip() for item in settings.LLM_ROUTES.split(","))):
+        name, _, spec = entry.partition("=")
+        name = name.strip()
+        if name not in routes or not spec:
+            print(f"Ignoring LLM route override '{entry}'")
+            continue
+        parts = spec.split(":")
+        route = routes[name]
+        try:
+            routes[name] = LLMRoute(
+                name,
+                parts[0] or route.model,
+                int(parts[1]) if len(parts) > 1 and parts[1] else route.max_tokens,
+                float(parts[2]) if len(parts) > 2 and parts[2] else None,
+                escalation
+            )
+        except ValueError:
+            print(f"Ignoring LLM route override '{entry}': max_tokens and temperature must be numbers")
+            continue
+        if settings.LLM_DETERMINISTIC and not routes[name].deterministic:
+            print(f"LLM route {name} uses temperature {routes[name].temperature:g} in deterministic mode; "
+                  f"its answers are not cached")
+    return routes
+
+def _out_of_range(values: Dict[str, int], low: int = 1, high: int = 100) -> List[str]:
+    return [f"{name}={value} outside {low}-{high}" for name, value in values.items() if not low <= value <= high]
+
+def plausibility_problems(result) -> List[str]:
+    """Reasons a schema-valid result is not a believable answer; empty if it is"""
+    if isinstance(result, CombinedAssessmentResult):
+        return [f"{test.value}: {problem}" for test in PersonalityTestType
+                for problem in plausibility_problems(getattr(result, test.value))]
+    if isinstance(result, MBTIResult):
+        return [] if re.fullmatch(r"[EI][SN][TF][JP]", result.type.strip().upper()) else [f"type {result.type!r} is not an MBTI code"]
+    if isinstance(result, BigFiveResult):
+        return _out_of_range(result.model_dump(exclude={"description"}))
+    if isinstance(result, EnneagramResult):
+        problems = [] if 1 <= result.type <= 9 else [f"type {result.type} outside 1-9"]
+        if result.wing is not None and (result.wing - result.type) % 9 not in (1, 8):
+            problems.append(f"wing {result.wing} is not adjacent to type {result.type}")
+        return problems
+    if isinstance(result, DISCResult):
+        scores = result.model_dump(include={"dominance", "influence", "steadiness", "conscientiousness"})
+        problems = _out_of_range(scores, 0)
+        if abs(sum(scores.values()) - 100) > DISC_SUM_TOLERANCE:
+            problems.append(f"DISC percentages sum to {sum(scores.values())}, not 100")
+        return problems
+    if isinstance(result, StrengthsFinderResult):
+        return [] if len(result.top_strengths) >= 3 else [f"only {len(result.top_strengths)} top strengths"]
+    if isinstance(result, LoveLanguagesResult):
+        problems = _out_of_range(result.scores)
+        if result.primary.strip().lower() not in LOVE_LANGUAGES:
+            problems.append(f"primary {result.primary!r} is not a love language")
+        if result.primary.strip().lower() == result.secondary.strip().lower():
+            problems.append("primary and secondary are the same")
+        return problems
+    if isinstance(result, AttachmentStyleResult):
+        problems = _out_of_range({"percentage": result.percentage})
+        if result.style.strip().lower() not in ATTACHMENT_STYLES:
+            problems.append(f"style {result.style!r} is not an attachment style")
+        return problems
+    if isinstance(result, EmotionalIntelligenceResult):
+        return _out_of_range(result.model_dump(exclude={"description"}))
+    if isinstance(result, CareerPersonalityResult):
+        return [] if re.fullmatch(r"[RIASEC]{2,3}", result.holland_code.strip().upper()) else [f"holland_code {result.holland_code!r} is not a RIASEC code"]
+    return []
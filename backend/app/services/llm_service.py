@@ -1,10 +1,84 @@
+import hashlib
 import json
 import asyncio
-from typing import Dict, List, Optional
-from openai import OpenAI
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from openai import AsyncOpenAI, RateLimitError
+from pydantic import ValidationError
 from app.core.config import settings
 from app.schemas.astro import BirthChart
 from app.schemas.personality import *
+from app.services.deadline import DeadlineExceeded, deadline_stats, hop_timeout, no_deadline, remaining
+from app.services.llm_cache import completion_cost, llm_cache
+from app.services.llm_executor import llm_executor, llm_lane
+from app.services.llm_routing import (
+    COMBINED_ROUTE, RESULT_CLASS_TESTS, LLMRoute, RouteStats, default_routes, plausibility_problems
+)
+from app.services.provider_stats import ProviderStats
+from app.services.rate_limiter import rate_limits
+
+# One full assessment makes one call per personality test
+ASSESSMENT_CALLS = 9
+
+# Confidence of an all-LLM assessment
+LLM_CONFIDENCE = 0.95
+
+SYSTEM_PROMPT = "You are a world-renowned expert in both psychological astrology and modern personality psychology, with deep understanding of how celestial patterns reveal psychological structures. Provide thoughtful, nuanced analysis. Respond ONLY with valid JSON in the exact format requested."
+
+# Per-test guidance for the combined single-call mode (condensed from the fan-out prompts)
+COMBINED_TEST_GUIDE = """1. mbti: weigh E/I (element balance, Sun/Moon/Rising, 1st vs 7th house), S/N (Mercury, earth vs fire/air), T/F (Venus vs Mars, air vs water) and J/P (Saturn, cardinal/fixed vs mutable). 4-letter type, 3-4 sentence description, 5 strengths, 4 weaknesses, 5 careers.
+2. big_five: scores 1-100 for openness (Uranus, Neptune, Jupiter, fire/air), conscientiousness (Saturn, earth, Virgo/Capricorn), extraversion (fire/air, Sun, Mars, angular planets), agreeableness (Venus, water, Libra) and neuroticism (Moon aspects, hard Saturn/Pluto aspects, water); 3-4 sentence description.
+3. enneagram: core type 1-9 and an adjacent wing from the motivations shown by Sun, Moon, Saturn and Pluto; 4-5 sentence description, core_motivation, basic_fear, 4 strengths.
+4. disc: percentages adding to 100 for dominance (Mars, fire, cardinal), influence (Venus, Jupiter, air), steadiness (Moon, earth/water, fixed) and conscientiousness (Saturn, Mercury, Virgo); primary_style; description.
+5. strengths_finder: top_strengths = the 5 most strongly indicated of the 34 CliftonStrengths themes; descriptions maps each of them to its astrological evidence.
+6. love_languages: primary and secondary among Words of Affirmation, Quality Time, Receiving Gifts, Acts of Service, Physical Touch; scores maps all five to 1-100 (Venus, Moon, 5th and 7th houses).
+7. attachment_styles: style Secure, Anxious, Avoidant or Disorganized (Moon, Venus, Saturn, 4th house); percentage 1-100; description; 4 characteristics.
+8. emotional_intelligence: scores 1-100 for overall_eq, self_awareness (Moon, water), self_regulation (Saturn, earth), motivation (fire, Sun, Mars, Jupiter), empathy (water, Neptune, Venus) and social_skills (air, Venus, Mercury); 4-5 sentence description.
+9. career_personality: 3-letter RIASEC holland_code, primary_type name, 4 career_matches, 4 work_environments (10th, 6th and 2nd houses, Midheaven)."""
+
+# Set while looking up cached results: completions that miss the cache raise CacheMiss instead of calling OpenAI
+_cache_only: ContextVar[bool] = ContextVar("llm_cache_only", default=False)
+
+class CacheMiss(Exception):
+    """A result that is not in the LLM result cache, raised in cache-only lookups"""
+
+# Models that accept response_format={"type": "json_schema"}
+STRUCTURED_OUTPUT_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+
+class LLMModeStats:
+    """Token and latency accounting for one assessment mode"""
+
+    def __init__(self, mode: str):
+        self.latency = ProviderStats(f"llm_{mode}")
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+
+    def record_usage(self, usage, model: str):
+        self.requests += 1
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+            self.cost_usd += completion_cost(model, usage.prompt_tokens or 0, usage.completion_tokens or 0)
+
+    def to_dict(self) -> Dict:
+        assessments = self.latency.successes
+        latency = self.latency.to_dict()
+        return {
+            "assessments": self.latency.calls,
+            "succeeded": assessments,
+            "failed": self.latency.failures,
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            # Failed attempts' tokens are included: they are part of the cost of the mode
+            "tokens_per_assessment": round((self.prompt_tokens + self.completion_tokens) / assessments) if assessments else None,
+            "cost_usd": round(self.cost_usd, 4),
+            "latency_p50_ms": latency["latency_p50_ms"],
+            "latency_p95_ms": latency["latency_p95_ms"]
+        }
 
 class LLMService:
     """
@@ -15,63 +89,253 @@ class LLMService:
         self.client = None
         if settings.OPENAI_API_KEY and settings.OPENAI_API_KEY != "YOUR_OPENAI_API_KEY_HERE":
             try:
-                self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+                self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None)
             except Exception as e:
                 print(f"Error initializing OpenAI client: {e}")
                 self.client = None
-        self.model = "gpt-4" if settings.LLM_MODEL == "gpt-4o-mini" else settings.LLM_MODEL  # Upgrade to GPT-4 for better analysis
+        # Model, token limit and temperature per test (see llm_routing)
+        self.routes = default_routes()
+        self.route_stats = {name: RouteStats(name) for name in self.routes}
+        self.mode_stats = {mode: LLMModeStats(mode.value) for mode in LLMAssessmentMode}
+        # Background retries of failed tests, keyed by chart hash and test
+        self._retry_tasks: Dict[str, asyncio.Task] = {}
+        self.retry_stats = {"attempts": 0, "succeeded": 0, "gave_up": 0}
+    
+    @property
+    def default_mode(self) -> LLMAssessmentMode:
+        try:
+            return LLMAssessmentMode(settings.LLM_ASSESSMENT_MODE.lower())
+        except ValueError:
+            return LLMAssessmentMode.FANOUT
         
-    def generate_personality_assessment(self, birth_chart: BirthChart) -> PersonalityAssessment:
+    async def generate_personality_assessment(self, birth_chart: BirthChart,
+                                              mode: Optional[LLMAssessmentMode] = None) -> PersonalityAssessment:
+        """
+        Generate complete personality assessment using LLM analysis of birth chart.
+
+        mode (default LLM_ASSESSMENT_MODE): "fanout" sends one request per test,
+        "combined" asks for all nine results in a single structured request.
         """
-        Generate complete personality assessment using LLM analysis of birth chart
+        results = {test: result async for test, result in self.iter_assessment_results(birth_chart, mode)}
+        if not any(result is not None for result in results.values()):
+            return None
+        
+        # Failed slots stay None for the caller to fill from another source
+        return PersonalityAssessment(
+            user_id="llm_generated_user",
+            birth_data=birth_chart.dict(),
+            **{test.value: result for test, result in results.items()},
+            sources={test.value: "llm" for test in PersonalityTestType if results[test] is not None},
+            created_at="2024-01-01T00:00:00Z",
+            confidence_score=LLM_CONFIDENCE  # Higher confidence for sophisticated LLM analysis
+        )
+    
+    async def iter_assessment_results(self, birth_chart: BirthChart, mode: Optional[LLMAssessmentMode] = None
+                                      ) -> AsyncIterator[Tuple[PersonalityTestType, Any]]:
+        """
+        (test, result) pairs in completion order, cached results first, with None
+        for each test that failed. Yields only the cached results when the LLM
+        budget or the request deadline cannot cover the rest, and nothing when the
+        LLM is not configured.
         """
         if not self.client or not settings.USE_LLM:
             print("LLM not configured, falling back to rule-based system")
-            return None
+            return
         
-        print(f"Generating LLM-powered personality assessment using {self.model}")
+        mode = mode or self.default_mode
         
         # Prepare birth chart data for LLM
         chart_data = self._format_birth_chart_for_llm(birth_chart)
         
-        # Generate all assessments sequentially
+        stats = self.mode_stats[mode]
+        started = time.perf_counter()
+        # Cached results cost neither budget nor deadline: serve them first and
+        # check both only for the tests that missed
+        cached = await self._cached_results(chart_data, mode)
+        for test, result in cached.items():
+            yield test, result
+        missed = [test for test in PersonalityTestType if test not in cached]
+        if not missed:
+            print("LLM personality assessment served from the result cache")
+            stats.latency.record((time.perf_counter() - started) * 1000, True)
+            return
+        
+        # Don't start work the budget cannot finish
+        calls = 1 if mode == LLMAssessmentMode.COMBINED else len(missed)
+        if not rate_limits.get("openai").is_available(calls):
+            print("OpenAI request budget exhausted, falling back to rule-based system")
+            return
+        left = remaining()
+        if left is not None and left < settings.LLM_MIN_CALL_BUDGET_SECONDS:
+            deadline_stats.record_skipped("openai")
+            print(f"Only {left:.1f}s left of the request deadline, falling back to rule-based system")
+            return
+        
+        print(f"Generating LLM-powered personality assessment ({mode.value} mode, {len(missed)} tests not cached)")
+        
+        failed = []
+        if mode == LLMAssessmentMode.COMBINED:
+            completed = self._generate_combined_llm(chart_data)
+        else:
+            completed = self._generate_fanout_llm(chart_data, missed)
+        async for test, result in completed:
+            if result is None:
+                failed.append(test)
+            yield test, result
+        stats.latency.record((time.perf_counter() - started) * 1000, not failed)
+        
+        if failed:
+            # Retry in the background; successes land in the LLM result cache, so the
+            # next assessment of this chart gets them
+            self._schedule_retries(chart_data, mode, failed)
+            if len(failed) == len(PersonalityTestType):
+                print("All LLM assessments failed, falling back to rule-based system")
+            else:
+                print(f"LLM assessments failed for {', '.join(test.value for test in failed)}; "
+                      f"keeping the other {len(PersonalityTestType) - len(failed)} results")
+    
+    def _test_generators(self) -> Dict[PersonalityTestType, Callable[[str], Awaitable[Any]]]:
+        return {
+            PersonalityTestType.MBTI: self._generate_mbti_llm,
+            PersonalityTestType.BIG_FIVE: self._generate_big_five_llm,
+            PersonalityTestType.ENNEAGRAM: self._generate_enneagram_llm,
+            PersonalityTestType.DISC: self._generate_disc_llm,
+            PersonalityTestType.STRENGTHS_FINDER: self._generate_strengths_finder_llm,
+            PersonalityTestType.LOVE_LANGUAGES: self._generate_love_languages_llm,
+            PersonalityTestType.ATTACHMENT_STYLES: self._generate_attachment_styles_llm,
+            PersonalityTestType.EMOTIONAL_INTELLIGENCE: self._generate_emotional_intelligence_llm,
+            PersonalityTestType.CAREER_PERSONALITY: self._generate_career_personality_llm
+        }
+    
+    async def _cached_results(self, chart_data: str, mode: LLMAssessmentMode) -> Dict[PersonalityTestType, Any]:
+        """The results of this chart the LLM result cache already holds, without calling OpenAI"""
+        if not llm_cache.enabled:
+            return {}
+        token = _cache_only.set(True)
+        try:
+            if mode == LLMAssessmentMode.COMBINED:
+                try:
+                    return dict(zip(PersonalityTestType, await self._generate_combined_or_raise(chart_data)))
+                except Exception:
+                    return {}
+            generators = self._test_generators()
+            tests = list(PersonalityTestType)
+            results = await asyncio.gather(*(generators[test](chart_data) for test in tests), return_exceptions=True)
+            return {test: result for test, result in zip(tests, results) if not isinstance(result, Exception)}
+        finally:
+            _cache_only.reset(token)
+    
+    async def _generate_fanout_llm(self, chart_data: str, tests: List[PersonalityTestType]
+                                   ) -> AsyncIterator[Tuple[PersonalityTestType, Any]]:
+        """Results from one concurrent request per test as each completes, None for each test that failed"""
+        generators = self._test_generators()
+        
+        async def run(test: PersonalityTestType):
+            try:
+                return test, await generators[test](chart_data)
+            except Exception:
+                return test, None
+        
+        # All tests run concurrently; wall-clock time is that of the slowest call
+        tasks = [asyncio.create_task(run(test)) for test in tests]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer went away (e.g. a closed stream): don't leave calls running
+            for task in tasks:
+                task.cancel()
+    
+    def _schedule_retries(self, chart_data: str, mode: LLMAssessmentMode, failed: List[PersonalityTestType]):
+        """Start one background retry per failed unit of work, unless one is already running"""
+        # A retry's only product is its LLM result cache entry: without the cache it is a paid call thrown away
+        if settings.LLM_RETRY_ATTEMPTS <= 0 or not llm_cache.enabled:
+            return
+        chart_key = hashlib.sha256(chart_data.encode("utf-8")).hexdigest()[:16]
+        # Only deterministic routes' answers are cached, so only they are worth retrying
+        if mode == LLMAssessmentMode.COMBINED:
+            units = {f"{chart_key}:combined": lambda: self._generate_combined_or_raise(chart_data)}
+            if not self.routes[COMBINED_ROUTE].deterministic:
+                units = {}
+        else:
+            generators = self._test_generators()
+            units = {f"{chart_key}:{test.value}": (lambda generate=generators[test]: generate(chart_data))
+                     for test in failed if self.routes[test.value].deterministic}
+        for key, work in units.items():
+            if key in self._retry_tasks:
+                continue
+            # The task copies the current context: drop the scheduling request's deadline
+            # and queue its calls behind interactive and batch work
+            with no_deadline(), llm_lane(LLMPriority.BACKGROUND):
+                task = asyncio.create_task(self._retry_with_backoff(key, work))
+            self._retry_tasks[key] = task
+            task.add_done_callback(lambda done, key=key: self._retry_tasks.pop(key, None))
+    
+    async def _retry_with_backoff(self, key: str, work: Callable[[], Awaitable[Any]]):
+        delay = settings.LLM_RETRY_BACKOFF_SECONDS
+        for attempt in range(1, settings.LLM_RETRY_ATTEMPTS + 1):
+            await asyncio.sleep(delay)
+            self.retry_stats["attempts"] += 1
+            try:
+                await work()
+                self.retry_stats["succeeded"] += 1
+                print(f"Background LLM retry {key} succeeded on attempt {attempt}")
+                return
+            except Exception as e:
+                print(f"Background LLM retry {key} attempt {attempt} failed: {e}")
+            delay *= 2
+        self.retry_stats["gave_up"] += 1
+    
+    async def shutdown(self):
+        """Cancel background retries"""
+        tasks = list(self._retry_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _generate_combined_llm(self, chart_data: str) -> AsyncIterator[Tuple[PersonalityTestType, Any]]:
+        """
+        The nine results from one request: the chart is sent once and the answer is
+        validated against a single combined schema. All None if the call or validation fails.
+        """
         try:
-            mbti = self._generate_mbti_llm(chart_data)
-            big_five = self._generate_big_five_llm(chart_data)
-            enneagram = self._generate_enneagram_llm(chart_data)
-            disc = self._generate_disc_llm(chart_data)
-            strengths = self._generate_strengths_finder_llm(chart_data)
-            love_lang = self._generate_love_languages_llm(chart_data)
-            attachment = self._generate_attachment_styles_llm(chart_data)
-            eq = self._generate_emotional_intelligence_llm(chart_data)
-            career = self._generate_career_personality_llm(chart_data)
-            
-            results = [mbti, big_five, enneagram, disc, strengths, love_lang, attachment, eq, career]
-            
-            # If any assessment failed, return None to fall back to rule-based
-            if any(result is None for result in results):
-                print("Some LLM assessments failed, falling back to rule-based system")
-                return None
-            
-            return PersonalityAssessment(
-                user_id="llm_generated_user",
-                birth_data=birth_chart.dict(),
-                mbti=mbti,
-                big_five=big_five,
-                enneagram=enneagram,
-                disc=disc,
-                strengths_finder=strengths,
-                love_languages=love_lang,
-                attachment_styles=attachment,
-                emotional_intelligence=eq,
-                career_personality=career,
-                created_at="2024-01-01T00:00:00Z",
-                confidence_score=0.95  # Higher confidence for sophisticated LLM analysis
-            )
-            
+            results = await self._generate_combined_or_raise(chart_data)
         except Exception as e:
-            print(f"Error generating LLM assessment: {e}")
-            return None
+            print(f"Error generating combined LLM assessment: {e}")
+            results = [None] * len(PersonalityTestType)
+        for test, result in zip(PersonalityTestType, results):
+            yield test, result
+    
+    async def _generate_combined_or_raise(self, chart_data: str) -> List:
+        schema = CombinedAssessmentResult.model_json_schema()
+        prompt = f"""Analyze this birth chart and produce all nine personality assessments in one JSON object.
+
+{chart_data}
+
+For each assessment, reason from specific placements, signs, houses and aspects in the chart, and make the descriptions reflect this particular chart:
+
+{COMBINED_TEST_GUIDE}
+
+Respond with a single JSON object with exactly these keys, matching this JSON schema:
+{json.dumps(schema, separators=(",", ":"))}"""
+        
+        combined = await self._cached_completion(
+            chart_data, prompt, CombinedAssessmentResult, LLMAssessmentMode.COMBINED,
+            self.routes[COMBINED_ROUTE], json_schema=schema
+        )
+        return [getattr(combined, test.value) for test in PersonalityTestType]
+    
+    def stats(self) -> Dict:
+        """Token and latency accounting per assessment mode and per route"""
+        return {
+            "default_mode": self.default_mode.value,
+            "modes": {mode.value: stats.to_dict() for mode, stats in self.mode_stats.items()},
+            "routes": {name: dict(route.to_dict(), **self.route_stats[name].to_dict()) for name, route in self.routes.items()},
+            "cache": llm_cache.stats(),
+            "background_retries": dict(self.retry_stats, in_flight=len(self._retry_tasks)),
+            "deadlines": deadline_stats.to_dict(),
+            "executor": llm_executor.stats()
+        }
     
     def _format_birth_chart_for_llm(self, birth_chart: BirthChart) -> str:
         """
@@ -124,6 +388,7 @@ class LLMService:
         
         if birth_chart.aspects:
             chart_summary += f"\n⚡ PLANETARY RELATIONSHIPS (Aspects):\n"
+            # Aspects arrive ranked by strength, so these are the tightest ones
             for aspect in birth_chart.aspects[:8]:  # More aspects for deeper analysis
                 planet1 = aspect.get('planet1', '')
                 planet2 = aspect.get('planet2', '')
@@ -136,16 +401,28 @@ class LLMService:
                     'Trine': 'HARMONY - natural flow and ease', 
                     'Square': 'TENSION - dynamic challenge requiring growth',
                     'Opposition': 'POLARITY - need for balance and integration',
-                    'Sextile': 'OPPORTUNITY - potential for positive development'
+                    'Sextile': 'OPPORTUNITY - potential for positive development',
+                    'Quincunx': 'ADJUSTMENT - awkward fit requiring constant recalibration'
                 }.get(aspect_type, 'INTERACTION')
                 
                 chart_summary += f"• {planet1} {aspect_type} {planet2} (orb: {orb}) → {aspect_nature}\n"
         
+        if birth_chart.aspect_patterns:
+            chart_summary += f"\n🔺 ASPECT PATTERNS:\n"
+            for pattern in birth_chart.aspect_patterns:
+                planets = ", ".join(pattern.get('planets', []))
+                detail = ""
+                if pattern.get('apex'):
+                    detail = f" (apex: {pattern['apex']})"
+                elif pattern.get('sign'):
+                    detail = f" in {pattern['sign']}"
+                chart_summary += f"• {pattern.get('pattern', '')}{detail}: {planets}\n"
+        
         chart_summary += f"\n🔮 SYNTHESIS NOTES:\nThis chart shows the complex interplay between {birth_chart.sun_sign} solar identity, {birth_chart.moon_sign} emotional nature, and {birth_chart.rising_sign} external expression, creating a unique psychological fingerprint requiring deep integration of all elements."
         
         return chart_summary.strip()
     
-    def _generate_mbti_llm(self, chart_data: str) -> MBTIResult:
+    async def _generate_mbti_llm(self, chart_data: str) -> MBTIResult:
         """Generate MBTI assessment using sophisticated LLM analysis"""
         
         prompt = f"""You are a master astrologer and depth psychologist with decades of experience integrating Jungian typology with astrological wisdom. 
@@ -207,9 +484,9 @@ Provide your analysis in this exact JSON format:
     "careers": ["[5 career paths that align with both MBTI type and astrological vocational indicators]"]
 }}"""
 
-        return self._call_openai_for_assessment(prompt, MBTIResult)
+        return await self._call_openai_for_assessment(prompt, MBTIResult, chart_data)
     
-    def _generate_big_five_llm(self, chart_data: str) -> BigFiveResult:
+    async def _generate_big_five_llm(self, chart_data: str) -> BigFiveResult:
         """Generate Big Five assessment using sophisticated psychological analysis"""
         
         prompt = f"""You are a renowned personality psychologist specializing in the intersection of astrology and the Five-Factor Model. Conduct a nuanced Big Five analysis.
@@ -278,9 +555,9 @@ Provide precise scores with detailed astrological reasoning:
     "description": "[Detailed 3-4 sentence analysis explaining the specific astrological factors that create this unique personality profile, including how contradictory elements integrate]"
 }}"""
 
-        return self._call_openai_for_assessment(prompt, BigFiveResult)
+        return await self._call_openai_for_assessment(prompt, BigFiveResult, chart_data)
     
-    def _generate_enneagram_llm(self, chart_data: str) -> EnneagramResult:
+    async def _generate_enneagram_llm(self, chart_data: str) -> EnneagramResult:
         """Generate Enneagram assessment using deep motivational analysis"""
         
         prompt = f"""You are a master Enneagram teacher and psychological astrologer specializing in core motivational patterns and unconscious drives.
@@ -337,9 +614,9 @@ Provide your analysis:
     "strengths": ["Four key strengths shown by planetary gifts and positive aspects"]
 }}"""
 
-        return self._call_openai_for_assessment(prompt, EnneagramResult)
+        return await self._call_openai_for_assessment(prompt, EnneagramResult, chart_data)
     
-    def _generate_disc_llm(self, chart_data: str) -> DISCResult:
+    async def _generate_disc_llm(self, chart_data: str) -> DISCResult:
         """Generate DISC assessment using LLM"""
         
         prompt = f"""You are an expert astrologer and psychologist. Based on the birth chart below, determine this person's DISC profile percentages.
@@ -364,9 +641,9 @@ Return ONLY a valid JSON object in this exact format:
     "description": "Your Aries sun and Mars in the 10th house create a D-dominant profile with strong leadership tendencies and direct communication style."
 }}"""
 
-        return self._call_openai_for_assessment(prompt, DISCResult)
+        return await self._call_openai_for_assessment(prompt, DISCResult, chart_data)
     
-    def _generate_strengths_finder_llm(self, chart_data: str) -> StrengthsFinderResult:
+    async def _generate_strengths_finder_llm(self, chart_data: str) -> StrengthsFinderResult:
         """Generate StrengthsFinder assessment using talent-focused astrological analysis"""
         
         prompt = f"""You are a master astrologer specializing in natural talent identification through birth chart analysis, working with Gallup's StrengthsFinder framework.
@@ -420,9 +697,9 @@ Provide detailed astrological evidence for each selected strength:
     }}
 }}"""
 
-        return self._call_openai_for_assessment(prompt, StrengthsFinderResult)
+        return await self._call_openai_for_assessment(prompt, StrengthsFinderResult, chart_data)
     
-    def _generate_love_languages_llm(self, chart_data: str) -> LoveLanguagesResult:
+    async def _generate_love_languages_llm(self, chart_data: str) -> LoveLanguagesResult:
         """Generate Love Languages assessment using LLM"""
         
         prompt = f"""You are an expert astrologer and psychologist. Based on the birth chart below, determine this person's love languages.
@@ -451,9 +728,9 @@ Return ONLY a valid JSON object in this exact format:
     }}
 }}"""
 
-        return self._call_openai_for_assessment(prompt, LoveLanguagesResult)
+        return await self._call_openai_for_assessment(prompt, LoveLanguagesResult, chart_data)
     
-    def _generate_attachment_styles_llm(self, chart_data: str) -> AttachmentStyleResult:
+    async def _generate_attachment_styles_llm(self, chart_data: str) -> AttachmentStyleResult:
         """Generate Attachment Styles assessment using LLM"""
         
         prompt = f"""You are an expert astrologer and psychologist. Based on the birth chart below, determine this person's attachment style.
@@ -476,9 +753,9 @@ Return ONLY a valid JSON object in this exact format:
     "characteristics": ["Comfortable with intimacy", "Good communication", "Emotionally stable", "Trusting in relationships"]
 }}"""
 
-        return self._call_openai_for_assessment(prompt, AttachmentStyleResult)
+        return await self._call_openai_for_assessment(prompt, AttachmentStyleResult, chart_data)
     
-    def _generate_emotional_intelligence_llm(self, chart_data: str) -> EmotionalIntelligenceResult:
+    async def _generate_emotional_intelligence_llm(self, chart_data: str) -> EmotionalIntelligenceResult:
         """Generate Emotional Intelligence assessment using sophisticated EQ analysis"""
         
         prompt = f"""You are a leading expert in emotional intelligence and psychological astrology, specializing in how celestial patterns reveal emotional capacities and social intelligence.
@@ -547,9 +824,9 @@ Calculate precise scores considering multiple factors, not just obvious ones:
     "description": "[4-5 sentences explaining the specific astrological factors that create this person's unique emotional intelligence profile, including how different planetary energies integrate to support or challenge their EQ development]"
 }}"""
 
-        return self._call_openai_for_assessment(prompt, EmotionalIntelligenceResult)
+        return await self._call_openai_for_assessment(prompt, EmotionalIntelligenceResult, chart_data)
     
-    def _generate_career_personality_llm(self, chart_data: str) -> CareerPersonalityResult:
+    async def _generate_career_personality_llm(self, chart_data: str) -> CareerPersonalityResult:
         """Generate Career Personality (Holland Code) assessment using LLM"""
         
         prompt = f"""You are an expert astrologer and psychologist. Based on the birth chart below, determine this person's Holland Code career personality.
@@ -576,36 +853,139 @@ Return ONLY a valid JSON object in this exact format:
     "work_environments": ["Leadership roles", "Dynamic environments", "People interaction", "Goal-oriented settings"]
 }}"""
 
-        return self._call_openai_for_assessment(prompt, CareerPersonalityResult)
+        return await self._call_openai_for_assessment(prompt, CareerPersonalityResult, chart_data)
     
-    def _call_openai_for_assessment(self, prompt: str, result_class) -> any:
+    async def _call_openai_for_assessment(self, prompt: str, result_class, chart_data: str) -> any:
         """
         Helper method to call OpenAI API and parse result into the expected class
         """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a world-renowned expert in both psychological astrology and modern personality psychology, with deep understanding of how celestial patterns reveal psychological structures. Provide thoughtful, nuanced analysis. Respond ONLY with valid JSON in the exact format requested."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.8,  # Higher creativity for nuanced analysis
-                max_tokens=2000   # More tokens for detailed reasoning
-            )
-            
-            content = response.choices[0].message.content.strip()
-            
-            # Parse JSON response
-            try:
-                json_data = json.loads(content)
-                return result_class(**json_data)
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing error for {result_class.__name__}: {e}")
-                print(f"Raw response: {content}")
-                raise
-                
+            route = self.routes[RESULT_CLASS_TESTS[result_class].value]
+            return await self._cached_completion(chart_data, prompt, result_class, LLMAssessmentMode.FANOUT, route)
+        except CacheMiss:
+            raise
         except Exception as e:
             print(f"Error calling OpenAI for {result_class.__name__}: {e}")
             raise
+    
+    async def _cached_completion(self, chart_data: str, prompt: str, result_class, mode: LLMAssessmentMode,
+                                 route: LLMRoute, json_schema: Optional[Dict] = None):
+        """
+        Validated result for a prompt, from the LLM result cache when this chart,
+        route, prompt version and temperature were answered before by one of the
+        route's models. Otherwise the route's model is asked first; an answer that
+        fails the schema or the plausibility checks is retried once on the
+        escalation model.
+        """
+        # Entries are keyed by the model that produced them; an escalated answer is
+        # found under the escalation model's key once the first model's key misses
+        keys = {model: llm_cache.make_key(chart_data, prompt, SYSTEM_PROMPT, route.name, model, route.temperature)
+                for model in route.models}
+        cache_only = _cache_only.get()
+        # Routes with an explicit non-zero temperature sample: their answers are never cached.
+        # A cache-only lookup is repeated by the call that follows a miss: count the miss there
+        if route.deterministic:
+            cached = await llm_cache.get_first([keys[model] for model in route.models], count_miss=not cache_only)
+            if cached is not None:
+                return result_class.model_validate_json(cached)
+        if cache_only:
+            raise CacheMiss(route.name)
+        
+        stats = self.route_stats[route.name]
+        started = time.perf_counter()
+        success = False
+        problem = RuntimeError(f"No model configured for the {route.name} route")
+        try:
+            for attempt, model in enumerate(route.models):
+                if attempt:
+                    stats.escalations += 1
+                    print(f"Escalating {route.name} from {route.models[attempt - 1]} to {model}")
+                response_format = None
+                if json_schema is not None and model.startswith(STRUCTURED_OUTPUT_MODELS):
+                    response_format = {
+                        "type": "json_schema",
+                        # Not strict: strict mode cannot express the free-form score/description maps
+                        "json_schema": {"name": "personality_assessment", "schema": json_schema, "strict": False}
+                    }
+                content, usage = await self._complete(prompt, mode, route, model, response_format)
+                
+                # Parse JSON response
+                try:
+                    result = result_class(**json.loads(content))
+                except (json.JSONDecodeError, ValidationError, TypeError) as e:
+                    stats.rejected["invalid"] += 1
+                    print(f"Invalid {result_class.__name__} from {model}: {e}")
+                    print(f"Raw response: {content[:500]}")
+                    problem = e
+                    continue
+                problems = plausibility_problems(result)
+                if problems:
+                    stats.rejected["implausible"] += 1
+                    print(f"Implausible {result_class.__name__} from {model}: {'; '.join(problems)}")
+                    problem = ValueError("; ".join(problems))
+                    continue
+                
+                if route.deterministic:
+                    await llm_cache.set(
+                        keys[model], route.name, result.model_dump_json(),
+                        getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0, model
+                    )
+                success = True
+                return result
+            raise problem
+        finally:
+            stats.latency.record((time.perf_counter() - started) * 1000, success)
+    
+    async def _complete(self, prompt: str, mode: LLMAssessmentMode, route: LLMRoute, model: str,
+                        response_format: Optional[Dict] = None) -> Tuple[str, Any]:
+        """
+        One chat completion with the shared system prompt, returning the message text
+        and token usage. Waits for a slot in the current lane of the LLM executor,
+        then spends one call of OpenAI budget; bounded by LLM_CALL_TIMEOUT_SECONDS or
+        the request deadline, whichever is sooner (including client retries). Token
+        usage is charged to the mode's and the route's statistics.
+        """
+        # Bounded by what is left of the request deadline; too little left and the
+        # test is served rule-based instead
+        timeout = hop_timeout(settings.LLM_CALL_TIMEOUT_SECONDS)
+        if timeout < settings.LLM_MIN_CALL_BUDGET_SECONDS:
+            deadline_stats.record_skipped("openai")
+            raise DeadlineExceeded(f"{timeout:.1f}s left of the request deadline, not calling OpenAI for {route.name}")
+        options = {"response_format": response_format} if response_format else {}
+        if settings.LLM_DETERMINISTIC:
+            options["seed"] = settings.LLM_SEED
+        
+        async def create():
+            async with llm_executor.slot():
+                # Budget is spent only once the call is really made, not by calls
+                # shed from the queue or timed out waiting for a slot
+                if not rate_limits.get("openai").try_acquire():
+                    raise RuntimeError("OpenAI request budget exhausted")
+                return await self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=route.temperature,  # LLM_TEMPERATURE (0.8) unless the route or deterministic mode sets it
+                    max_tokens=route.max_tokens,
+                    **options
+                )
+        
+        try:
+            # The timeout covers waiting for a concurrency slot as well as the call
+            response = await asyncio.wait_for(create(), timeout=timeout)
+        except asyncio.TimeoutError:
+            if timeout < settings.LLM_CALL_TIMEOUT_SECONDS:
+                deadline_stats.record_timed_out("openai")
+            print(f"OpenAI call for {route.name} timed out after {timeout:.1f}s")
+            raise
+        except RateLimitError as e:
+            rate_limits.get("openai").record_throttled(e.response.headers.get("retry-after"))
+            raise
+        usage = getattr(response, "usage", None)
+        self.mode_stats[mode].record_usage(usage, model)
+        self.route_stats[route.name].record_usage(usage, model)
+        return response.choices[0].message.content.strip(), usage
 
 llm_service = LLMService()
\ No newline at end of file
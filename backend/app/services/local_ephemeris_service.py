@@ -0,0 +1,123 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.schemas.astro import BirthDataRequest, AstroResponse, BirthChart, PlanetPosition
+from app.services import ephemeris, ephemeris_batch
+from app.services.aspect_engine import aspect_engine
+from app.services.ephemeris_table import ephemeris_table
+from app.services.geo_service import get_timezone, parse_local_datetime
+
+class LocalEphemerisService:
+    """
+    Offline chart provider computing positions with the built-in analytical ephemeris.
+
+    Needs no network or credentials. Output can be tropical (to line up with
+    AstroAPI) or sidereal with the Lahiri ayanamsa (to line up with Prokerala).
+    """
+
+    def __init__(self):
+        self.zodiac = settings.LOCAL_EPHEMERIS_ZODIAC
+        self.house_system = settings.LOCAL_EPHEMERIS_HOUSE_SYSTEM
+
+    def is_configured(self) -> bool:
+        return settings.LOCAL_EPHEMERIS_ENABLED
+
+    async def get_birth_chart(self, birth_data: BirthDataRequest) -> Optional[AstroResponse]:
+        """
+        Compute the birth chart locally
+        """
+        try:
+            return self.compute_birth_chart(birth_data)
+        except Exception as e:
+            print(f"Error computing local ephemeris chart: {e}")
+            return None
+
+    def compute_birth_chart(self, birth_data: BirthDataRequest, zodiac: str = None) -> AstroResponse:
+        zodiac = zodiac or self.zodiac
+        utc_time = self.to_utc(birth_data)
+        jd = ephemeris.julian_day(
+            utc_time.year, utc_time.month, utc_time.day,
+            utc_time.hour + utc_time.minute / 60.0 + utc_time.second / 3600.0
+        )
+        table = ephemeris_table.get()
+        motion = table.longitudes_and_speeds(jd) if table is not None and table.covers(jd) else None
+        chart = ephemeris.compute_chart(
+            jd, birth_data.latitude, birth_data.longitude, zodiac, self.house_system, motion
+        )
+        return self._build_response(chart, utc_time)
+
+    def compute_birth_charts(self, birth_data_list: List[BirthDataRequest], zodiac: str = None) -> ephemeris_batch.ChartBatch:
+        """
+        Compute many charts in one vectorized pass (backfills, cohort analytics).
+        Returns columnar results; call .chart(i) for individual BirthChart objects.
+        """
+        utc_times = [self.to_utc(birth_data) for birth_data in birth_data_list]
+        julian_days = ephemeris_batch.to_julian_days([t.timestamp() for t in utc_times])
+        return ephemeris_batch.compute_charts(
+            julian_days,
+            [birth_data.latitude for birth_data in birth_data_list],
+            [birth_data.longitude for birth_data in birth_data_list],
+            zodiac or self.zodiac,
+            self.house_system
+        )
+
+    def to_utc(self, birth_data: BirthDataRequest) -> datetime:
+        """Convert the local birth date/time to UTC using the request's timezone"""
+        local = parse_local_datetime(birth_data.birth_date, birth_data.birth_time)
+        return local.replace(tzinfo=self._parse_timezone(birth_data.timezone)).astimezone(timezone.utc)
+
+    def _parse_timezone(self, tz_name: str):
+        """IANA zone names or fixed offsets, via the cached geo_service lookup"""
+        zone = get_timezone((tz_name or "").strip())
+        if zone is None:
+            # Guessing UTC would shift the chart by hours and still look like real provider data
+            raise ValueError(f"Unknown timezone '{tz_name}'")
+        return zone
+
+    def _build_response(self, chart: Dict, utc_time: datetime) -> AstroResponse:
+        planets = []
+        for name in ephemeris.PLANETS:
+            info = chart["planets"][name]
+            sign, degree = ephemeris.sign_of(info["longitude"])
+            planets.append(PlanetPosition(
+                name=name,
+                sign=sign,
+                degree=round(degree, 2),
+                house=info["house"],
+                retrograde=info["retrograde"]
+            ))
+
+        houses = {
+            str(k + 1): ephemeris.sign_of(cusp)[0]
+            for k, cusp in enumerate(chart["house_cusps"])
+        }
+
+        aspects = aspect_engine.compute([chart["planets"][name]["longitude"] for name in ephemeris.PLANETS])
+        birth_chart = BirthChart(
+            sun_sign=ephemeris.sign_of(chart["planets"]["Sun"]["longitude"])[0],
+            moon_sign=ephemeris.sign_of(chart["planets"]["Moon"]["longitude"])[0],
+            rising_sign=ephemeris.sign_of(chart["ascendant"])[0],
+            planets=planets,
+            houses=houses,
+            aspects=aspects.aspects(0),
+            aspect_patterns=aspects.patterns(0)
+        )
+
+        return AstroResponse(
+            birth_chart=birth_chart,
+            raw_data={
+                "local_ephemeris": {
+                    "utc_time": utc_time.isoformat(),
+                    "julian_day": chart["julian_day"],
+                    "zodiac": chart["zodiac"],
+                    "ayanamsa": round(chart["ayanamsa"], 6),
+                    "house_system": chart["house_system"],
+                    "ascendant": round(chart["ascendant"], 4),
+                    "midheaven": round(chart["midheaven"], 4),
+                    "house_cusps": [round(c, 4) for c in chart["house_cusps"]],
+                    "longitudes": {name: round(info["longitude"], 4) for name, info in chart["planets"].items()}
+                }
+            }
+        )
+
+local_ephemeris_service = LocalEphemerisService()
@@ -0,0 +1,212 @@
+import asyncio
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+from app.schemas.astro import AstroResponse
+from app.schemas.personality import PersonalityAssessment
+
+class PersistentStore:
+    """
+    On-disk store for birth charts and personality assessments, backed by DATABASE_URL.
+
+    Only SQLite URLs are supported. All database work runs in a worker thread via
+    asyncio.to_thread so reads and writes never block the event loop.
+    """
+
+    def __init__(self, database_url: str = None):
+        self.database_url = database_url or settings.DATABASE_URL
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.chart_reads = 0
+        self.chart_hits = 0
+        self.chart_writes = 0
+        self.assessment_writes = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def _sqlite_path(self) -> Optional[str]:
+        """Extract the file path from a sqlite:/// URL, or None for other backends"""
+        prefix = "sqlite:///"
+        if not self.database_url.startswith(prefix):
+            return None
+        return self.database_url[len(prefix):] or ":memory:"
+
+    async def initialize(self):
+        """Open the database and create tables"""
+        if not settings.PERSISTENCE_ENABLED or self._conn is not None:
+            return
+
+        path = self._sqlite_path()
+        if path is None:
+            print(f"Persistence disabled: unsupported DATABASE_URL scheme ({self.database_url.split(':', 1)[0]})")
+            return
+
+        try:
+            await asyncio.to_thread(self._connect, path)
+            print(f"Persistent store ready at {path}")
+        except Exception as e:
+            print(f"Error initializing persistent store: {e}")
+            self._conn = None
+
+    def _connect(self, path: str):
+        conn = sqlite3.connect(path, check_same_thread=False)
+        if settings.SQLITE_WAL and path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS charts (
+                fingerprint TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS assessments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fingerprint TEXT,
+                user_id TEXT NOT NULL,
+                assessment TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_assessments_fingerprint ON assessments (fingerprint);
+            CREATE INDEX IF NOT EXISTS idx_assessments_user_id ON assessments (user_id);
+            CREATE TABLE IF NOT EXISTS llm_results (
+                key TEXT PRIMARY KEY,
+                test_type TEXT NOT NULL,
+                model TEXT NOT NULL,
+                result TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS raw_payloads (
+                ref TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                created_at TEXT NOT NULL
+            );
+        """)
+        conn.commit()
+        self._conn = conn
+
+    async def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        await asyncio.to_thread(self._close_connection, conn)
+
+    def _close_connection(self, conn: sqlite3.Connection):
+        with self._lock:
+            conn.close()
+
+    def _execute(self, sql: str, params: Tuple = (), fetch: str = None):
+        """Run a statement under the connection lock (called from a worker thread)"""
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            if fetch == "one":
+                return cursor.fetchone()
+            if fetch == "all":
+                return cursor.fetchall()
+            self._conn.commit()
+            return True
+
+    async def _run(self, sql: str, params: Tuple = (), fetch: str = None):
+        if self._conn is None:
+            return None
+        try:
+            return await asyncio.to_thread(self._execute, sql, params, fetch)
+        except Exception as e:
+            self.errors += 1
+            print(f"Persistent store error: {e}")
+            return None
+
+    async def _write(self, sql: str, params: Tuple = ()) -> bool:
+        """Run a write statement; True once it is committed"""
+        return await self._run(sql, params) is not None
+
+    async def get_chart(self, fingerprint: str) -> Optional[Tuple[str, AstroResponse]]:
+        """Return (provider, response) for a stored chart"""
+        if not self.enabled:
+            return None
+        self.chart_reads += 1
+        row = await self._run(
+            "SELECT provider, response FROM charts WHERE fingerprint = ?", (fingerprint,), fetch="one"
+        )
+        if not row:
+            return None
+        try:
+            response = AstroResponse.model_validate_json(row[1])
+        except Exception as e:
+            print(f"Discarding unreadable stored chart {fingerprint[:12]}: {e}")
+            return None
+        self.chart_hits += 1
+        return row[0], response
+
+    async def save_chart(self, fingerprint: str, provider: str, response: AstroResponse):
+        if not self.enabled:
+            return
+        if await self._write(
+            "INSERT OR REPLACE INTO charts (fingerprint, provider, response, created_at) VALUES (?, ?, ?, ?)",
+            (fingerprint, provider, response.model_dump_json(), datetime.utcnow().isoformat())
+        ):
+            self.chart_writes += 1
+
+    async def save_raw_payload(self, ref: str, provider: str, payload: bytes) -> bool:
+        """Store a compressed raw provider payload under its content hash; True once stored"""
+        if not self.enabled:
+            return False
+        return await self._write(
+            "INSERT OR IGNORE INTO raw_payloads (ref, provider, payload, created_at) VALUES (?, ?, ?, ?)",
+            (ref, provider, payload, datetime.utcnow().isoformat())
+        )
+
+    async def get_raw_payload(self, ref: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        row = await self._run("SELECT payload FROM raw_payloads WHERE ref = ?", (ref,), fetch="one")
+        return row[0] if row else None
+
+    async def get_llm_result(self, key: str) -> Optional[Tuple[str, int, int, str]]:
+        """(result JSON, prompt tokens, completion tokens, model) for a cached LLM result"""
+        if not self.enabled:
+            return None
+        row = await self._run(
+            "SELECT result, prompt_tokens, completion_tokens, model FROM llm_results WHERE key = ?",
+            (key,), fetch="one"
+        )
+        return tuple(row) if row else None
+
+    async def save_llm_result(self, key: str, test_type: str, entry: Tuple[str, int, int, str]):
+        if not self.enabled:
+            return
+        result, prompt_tokens, completion_tokens, model = entry
+        await self._write(
+            "INSERT OR REPLACE INTO llm_results (key, test_type, model, result, prompt_tokens, completion_tokens, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, test_type, model, result, prompt_tokens, completion_tokens, datetime.utcnow().isoformat())
+        )
+
+    async def save_assessment(self, fingerprint: Optional[str], user_id: str, assessment: PersonalityAssessment):
+        if not self.enabled:
+            return
+        if await self._write(
+            "INSERT INTO assessments (fingerprint, user_id, assessment, created_at) VALUES (?, ?, ?, ?)",
+            (fingerprint, user_id, assessment.model_dump_json(), datetime.utcnow().isoformat())
+        ):
+            self.assessment_writes += 1
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "chart_reads": self.chart_reads,
+            "chart_hits": self.chart_hits,
+            "chart_writes": self.chart_writes,
+            "assessment_writes": self.assessment_writes,
+            "errors": self.errors
+        }
+
+persistent_store = PersistentStore()
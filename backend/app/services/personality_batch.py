@@ -0,0 +1,150 @@
+"""
+Vectorized rule-based scoring for bulk jobs (re-scoring stored charts after a rule change).
+
+The rules live only in `PersonalityEngine`'s rule-based generators. Their
+compiled form (`rule_tables.RuleTable`, filled for every feature combination)
+is turned into one NumPy column per result field and test, indexed by the
+test's feature key. Scoring N charts is then a vectorized key computation and a
+gather per column, and every row equals the per-chart result. No LLM is
+involved; `PersonalityAssessment` objects are only built when asked for.
+"""
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+from app.schemas.personality import *
+from app.services.ephemeris import ZODIAC_SIGNS
+from app.services.rule_tables import FEATURES, RULE_FEATURES, RuleTable
+
+# Result fields exported as columns; lists are spread over one column per
+# position and maps over one column per key
+COLUMN_FIELDS: Dict[PersonalityTestType, List[str]] = {
+    PersonalityTestType.MBTI: ["type"],
+    PersonalityTestType.BIG_FIVE: ["openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism"],
+    PersonalityTestType.ENNEAGRAM: ["type", "wing"],
+    PersonalityTestType.DISC: ["dominance", "influence", "steadiness", "conscientiousness", "primary_style"],
+    PersonalityTestType.STRENGTHS_FINDER: ["top_strengths"],
+    PersonalityTestType.LOVE_LANGUAGES: ["primary", "secondary", "scores"],
+    PersonalityTestType.ATTACHMENT_STYLES: ["style", "percentage"],
+    PersonalityTestType.EMOTIONAL_INTELLIGENCE: [
+        "overall_eq", "self_awareness", "self_regulation", "motivation", "empathy", "social_skills"
+    ],
+    PersonalityTestType.CAREER_PERSONALITY: ["holland_code", "primary_type"]
+}
+
+def _column(values: List) -> np.ndarray:
+    if all(isinstance(value, int) for value in values):
+        return np.array(values, dtype=np.int16)
+    return np.array(["" if value is None else str(value) for value in values])
+
+class CompiledColumns:
+    """Per-test result columns indexed by feature key, built from a filled RuleTable"""
+
+    def __init__(self, table: RuleTable):
+        self.version = table.version
+        self.results = {test: table.results(test) for test in PersonalityTestType}
+        self.columns: Dict[PersonalityTestType, Dict[str, np.ndarray]] = {}
+        for test, fields in COLUMN_FIELDS.items():
+            results = self.results[test]
+            columns = {}
+            for field in fields:
+                values = [getattr(result, field) for result in results]
+                name = f"{test.value}_{field}"
+                if isinstance(values[0], list):
+                    width = max(len(value) for value in values)
+                    for k in range(width):
+                        columns[f"{name}_{k + 1}"] = _column([value[k] if k < len(value) else "" for value in values])
+                elif isinstance(values[0], dict):
+                    for key in values[0]:
+                        columns[f"{name}_{key.lower().replace(' ', '_')}"] = _column([value.get(key, 0) for value in values])
+                else:
+                    columns[name] = _column(values)
+            self.columns[test] = columns
+
+_compiled: Dict[str, CompiledColumns] = {}
+
+def compiled_columns(table: RuleTable) -> CompiledColumns:
+    """Columns for the table's rule version, compiled once per version"""
+    compiled = _compiled.get(table.version)
+    if compiled is None:
+        _compiled.clear()  # only the current rules are ever scored
+        compiled = _compiled[table.version] = CompiledColumns(table)
+    return compiled
+
+def _signs(values, n: Optional[int] = None, name: str = "sign") -> np.ndarray:
+    array = np.asarray(values)
+    if n is not None:
+        array = np.broadcast_to(array, (n,))
+    if array.ndim != 1 or not np.issubdtype(array.dtype, np.integer):
+        raise ValueError(f"{name} must be a 1-D array of sign indices")
+    if array.size and (array.min() < 0 or array.max() >= len(ZODIAC_SIGNS)):
+        raise ValueError(f"{name} sign indices must be 0-{len(ZODIAC_SIGNS) - 1}")
+    return array.astype(np.intp)
+
+class AssessmentBatch:
+    """
+    Columnar rule-based results for N charts.
+
+    `keys[test]` holds each row's index into the compiled table of that test;
+    column(name) gathers one result field for all rows. Use assessment(i) /
+    assessments() to materialize PersonalityAssessment objects lazily.
+    """
+
+    def __init__(self, compiled: CompiledColumns, confidence: float, features: Dict[str, np.ndarray]):
+        self.compiled = compiled
+        self.rules_version = compiled.version
+        self.confidence = confidence
+        self.features = features
+        self.keys: Dict[PersonalityTestType, np.ndarray] = {}
+        for test, names in RULE_FEATURES.items():
+            key = np.zeros(len(self), dtype=np.intp)
+            for name in names:
+                key = key * len(ZODIAC_SIGNS) + features[name]
+            self.keys[test] = key
+
+    def __len__(self) -> int:
+        return len(self.features["sun"])
+
+    def column(self, name: str) -> np.ndarray:
+        """One result column (e.g. "mbti_type", "disc_dominance") for all rows"""
+        for test, columns in self.compiled.columns.items():
+            if name in columns:
+                return columns[name][self.keys[test]]
+        raise KeyError(name)
+
+    def result(self, test: PersonalityTestType, i: int):
+        """The (frozen, shared) rule-based result of `test` for row i"""
+        return self.compiled.results[test][self.keys[test][i]]
+
+    def assessment(self, i: int, user_id: str = "rule_based_user", birth_data: Optional[Dict] = None) -> PersonalityAssessment:
+        """Build the PersonalityAssessment for row i"""
+        if birth_data is None:
+            birth_data = {f"{name}_sign": ZODIAC_SIGNS[self.features[name][i]] for name in ("sun", "moon", "rising")}
+        return PersonalityAssessment(
+            user_id=user_id,
+            birth_data=birth_data,
+            **{test.value: self.result(test, i) for test in PersonalityTestType},
+            sources={test.value: "rule_based" for test in PersonalityTestType},
+            created_at="2024-01-01T00:00:00Z",
+            confidence_score=self.confidence
+        )
+
+    def assessments(self) -> Iterator[PersonalityAssessment]:
+        for i in range(len(self)):
+            yield self.assessment(i)
+
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        """Plain column dict, e.g. for writing to storage or a dataframe"""
+        columns = {f"{name}_sign_index": self.features[name] for name in FEATURES}
+        for test, test_columns in self.compiled.columns.items():
+            keys = self.keys[test]
+            for name, values in test_columns.items():
+                columns[name] = values[keys]
+        return columns
+
+def score_batch(table: RuleTable, confidence: float, sun, moon, rising, mars=None, venus=None, mercury=None) -> AssessmentBatch:
+    """Validate the sign-index columns and score them; see PersonalityEngine.score_batch"""
+    sun = _signs(sun, name="sun")
+    n = len(sun)
+    features = {"sun": sun, "moon": _signs(moon, n, "moon"), "rising": _signs(rising, n, "rising")}
+    for name, values in (("mars", mars), ("venus", venus), ("mercury", mercury)):
+        features[name] = sun if values is None else _signs(values, n, name)
+    return AssessmentBatch(compiled_columns(table), confidence, features)
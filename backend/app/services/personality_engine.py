@@ -1,7 +1,11 @@
-from typing import Dict, List
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 from app.schemas.astro import BirthChart
 from app.schemas.personality import *
-from app.services.llm_service import llm_service
+from app.services import personality_batch
+from app.services.llm_service import LLM_CONFIDENCE, llm_service
+from app.services.rule_tables import RuleTable, chart_features, rules_version
+
+RULE_BASED_CONFIDENCE = 0.75
 
 class PersonalityEngine:
     """
@@ -11,34 +15,107 @@ class PersonalityEngine:
     def __init__(self):
         self.sign_traits = self._init_sign_traits()
         self.planet_influences = self._init_planet_influences()
+        # Methods holding the rules: the rule table is rebuilt when any of them changes
+        self._rule_names = sorted(name for name in dir(type(self)) if name.startswith(("_generate_", "_get_", "_init_")))
+        self._rule_codes = None
+        self._table = None
     
-    async def generate_all_assessments(self, birth_chart: BirthChart) -> PersonalityAssessment:
+    async def generate_all_assessments(self, birth_chart: BirthChart,
+                                       llm_mode: Optional[LLMAssessmentMode] = None) -> PersonalityAssessment:
         """Generate all 9 personality assessments from birth chart data"""
         
         # Try LLM-powered assessment first
-        llm_assessment = llm_service.generate_personality_assessment(birth_chart)
+        llm_assessment = await llm_service.generate_personality_assessment(birth_chart, llm_mode)
         if llm_assessment:
-            print("✅ Successfully generated LLM-powered personality assessment")
-            return llm_assessment
+            rule_based = [test for test in PersonalityTestType if getattr(llm_assessment, test.value) is None]
+            if not rule_based:
+                print("✅ Successfully generated LLM-powered personality assessment")
+                return llm_assessment
+            # Keep the LLM results and fill only the failed tests
+            print(f"⚠️ Filling {len(rule_based)} failed LLM assessments from the rule-based system")
+            update = self._rule_based_results(birth_chart, rule_based)
+            update["sources"] = {
+                test.value: "rule_based" if test in rule_based else "llm" for test in PersonalityTestType
+            }
+            update["confidence_score"] = self.blended_confidence(update["sources"])
+            return llm_assessment.model_copy(update=update)
         
         # Fall back to rule-based system
         print("⚠️ LLM unavailable, using rule-based personality assessment")
         return PersonalityAssessment(
             user_id="rule_based_user",
             birth_data=birth_chart.dict(),
-            mbti=self._generate_mbti(birth_chart),
-            big_five=self._generate_big_five(birth_chart),
-            enneagram=self._generate_enneagram(birth_chart),
-            disc=self._generate_disc(birth_chart),
-            strengths_finder=self._generate_strengths_finder(birth_chart),
-            love_languages=self._generate_love_languages(birth_chart),
-            attachment_styles=self._generate_attachment_styles(birth_chart),
-            emotional_intelligence=self._generate_emotional_intelligence(birth_chart),
-            career_personality=self._generate_career_personality(birth_chart),
+            **self._rule_based_results(birth_chart, PersonalityTestType),
+            sources={test.value: "rule_based" for test in PersonalityTestType},
             created_at="2024-01-01T00:00:00Z",
-            confidence_score=0.75  # Lower confidence for rule-based
+            confidence_score=RULE_BASED_CONFIDENCE  # Lower confidence for rule-based
         )
     
+    async def stream_assessments(self, birth_chart: BirthChart, llm_mode: Optional[LLMAssessmentMode] = None
+                                 ) -> AsyncIterator[Tuple[PersonalityTestType, Any, str]]:
+        """
+        (test, result, source) for all 9 assessments as each becomes available:
+        LLM results in completion order, failed or unavailable ones rule-based
+        """
+        table = self.rule_table()
+        features = chart_features(birth_chart)
+        remaining = list(PersonalityTestType)
+        async for test, result in llm_service.iter_assessment_results(birth_chart, llm_mode):
+            remaining.remove(test)
+            if result is None:
+                yield test, table.lookup(test, birth_chart, features), "rule_based"
+            else:
+                yield test, result, "llm"
+        for test in remaining:
+            yield test, table.lookup(test, birth_chart, features), "rule_based"
+    
+    def score_batch(self, sun, moon, rising, mars=None, venus=None, mercury=None) -> personality_batch.AssessmentBatch:
+        """
+        Rule-based results for N charts from arrays of sign indices (ZODIAC_SIGNS
+        order), vectorized and without trying the LLM. Mars, Venus and Mercury
+        default to the sun sign, as in the per-chart rules. Results are gathered
+        from the fully compiled rule table, so they are the per-chart results.
+        Returns columnar results; PersonalityAssessment objects are built lazily
+        via .assessment(i).
+        """
+        return personality_batch.score_batch(self.rule_table(), RULE_BASED_CONFIDENCE, sun, moon, rising, mars, venus, mercury)
+    
+    @staticmethod
+    def blended_confidence(sources: Dict[str, str]) -> float:
+        """Average of the per-test confidence of each result's source"""
+        scores = [LLM_CONFIDENCE if source == "llm" else RULE_BASED_CONFIDENCE for source in sources.values()]
+        return round(sum(scores) / len(scores), 4) if scores else RULE_BASED_CONFIDENCE
+    
+    def rule_table(self) -> RuleTable:
+        """The compiled rule-based results (see rule_tables), rebuilt when the rule code changed"""
+        codes = tuple(getattr(self, name).__code__ for name in self._rule_names)
+        if codes != self._rule_codes:
+            version = rules_version([getattr(self, name) for name in self._rule_names])
+            if self._table is not None:
+                print(f"Personality rules changed, rebuilding rule table (version {version})")
+            self._table = RuleTable(self._rule_based_generators(), version)
+            self._rule_codes = codes
+        return self._table
+    
+    def _rule_based_results(self, birth_chart: BirthChart, tests) -> Dict[str, Any]:
+        """Rule-based results for `tests`, keyed by test name"""
+        table = self.rule_table()
+        features = chart_features(birth_chart)
+        return {test.value: table.lookup(test, birth_chart, features) for test in tests}
+    
+    def _rule_based_generators(self) -> Dict[PersonalityTestType, Callable[[BirthChart], Any]]:
+        return {
+            PersonalityTestType.MBTI: self._generate_mbti,
+            PersonalityTestType.BIG_FIVE: self._generate_big_five,
+            PersonalityTestType.ENNEAGRAM: self._generate_enneagram,
+            PersonalityTestType.DISC: self._generate_disc,
+            PersonalityTestType.STRENGTHS_FINDER: self._generate_strengths_finder,
+            PersonalityTestType.LOVE_LANGUAGES: self._generate_love_languages,
+            PersonalityTestType.ATTACHMENT_STYLES: self._generate_attachment_styles,
+            PersonalityTestType.EMOTIONAL_INTELLIGENCE: self._generate_emotional_intelligence,
+            PersonalityTestType.CAREER_PERSONALITY: self._generate_career_personality
+        }
+    
     def _generate_mbti(self, chart: BirthChart) -> MBTIResult:
         """Generate MBTI result based on sun, moon, and rising signs"""
         sun_sign = chart.sun_sign
@@ -227,10 +304,11 @@ class PersonalityEngine:
             "Pisces": ["Empathy", "Harmony", "Connectedness", "Developer"]
         }
         
-        strengths = set()
-        strengths.update(sign_strengths.get(sun_sign, [])[:2])
-        strengths.update(sign_strengths.get(moon_sign, [])[:2])
-        strengths.update(sign_strengths.get(rising_sign, [])[:1])
+        # Insertion-ordered set (dict keys): a set's order would depend on the hash seed
+        strengths = {}
+        strengths.update(dict.fromkeys(sign_strengths.get(sun_sign, [])[:2]))
+        strengths.update(dict.fromkeys(sign_strengths.get(moon_sign, [])[:2]))
+        strengths.update(dict.fromkeys(sign_strengths.get(rising_sign, [])[:1]))
         
         # Ensure we have exactly 5 strengths
         all_strengths = [
@@ -246,7 +324,7 @@ class PersonalityEngine:
         while len(strengths) < 5:
             for strength in all_strengths:
                 if strength not in strengths:
-                    strengths.add(strength)
+                    strengths[strength] = None
                     break
         
         top_strengths = list(strengths)[:5]
@@ -1,10 +1,19 @@
-import requests
+import asyncio
 import json
 import time
 from typing import Dict, Optional
 from datetime import datetime, timedelta
 from app.core.config import settings
 from app.schemas.astro import BirthDataRequest, AstroResponse, BirthChart, PlanetPosition
+from app.services.geo_service import parse_local_datetime
+from app.services.http_client import http_clients
+from app.services.provider_stats import ProviderStats
+from app.services.rate_limiter import rate_limits
+
+# Tokens this close to expiry are treated as expired on the request path
+TOKEN_SAFETY_WINDOW = timedelta(minutes=5)
+# Short-lived tokens are renewed at half their lifetime, but never more often than this
+TOKEN_MIN_REFRESH_INTERVAL = timedelta(seconds=30)
 
 class ProkeralaService:
     def __init__(self):
@@ -13,14 +22,81 @@ class ProkeralaService:
         self.base_url = settings.PROKERALA_API_URL
         self.access_token = None
         self.token_expires_at = None
+        self.token_fetched_at = None
+        # Single-flight token fetch shared by all concurrent callers
+        self._token_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.token_fetch_stats = ProviderStats("prokerala_oauth")
+        self.token_refreshes = {"background": 0, "request_path": 0, "probe": 0}
+        self.token_waiters_coalesced = 0
         
+    def is_configured(self) -> bool:
+        return bool(self.client_id) and self.client_id != "YOUR_PROKERALA_CLIENT_ID_HERE"
+    
+    async def probe(self) -> bool:
+        """
+        Background health probe for the circuit breaker: a fresh token fetch
+        proves the OAuth endpoint is reachable again
+        """
+        return await self._refresh_token("probe")
+    
+    async def start_token_refresh(self):
+        """Start the background task that renews the token before it enters the safety window"""
+        if self.is_configured() and settings.PROKERALA_TOKEN_REFRESH_ENABLED and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._token_refresh_loop())
+    
+    async def stop_token_refresh(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+    
+    async def _token_refresh_loop(self):
+        while True:
+            delay = self._seconds_until_refresh()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if not await self._refresh_token("background"):
+                await asyncio.sleep(settings.PROKERALA_TOKEN_RETRY_SECONDS)
+    
+    def _seconds_until_refresh(self) -> float:
+        """Renew a little before the safety window so request paths always find a valid token"""
+        if not self.access_token or not self.token_expires_at:
+            return 0.0
+        refresh_at = self.token_expires_at - TOKEN_SAFETY_WINDOW - timedelta(seconds=settings.PROKERALA_TOKEN_REFRESH_LEAD_SECONDS)
+        if self.token_fetched_at:
+            # A lifetime shorter than the safety window plus lead would otherwise put
+            # refresh_at in the past on every cycle and hammer the OAuth endpoint
+            lifetime = self.token_expires_at - self.token_fetched_at
+            refresh_at = max(refresh_at, self.token_fetched_at + max(TOKEN_MIN_REFRESH_INTERVAL, lifetime / 2))
+        return max(0.0, (refresh_at - datetime.now()).total_seconds())
+    
+    def token_stats(self) -> Dict:
+        stats = self.token_fetch_stats.to_dict()
+        expires_in = None
+        if self.token_expires_at:
+            expires_in = round((self.token_expires_at - datetime.now()).total_seconds(), 1)
+        return {
+            "fetches": stats["calls"],
+            "failures": stats["failures"],
+            "fetch_latency_p50_ms": stats["latency_p50_ms"],
+            "fetch_latency_p95_ms": stats["latency_p95_ms"],
+            "refreshes": dict(self.token_refreshes),
+            "waiters_coalesced": self.token_waiters_coalesced,
+            "expires_in_seconds": expires_in,
+            "background_refresh": self._refresh_task is not None
+        }
+    
     async def get_birth_chart(self, birth_data: BirthDataRequest) -> Optional[AstroResponse]:
         """
         Get birth chart data from Prokerala API with OAuth2 authentication
         """
         try:
             # Check if we have valid credentials
-            if not self.client_id or self.client_id == "YOUR_PROKERALA_CLIENT_ID_HERE":
+            if not self.is_configured():
                 print("Prokerala API credentials not configured")
                 return None
             
@@ -31,7 +107,7 @@ class ProkeralaService:
             
             # Prepare birth chart request
             payload = {
-                "datetime": f"{birth_data.birth_date}T{birth_data.birth_time}:00",
+                "datetime": parse_local_datetime(birth_data.birth_date, birth_data.birth_time).strftime("%Y-%m-%dT%H:%M:%S"),
                 "coordinates": f"{birth_data.latitude},{birth_data.longitude}",
                 "ayanamsa": 1  # Lahiri ayanamsa (most common)
             }
@@ -42,7 +118,8 @@ class ProkeralaService:
             }
             
             print(f"Making Prokerala API call to {self.base_url}/astrology/birth-details")
-            response = requests.post(
+            client = http_clients.get_client("prokerala")
+            response = await client.post(
                 f"{self.base_url}/astrology/birth-details", 
                 json=payload, 
                 headers=headers
@@ -50,6 +127,9 @@ class ProkeralaService:
             
             if response.status_code == 200:
                 return self._parse_prokerala_response(response.json(), birth_data)
+            elif response.status_code == 429:
+                rate_limits.get("prokerala").record_throttled(response.headers.get("Retry-After"))
+                return None
             else:
                 print(f"Prokerala API call failed with status {response.status_code}: {response.text}")
                 return None
@@ -64,16 +144,34 @@ class ProkeralaService:
         """
         # Check if current token is still valid
         if (self.access_token and self.token_expires_at and 
-            datetime.now() < self.token_expires_at - timedelta(minutes=5)):
+            datetime.now() < self.token_expires_at - TOKEN_SAFETY_WINDOW):
             return True
         
-        # Get new access token
-        return await self._get_access_token()
+        # Get new access token (normally the background task got there first)
+        return await self._refresh_token("request_path")
+    
+    async def _refresh_token(self, reason: str) -> bool:
+        """
+        Single-flight token fetch: the first caller starts it, everyone arriving
+        while it is in flight awaits the same result instead of POSTing again
+        """
+        if self._token_task is None or self._token_task.done():
+            # The token endpoint counts against the same quota as the chart API
+            if not rate_limits.get("prokerala").try_acquire():
+                return False
+            self.token_refreshes[reason] += 1
+            self._token_task = asyncio.create_task(self._get_access_token())
+        else:
+            self.token_waiters_coalesced += 1
+        # Shield so a cancelled caller does not cancel the fetch for the others
+        return await asyncio.shield(self._token_task)
     
     async def _get_access_token(self) -> bool:
         """
         Get OAuth2 access token from Prokerala
         """
+        start = time.perf_counter()
+        success = False
         try:
             token_url = f"{self.base_url}/token"
             
@@ -88,16 +186,22 @@ class ProkeralaService:
             }
             
             print("Requesting new Prokerala access token...")
-            response = requests.post(token_url, data=payload, headers=headers)
+            client = http_clients.get_client("prokerala")
+            response = await client.post(token_url, data=payload, headers=headers)
             
             if response.status_code == 200:
                 token_data = response.json()
                 self.access_token = token_data.get("access_token")
                 expires_in = token_data.get("expires_in", 3600)  # Default 1 hour
-                self.token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+                self.token_fetched_at = datetime.now()
+                self.token_expires_at = self.token_fetched_at + timedelta(seconds=expires_in)
                 
                 print(f"Successfully obtained Prokerala access token (expires in {expires_in}s)")
+                success = True
                 return True
+            elif response.status_code == 429:
+                rate_limits.get("prokerala").record_throttled(response.headers.get("Retry-After"))
+                return False
             else:
                 print(f"Failed to get Prokerala access token: {response.status_code} - {response.text}")
                 return False
@@ -105,6 +209,8 @@ class ProkeralaService:
         except Exception as e:
             print(f"Error getting Prokerala access token: {e}")
             return False
+        finally:
+            self.token_fetch_stats.record((time.perf_counter() - start) * 1000, success)
     
     def _parse_prokerala_response(self, response_data: Dict, birth_data: BirthDataRequest) -> AstroResponse:
         """
@@ -0,0 +1,65 @@
+from collections import deque
+from typing import Dict, Optional
+
+class ProviderStats:
+    """
+    Rolling latency window and outcome counters for one upstream provider
+    """
+
+    def __init__(self, name: str, window: int = 200):
+        self.name = name
+        self.latencies_ms = deque(maxlen=window)  # successful calls only
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.served = 0  # responses actually used for a request
+        self.races = 0   # hedged races this provider took part in
+        self.wins = 0    # hedged races this provider answered first
+
+    def record(self, latency_ms: float, success: bool):
+        self.calls += 1
+        if success:
+            self.successes += 1
+            self.latencies_ms.append(latency_ms)
+        else:
+            self.failures += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency percentile (ms) over the rolling window, or None with no samples"""
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def to_dict(self) -> Dict:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "served": self.served,
+            "races": self.races,
+            "wins": self.wins,
+            "win_rate": round(self.wins / self.races, 4) if self.races else None,
+            "latency_p50_ms": round(p50, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95, 1) if p95 is not None else None,
+            "samples": len(self.latencies_ms)
+        }
+
+class ProviderMetrics:
+    """Registry of per-provider statistics"""
+
+    def __init__(self):
+        self._providers: Dict[str, ProviderStats] = {}
+
+    def get(self, name: str) -> ProviderStats:
+        if name not in self._providers:
+            self._providers[name] = ProviderStats(name)
+        return self._providers[name]
+
+    def to_dict(self) -> Dict:
+        return {name: stats.to_dict() for name, stats in self._providers.items()}
+
+provider_metrics = ProviderMetrics()
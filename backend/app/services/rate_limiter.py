@@ -0,0 +1,128 @@
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from app.core.config import settings
+
+class UpstreamBudget:
+    """
+    Request budget for one quota-limited upstream: a token bucket refilled at
+    `rate_per_second` up to `burst` tokens, plus a daily cap that resets at UTC
+    midnight. A limit of 0 means unlimited.
+
+    Callers check the budget before every outbound call and route elsewhere when
+    it is spent, instead of sending a request that would come back as a 429.
+    A 429 that does get through pauses the upstream for its Retry-After.
+    """
+
+    def __init__(self, name: str, rate_per_second: float = 0.0, burst: float = 0.0, daily_limit: int = 0):
+        self.name = name
+        self.rate_per_second = rate_per_second
+        self.burst = max(burst, 1.0) if rate_per_second > 0 else 0.0
+        self.daily_limit = daily_limit
+        self.tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self.day = self._today()
+        self.daily_used = 0
+        self.throttled_until = 0.0
+        self.allowed = 0
+        self.rejected = {"rate": 0, "daily": 0, "throttled": 0}
+        self.throttled_responses = 0
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).date().isoformat()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self.rate_per_second > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self._refilled_at) * self.rate_per_second)
+        self._refilled_at = now
+        today = self._today()
+        if today != self.day:
+            self.day = today
+            self.daily_used = 0
+
+    def _blocked_by(self, cost: int) -> Optional[str]:
+        """Reason a request of `cost` calls would be rejected now, or None"""
+        if not settings.RATE_LIMIT_ENABLED:
+            return None
+        self._refresh()
+        if time.monotonic() < self.throttled_until:
+            return "throttled"
+        if self.daily_limit > 0 and self.daily_used + cost > self.daily_limit:
+            return "daily"
+        if self.rate_per_second > 0 and self.tokens < cost:
+            return "rate"
+        return None
+
+    def is_available(self, cost: int = 1) -> bool:
+        """Side-effect free check used for routing"""
+        return self._blocked_by(cost) is None
+
+    def try_acquire(self, cost: int = 1) -> bool:
+        """Spend `cost` calls of budget if available; never waits"""
+        reason = self._blocked_by(cost)
+        if reason is not None:
+            self.rejected[reason] += 1
+            print(f"{self.name} budget exhausted ({reason}), skipping upstream call")
+            return False
+        if self.rate_per_second > 0:
+            self.tokens -= cost
+        self.daily_used += cost
+        self.allowed += cost
+        return True
+
+    def record_throttled(self, retry_after: Optional[str] = None):
+        """The upstream answered 429: stop sending until Retry-After (or the default pause)"""
+        try:
+            pause = float(retry_after) if retry_after is not None else settings.RATE_LIMIT_THROTTLE_SECONDS
+        except ValueError:
+            pause = settings.RATE_LIMIT_THROTTLE_SECONDS
+        self.throttled_responses += 1
+        self.throttled_until = max(self.throttled_until, time.monotonic() + pause)
+        self.tokens = 0.0
+        print(f"{self.name} returned 429, pausing calls for {pause:.0f}s")
+
+    def to_dict(self) -> Dict:
+        self._refresh()
+        return {
+            "rate_per_second": self.rate_per_second or None,
+            "burst": self.burst or None,
+            "tokens_available": round(self.tokens, 2) if self.rate_per_second > 0 else None,
+            "daily_limit": self.daily_limit or None,
+            "daily_used": self.daily_used,
+            "daily_remaining": max(self.daily_limit - self.daily_used, 0) if self.daily_limit > 0 else None,
+            "throttled_for_seconds": round(max(self.throttled_until - time.monotonic(), 0.0), 1),
+            "allowed": self.allowed,
+            "rejected": dict(self.rejected),
+            "throttled_responses": self.throttled_responses
+        }
+
+class RateLimiterRegistry:
+    """Budgets for every quota-limited upstream, configured from settings"""
+
+    def __init__(self):
+        self._budgets: Dict[str, UpstreamBudget] = {}
+
+    def get(self, name: str) -> UpstreamBudget:
+        if name not in self._budgets:
+            self._budgets[name] = UpstreamBudget(name, *self._limits(name))
+        return self._budgets[name]
+
+    @staticmethod
+    def _limits(name: str):
+        limits = {
+            "astroapi": (settings.ASTRO_API_RATE_PER_SECOND, settings.ASTRO_API_BURST, settings.ASTRO_API_DAILY_LIMIT),
+            "prokerala": (settings.PROKERALA_RATE_PER_SECOND, settings.PROKERALA_BURST, settings.PROKERALA_DAILY_LIMIT),
+            "openai": (settings.OPENAI_RATE_PER_SECOND, settings.OPENAI_BURST, settings.OPENAI_DAILY_LIMIT),
+        }
+        # Anything else (e.g. the local ephemeris) is not quota-limited
+        return limits.get(name, (0.0, 0.0, 0))
+
+    def to_dict(self) -> Dict:
+        return {
+            "enabled": settings.RATE_LIMIT_ENABLED,
+            "upstreams": {name: self.get(name).to_dict() for name in ("astroapi", "prokerala", "openai")}
+        }
+
+rate_limits = RateLimiterRegistry()
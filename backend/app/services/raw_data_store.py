@@ -0,0 +1,149 @@
+import hashlib
+import json
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.schemas.astro import AstroResponse
+from app.services.persistence import persistent_store
+
+RAW_DATA_POLICIES = ("full", "trim", "drop", "ref")
+
+# Trimmed projections keep scalars only, down to this depth, with long strings cut
+TRIM_MAX_DEPTH = 4
+TRIM_MAX_STRING = 200
+
+def trim_payload(value: Any, depth: int = 0) -> Any:
+    """Scalar-only projection of a provider payload: nested dicts to TRIM_MAX_DEPTH, no lists"""
+    if isinstance(value, dict):
+        if depth >= TRIM_MAX_DEPTH:
+            return None
+        trimmed = {}
+        for key, item in value.items():
+            item = trim_payload(item, depth + 1)
+            if item is not None and item != {}:
+                trimmed[key] = item
+        return trimmed
+    if isinstance(value, str):
+        return value[:TRIM_MAX_STRING]
+    if isinstance(value, (int, float, bool)):
+        return value
+    return None
+
+class RawDataStore:
+    """
+    Applies RAW_DATA_POLICY to provider responses before they are cached,
+    persisted or returned:
+
+    - full: keep the upstream payload as is
+    - trim: keep a small scalar-only projection of it
+    - drop: keep nothing
+    - ref:  store it zlib-compressed under its SHA-256 and keep only a reference,
+            fetchable from /api/astro/raw/{ref}; payloads that cannot be stored are trimmed
+
+    Referenced payloads live in a byte-bounded in-memory LRU and, when
+    persistence is enabled, in the persistent store.
+    """
+
+    def __init__(self, max_memory_bytes: int = None):
+        self.max_memory_bytes = max_memory_bytes if max_memory_bytes is not None else settings.RAW_DATA_MEMORY_BYTES
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self.applied: Dict[str, int] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.stored = 0
+        self.unstorable = 0  # "ref" payloads served trimmed because they could not be stored
+        self.lookups = 0
+        self.lookup_misses = 0
+
+    @property
+    def policy(self) -> str:
+        policy = settings.RAW_DATA_POLICY.lower()
+        return policy if policy in RAW_DATA_POLICIES else "full"
+
+    async def apply(self, response: AstroResponse, provider: str) -> AstroResponse:
+        """Return the response with raw_data reduced according to the policy"""
+        raw_data = response.raw_data or {}
+        policy = self.policy
+        # Already a reference (e.g. a chart read back from the store)
+        if policy == "full" or "ref" in raw_data:
+            return response
+
+        original = json.dumps(raw_data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        slim = None
+        if policy == "ref":
+            slim = await self._store(original, provider)
+            if slim is None:
+                # Stored nowhere, so the reference could never be fetched
+                policy = "trim"
+        if policy == "trim":
+            slim = trim_payload(raw_data)
+        elif policy == "drop":
+            slim = {}
+
+        self.applied[policy] = self.applied.get(policy, 0) + 1
+        self.bytes_in += len(original)
+        self.bytes_out += len(json.dumps(slim, separators=(",", ":")))
+        return response.model_copy(update={"raw_data": slim})
+
+    async def _store(self, payload: bytes, provider: str) -> Optional[Dict]:
+        """The reference to a stored payload, or None if it fits neither in memory nor the persistent store"""
+        ref = hashlib.sha256(payload).hexdigest()
+        blob = zlib.compress(payload, 6)
+        if ref not in self._blobs:
+            remembered = self._remember(ref, blob)
+            if not await persistent_store.save_raw_payload(ref, provider, blob) and not remembered:
+                self.unstorable += 1
+                return None
+            self.stored += 1
+        return {
+            "provider": provider,
+            "ref": ref,
+            "size_bytes": len(payload),
+            "compressed_bytes": len(blob),
+            "url": f"/api/astro/raw/{ref}"
+        }
+
+    def _remember(self, ref: str, blob: bytes) -> bool:
+        """Keep a blob in the memory LRU; False if it is larger than the whole LRU"""
+        if len(blob) > self.max_memory_bytes:
+            return False
+        self._blobs[ref] = blob
+        self._blobs.move_to_end(ref)
+        self._memory_bytes += len(blob)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._blobs.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+        return True
+
+    async def get(self, ref: str) -> Optional[Dict]:
+        """The original raw payload for a reference, or None if unknown"""
+        self.lookups += 1
+        blob = self._blobs.get(ref)
+        if blob is not None:
+            self._blobs.move_to_end(ref)
+        else:
+            blob = await persistent_store.get_raw_payload(ref)
+            if blob is None:
+                self.lookup_misses += 1
+                return None
+            self._remember(ref, blob)
+        return json.loads(zlib.decompress(blob))
+
+    def stats(self) -> Dict:
+        return {
+            "policy": self.policy,
+            "applied": dict(self.applied),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "reduction": round(1 - self.bytes_out / self.bytes_in, 4) if self.bytes_in else 0.0,
+            "stored_payloads": self.stored,
+            "unstorable_payloads": self.unstorable,
+            "memory_payloads": len(self._blobs),
+            "memory_bytes": self._memory_bytes,
+            "lookups": self.lookups,
+            "lookup_misses": self.lookup_misses
+        }
+
+raw_data_store = RawDataStore()
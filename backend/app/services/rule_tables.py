@@ -0,0 +1,151 @@
+"""
+Compiled rule-based assessments.
+
+Every rule-based generator in `PersonalityEngine` depends only on a few sign
+placements. Each test gets a flat table indexed by the sign indices it reads, so
+a rule-based result is a list lookup instead of list scans, planet searches and
+model construction. Entries are filled on first use (or all at once by
+`precompute`) and hold frozen results shared by every assessment that uses them.
+Tables are tagged with a hash of the rule code and rebuilt when it changes.
+"""
+import hashlib
+import inspect
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pydantic import BaseModel, ConfigDict
+from app.schemas.astro import BirthChart, PlanetPosition
+from app.schemas.personality import PersonalityTestType
+from app.services.ephemeris import ZODIAC_SIGNS
+
+SIGN_INDEX = {sign: index for index, sign in enumerate(ZODIAC_SIGNS)}
+
+# Chart features, in feature-tuple order; planets fall back to the sun sign like the rules do
+FEATURES = ("sun", "moon", "rising", "mars", "venus", "mercury")
+_FEATURE_PLANETS = {"mars": "Mars", "venus": "Venus", "mercury": "Mercury"}
+
+# The features each test's rules read
+RULE_FEATURES: Dict[PersonalityTestType, Tuple[str, ...]] = {
+    PersonalityTestType.MBTI: ("sun", "moon", "rising"),
+    PersonalityTestType.BIG_FIVE: ("sun", "moon", "rising"),
+    PersonalityTestType.ENNEAGRAM: ("sun", "moon"),
+    PersonalityTestType.DISC: ("sun", "moon", "rising", "mars"),
+    PersonalityTestType.STRENGTHS_FINDER: ("sun", "moon", "rising"),
+    PersonalityTestType.LOVE_LANGUAGES: ("moon", "venus"),
+    PersonalityTestType.ATTACHMENT_STYLES: ("moon",),
+    PersonalityTestType.EMOTIONAL_INTELLIGENCE: ("sun", "moon", "rising"),
+    PersonalityTestType.CAREER_PERSONALITY: ("sun", "mercury")
+}
+
+_FROZEN_CLASSES: Dict[type, type] = {}
+
+def freeze(result: BaseModel) -> BaseModel:
+    """Immutable copy of a result (a frozen subclass, so it validates and serializes as the original)"""
+    cls = type(result)
+    frozen = _FROZEN_CLASSES.get(cls)
+    if frozen is None:
+        frozen = type(cls.__name__, (cls,), {"model_config": ConfigDict(cls.model_config, frozen=True)})
+        _FROZEN_CLASSES[cls] = frozen
+    return frozen.model_construct(**dict(result))
+
+def chart_features(chart: BirthChart) -> Optional[Tuple[int, ...]]:
+    """Sign index of each feature, or None if a placement is not a zodiac sign"""
+    signs = {"sun": chart.sun_sign, "moon": chart.moon_sign, "rising": chart.rising_sign}
+    planets = {}
+    for planet in chart.planets:
+        planets.setdefault(planet.name, planet.sign)  # the rules use the first match
+    for feature, planet in _FEATURE_PLANETS.items():
+        signs[feature] = planets.get(planet, chart.sun_sign)
+    try:
+        return tuple(SIGN_INDEX[signs[feature]] for feature in FEATURES)
+    except KeyError:
+        return None
+
+def synthetic_chart(features: Tuple[int, ...]) -> BirthChart:
+    """Smallest chart with the given feature signs, for evaluating the rules"""
+    signs = dict(zip(FEATURES, (ZODIAC_SIGNS[index] for index in features)))
+    return BirthChart(
+        sun_sign=signs["sun"],
+        moon_sign=signs["moon"],
+        rising_sign=signs["rising"],
+        planets=[PlanetPosition(name=planet, sign=signs[feature], degree=0.0, house=1)
+                 for feature, planet in _FEATURE_PLANETS.items()],
+        houses={},
+        aspects=[]
+    )
+
+def rules_version(functions: List[Callable]) -> str:
+    """Hash of the rule code; falls back to the bytecode when the source is unavailable"""
+    digest = hashlib.sha256()
+    for function in functions:
+        try:
+            digest.update(inspect.getsource(function).encode("utf-8"))
+        except (OSError, TypeError):
+            code = function.__code__
+            digest.update(code.co_code + repr(code.co_consts).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+class RuleTable:
+    """One lookup table per test, keyed by the sign indices of the test's features"""
+
+    def __init__(self, generators: Dict[PersonalityTestType, Callable[[BirthChart], Any]], version: str):
+        self.generators = generators
+        self.version = version
+        self._positions = {
+            test: [FEATURES.index(feature) for feature in features] for test, features in RULE_FEATURES.items()
+        }
+        self._tables: Dict[PersonalityTestType, List[Optional[BaseModel]]] = {
+            test: [None] * len(ZODIAC_SIGNS) ** len(features) for test, features in RULE_FEATURES.items()
+        }
+        self.hits = 0
+        self.misses = 0
+        self.uncompiled = 0  # charts with a placement that is not a zodiac sign
+
+    def key(self, test: PersonalityTestType, features: Tuple[int, ...]) -> int:
+        key = 0
+        for position in self._positions[test]:
+            key = key * len(ZODIAC_SIGNS) + features[position]
+        return key
+
+    def lookup(self, test: PersonalityTestType, chart: BirthChart,
+               features: Optional[Tuple[int, ...]] = None) -> BaseModel:
+        """Rule-based result for `chart`; pass `features` when looking up several tests"""
+        features = features or chart_features(chart)
+        if features is None:
+            self.uncompiled += 1
+            return self.generators[test](chart)
+        table, key = self._tables[test], self.key(test, features)
+        result = table[key]
+        if result is None:
+            self.misses += 1
+            result = table[key] = freeze(self.generators[test](chart))
+        else:
+            self.hits += 1
+        return result
+
+    def precompute(self):
+        """Fill every entry of every table"""
+        for test, positions in self._positions.items():
+            table = self._tables[test]
+            for key in range(len(table)):
+                if table[key] is None:
+                    features = [0] * len(FEATURES)
+                    rest = key
+                    for position in reversed(positions):
+                        rest, features[position] = divmod(rest, len(ZODIAC_SIGNS))
+                    table[key] = freeze(self.generators[test](synthetic_chart(tuple(features))))
+
+    def results(self, test: PersonalityTestType) -> List[BaseModel]:
+        """Every result of a test's table, in key order (fills the table first)"""
+        table = self._tables[test]
+        if any(result is None for result in table):
+            self.precompute()
+        return table
+
+    def stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "entries": sum(1 for table in self._tables.values() for result in table if result is not None),
+            "capacity": sum(len(table) for table in self._tables.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncompiled": self.uncompiled
+        }
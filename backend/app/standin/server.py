@@ -0,0 +1,401 @@
+"""
+Local stand-in for the paid upstreams, for load and fault-injection testing.
+
+Serves the request/response shapes the backend uses:
+
+- /openai/v1/chat/completions       OpenAI chat completions
+- /astroapi/birth-chart             AstroAPI.com birth chart
+- /prokerala/token                  Prokerala OAuth2 client-credentials token
+- /prokerala/astrology/birth-details
+
+Charts are real (computed with the local ephemeris); LLM answers are valid,
+schema-shaped JSON seeded from the prompt, so identical requests get identical
+answers. Every upstream has its own fault profile: log-normal latency, error
+rate, malformed-JSON rate and bursts of 429s. Randomness comes from a seeded
+generator per upstream, so a run is reproducible.
+
+Point the backend at it with:
+
+    ASTRO_API_URL=http://127.0.0.1:8100/astroapi
+    PROKERALA_API_URL=http://127.0.0.1:8100/prokerala
+    OPENAI_BASE_URL=http://127.0.0.1:8100/openai/v1
+
+and any non-empty ASTRO_API_KEY / PROKERALA_CLIENT_ID / PROKERALA_CLIENT_SECRET /
+OPENAI_API_KEY. Run it with `python -m app.standin.server --help`.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import typing
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from app.schemas.astro import BirthDataRequest
+from app.schemas.personality import (
+    AttachmentStyleResult, BigFiveResult, CareerPersonalityResult, CombinedAssessmentResult, DISCResult,
+    EmotionalIntelligenceResult, EnneagramResult, LoveLanguagesResult, MBTIResult, StrengthsFinderResult
+)
+from app.services import ephemeris
+from app.services.local_ephemeris_service import local_ephemeris_service
+
+UPSTREAMS = ("openai", "astroapi", "prokerala")
+
+# Result classes the chat-completions stand-in can answer with, picked by the JSON keys in the prompt
+RESULT_CLASSES = [
+    MBTIResult, BigFiveResult, EnneagramResult, DISCResult, StrengthsFinderResult, LoveLanguagesResult,
+    AttachmentStyleResult, EmotionalIntelligenceResult, CareerPersonalityResult, CombinedAssessmentResult
+]
+
+# Plausible values for string fields, so answers look like real assessments
+STRING_CHOICES = {
+    "type": ["INTJ", "INTP", "ENTJ", "ENTP", "INFJ", "INFP", "ENFJ", "ENFP",
+             "ISTJ", "ISFJ", "ESTJ", "ESFJ", "ISTP", "ISFP", "ESTP", "ESFP"],
+    "primary_style": ["Dominance", "Influence", "Steadiness", "Conscientiousness"],
+    "primary": ["Words of Affirmation", "Quality Time", "Receiving Gifts", "Acts of Service", "Physical Touch"],
+    "secondary": ["Words of Affirmation", "Quality Time", "Receiving Gifts", "Acts of Service", "Physical Touch"],
+    "style": ["Secure", "Anxious", "Avoidant", "Disorganized"],
+    "holland_code": ["RIA", "IAS", "ASE", "SEC", "ECR", "CRI"],
+    "primary_type": ["Realistic", "Investigative", "Artistic", "Social", "Enterprising", "Conventional"],
+}
+WORDS = ["insight", "drive", "empathy", "focus", "vision", "balance", "courage", "curiosity",
+         "patience", "harmony", "structure", "creativity", "loyalty", "intuition", "resilience"]
+
+class FaultProfile:
+    """
+    Fault injection settings for one upstream.
+
+    Latency is log-normal with the given median and p95 (equal values give a
+    fixed delay). Each request may start a burst of `throttle_burst` 429s
+    (probability `throttle_rate`), fail with a 500 (`error_rate`) or succeed
+    with a body that is not valid JSON (`malformed_rate`).
+    """
+
+    FIELDS = ("latency_ms", "latency_p95_ms", "error_rate", "malformed_rate",
+              "throttle_rate", "throttle_burst", "retry_after")
+
+    def __init__(self, latency_ms: float = 50.0, latency_p95_ms: float = 150.0, error_rate: float = 0.0,
+                 malformed_rate: float = 0.0, throttle_rate: float = 0.0, throttle_burst: int = 5,
+                 retry_after: float = 1.0):
+        self.latency_ms = latency_ms
+        self.latency_p95_ms = latency_p95_ms
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.throttle_rate = throttle_rate
+        self.throttle_burst = throttle_burst
+        self.retry_after = retry_after
+
+    def update(self, values: Dict):
+        for key, value in values.items():
+            if key not in self.FIELDS:
+                raise ValueError(f"Unknown fault setting '{key}'")
+            setattr(self, key, type(getattr(self, key))(value))
+
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+class FaultInjector:
+    """Per-upstream fault decisions from a seeded generator, plus outcome counters"""
+
+    def __init__(self, name: str, profile: FaultProfile, seed: int):
+        self.name = name
+        self.profile = profile
+        self.reset(seed)
+
+    def reset(self, seed: int):
+        # Mix the upstream name into the seed so upstreams get independent sequences
+        self.rng = random.Random(f"{seed}:{self.name}")
+        self.throttle_remaining = 0
+        self.outcomes = {"ok": 0, "error": 0, "malformed": 0, "throttled": 0}
+        self.latency_total_ms = 0.0
+
+    def latency_seconds(self) -> float:
+        median = max(self.profile.latency_ms, 0.0)
+        p95 = max(self.profile.latency_p95_ms, median)
+        if median <= 0:
+            return 0.0
+        sigma = math.log(p95 / median) / 1.645 if p95 > median else 0.0
+        latency_ms = self.rng.lognormvariate(math.log(median), sigma)
+        self.latency_total_ms += latency_ms
+        return latency_ms / 1000
+
+    def decide(self) -> str:
+        """Outcome for the next request: throttled, error, malformed or ok"""
+        if self.throttle_remaining == 0 and self.rng.random() < self.profile.throttle_rate:
+            self.throttle_remaining = max(self.profile.throttle_burst, 1)
+        if self.throttle_remaining > 0:
+            self.throttle_remaining -= 1
+            outcome = "throttled"
+        elif self.rng.random() < self.profile.error_rate:
+            outcome = "error"
+        elif self.rng.random() < self.profile.malformed_rate:
+            outcome = "malformed"
+        else:
+            outcome = "ok"
+        self.outcomes[outcome] += 1
+        return outcome
+
+    def stats(self) -> Dict:
+        requests = sum(self.outcomes.values())
+        return {
+            "profile": self.profile.to_dict(),
+            "requests": requests,
+            "outcomes": dict(self.outcomes),
+            "mean_latency_ms": round(self.latency_total_ms / requests, 1) if requests else None
+        }
+
+def _fault_response(injector: FaultInjector, outcome: str) -> Optional[Response]:
+    """The error response for a throttled or failed outcome, None otherwise"""
+    if outcome == "throttled":
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"message": "Rate limit exceeded (stand-in)", "type": "rate_limit_exceeded"}},
+            headers={"Retry-After": f"{injector.profile.retry_after:g}"}
+        )
+    if outcome == "error":
+        return JSONResponse(status_code=500, content={"error": {"message": "Internal error (stand-in)", "type": "server_error"}})
+    return None
+
+def _truncated(body: str) -> str:
+    return body[:max(len(body) // 2, 1)]
+
+def _sample_value(name: str, annotation, rng: random.Random):
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        return _sample_value(name, next(arg for arg in args if arg is not type(None)), rng)
+    if origin is list:
+        return [" ".join(rng.sample(WORDS, 2)).capitalize() for _ in range(5)]
+    if origin is dict:
+        keys = STRING_CHOICES["primary"] if name == "scores" else rng.sample(WORDS, 5)
+        return {key.capitalize() if key in WORDS else key: _sample_value(name, args[1], rng) for key in keys}
+    if isinstance(annotation, type) and hasattr(annotation, "model_fields"):
+        return _sample_result(annotation, rng)
+    if annotation is int:
+        return rng.randint(1, 9) if name in ("type", "wing") else rng.randint(1, 100)
+    if annotation is float:
+        return round(rng.uniform(0, 1), 2)
+    if name in STRING_CHOICES:
+        return rng.choice(STRING_CHOICES[name])
+    return " ".join(["Stand-in", name.replace("_", " ") + ":"] + rng.sample(WORDS, 6)) + "."
+
+def _sample_result(result_class, rng: random.Random) -> Dict:
+    result = {name: _sample_value(name, field.annotation, rng) for name, field in result_class.model_fields.items()}
+    # Keep answers inside the backend's plausibility checks, so only injected faults cause escalations
+    if result_class is EnneagramResult:
+        result["wing"] = (result["type"] + rng.choice((0, 7))) % 9 + 1
+    elif result_class is DISCResult:
+        cuts = sorted(rng.sample(range(1, 100), 3))
+        parts = [b - a for a, b in zip([0] + cuts, cuts + [100])]
+        result.update(zip(("dominance", "influence", "steadiness", "conscientiousness"), parts))
+    elif result_class is LoveLanguagesResult:
+        result["primary"], result["secondary"] = rng.sample(STRING_CHOICES["primary"], 2)
+    return result
+
+def _result_class_for(prompt: str, response_format: Optional[Dict]):
+    """The result class whose fields best match the JSON keys the prompt asks for"""
+    if response_format and response_format.get("type") == "json_schema":
+        properties = response_format.get("json_schema", {}).get("schema", {}).get("properties", {})
+        keys = set(properties)
+    else:
+        keys = set(re.findall(r'"(\w+)"\s*:', prompt))
+    # Best coverage of the class's fields; on a tie the larger class (the combined one contains all keys)
+    best = max(RESULT_CLASSES, key=lambda cls: (len(keys & set(cls.model_fields)) / len(cls.model_fields), len(cls.model_fields)))
+    return best if keys & set(best.model_fields) else None
+
+def _estimate_tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+def _prokerala_shape(chart) -> Dict:
+    """Prokerala birth-details body for a BirthChart"""
+    def sign(name: str) -> Dict:
+        return {"id": ephemeris.ZODIAC_SIGNS.index(name), "name": name}
+    return {
+        "status": "ok",
+        "data": {
+            "ascendant": {"sign": sign(chart.rising_sign)},
+            "planets": [{
+                "name": planet.name,
+                "sign": sign(planet.sign),
+                "longitude": round(ephemeris.ZODIAC_SIGNS.index(planet.sign) * 30 + planet.degree, 4),
+                "house": planet.house,
+                "is_retrograde": planet.retrograde
+            } for planet in chart.planets],
+            "houses": [{"id": int(number), "sign": sign(name)} for number, name in sorted(chart.houses.items(), key=lambda item: int(item[0]))],
+            "aspects": [{
+                "planet1": {"name": aspect["planet1"]},
+                "planet2": {"name": aspect["planet2"]},
+                "aspect_name": aspect["aspect"],
+                "orb": aspect["orb"]
+            } for aspect in chart.aspects]
+        }
+    }
+
+def _astroapi_shape(chart) -> Dict:
+    """AstroAPI.com birth-chart body for a BirthChart"""
+    return {
+        "sun_sign": chart.sun_sign,
+        "moon_sign": chart.moon_sign,
+        "ascendant": chart.rising_sign,
+        "planets": {
+            planet.name: {"sign": planet.sign, "degree": planet.degree, "house": planet.house, "retrograde": planet.retrograde}
+            for planet in chart.planets
+        },
+        "houses": chart.houses,
+        "aspects": [{"planet1": a["planet1"], "planet2": a["planet2"], "aspect": a["aspect"], "orb": a["orb"]} for a in chart.aspects]
+    }
+
+def create_app(profiles: Dict[str, FaultProfile], seed: int = 0) -> FastAPI:
+    app = FastAPI(title="The Oracle upstream stand-in")
+    injectors = {name: FaultInjector(name, profiles[name], seed) for name in UPSTREAMS}
+    tokens_issued = {"count": 0}
+
+    async def inject(name: str):
+        injector = injectors[name]
+        outcome = injector.decide()
+        await asyncio.sleep(injector.latency_seconds())
+        return outcome, _fault_response(injector, outcome)
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        outcome, fault = await inject("openai")
+        if fault:
+            return fault
+        prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        result_class = _result_class_for(prompt, body.get("response_format"))
+        content = json.dumps(_sample_result(result_class, rng)) if result_class else json.dumps({"answer": "stand-in"})
+        if outcome == "malformed":
+            # What a real model does wrong: a 200 with content that is not valid JSON
+            content = _truncated(content)
+        prompt_tokens, completion_tokens = _estimate_tokens(prompt), _estimate_tokens(content)
+        return {
+            "id": f"chatcmpl-standin-{injectors['openai'].rng.getrandbits(48):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stand-in"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}
+        }
+
+    @app.post("/astroapi/birth-chart")
+    async def astroapi_birth_chart(request: Request):
+        if not request.headers.get("X-API-Key"):
+            return JSONResponse(status_code=401, content={"error": "Missing X-API-Key"})
+        body = await request.json()
+        outcome, fault = await inject("astroapi")
+        if fault:
+            return fault
+        birth_data = BirthDataRequest(birth_place="", **body)
+        chart = local_ephemeris_service.compute_birth_chart(birth_data, "tropical").birth_chart
+        content = json.dumps(_astroapi_shape(chart))
+        return Response(_truncated(content) if outcome == "malformed" else content, media_type="application/json")
+
+    @app.post("/prokerala/token")
+    async def prokerala_token(request: Request):
+        # Parsed by hand: request.form() needs python-multipart, which the backend does not use
+        form = {key: values[0] for key, values in parse_qs((await request.body()).decode("utf-8")).items()}
+        if form.get("grant_type") != "client_credentials" or not form.get("client_id"):
+            return JSONResponse(status_code=400, content={"error": "invalid_request"})
+        outcome, fault = await inject("prokerala")
+        if fault:
+            return fault
+        tokens_issued["count"] += 1
+        content = json.dumps({"access_token": f"standin-{tokens_issued['count']}", "token_type": "Bearer", "expires_in": 3600})
+        return Response(_truncated(content) if outcome == "malformed" else content, media_type="application/json")
+
+    @app.post("/prokerala/astrology/birth-details")
+    async def prokerala_birth_details(request: Request):
+        if not request.headers.get("Authorization", "").startswith("Bearer standin-"):
+            return JSONResponse(status_code=401, content={"error": "invalid_token"})
+        body = await request.json()
+        outcome, fault = await inject("prokerala")
+        if fault:
+            return fault
+        # The backend sends local time without an offset; the stand-in treats it as UTC
+        birth_date, birth_time = body["datetime"].split("T")
+        latitude, longitude = (float(part) for part in body["coordinates"].split(","))
+        birth_data = BirthDataRequest(
+            name="", birth_date=birth_date, birth_time=birth_time[:5], birth_place="",
+            latitude=latitude, longitude=longitude, timezone="UTC"
+        )
+        zodiac = "sidereal" if body.get("ayanamsa") else "tropical"
+        chart = local_ephemeris_service.compute_birth_chart(birth_data, zodiac).birth_chart
+        content = json.dumps(_prokerala_shape(chart))
+        return Response(_truncated(content) if outcome == "malformed" else content, media_type="application/json")
+
+    @app.get("/_standin/stats")
+    async def standin_stats():
+        return {"seed": seed, "upstreams": {name: injector.stats() for name, injector in injectors.items()}}
+
+    @app.post("/_standin/config")
+    async def standin_config(request: Request):
+        """Change fault profiles at runtime: {"openai": {"error_rate": 0.2}, ...}"""
+        updates = await request.json()
+        try:
+            for name, values in updates.items():
+                if name not in injectors:
+                    raise ValueError(f"Unknown upstream '{name}'")
+                injectors[name].profile.update(values)
+        except (ValueError, TypeError) as e:
+            return JSONResponse(status_code=400, content={"detail": str(e)})
+        return {name: injector.profile.to_dict() for name, injector in injectors.items()}
+
+    @app.post("/_standin/reset")
+    async def standin_reset():
+        """Reseed every upstream and clear the counters, to replay a run exactly"""
+        for injector in injectors.values():
+            injector.reset(seed)
+        return {"seed": seed}
+
+    return app
+
+def _parse_overrides(values: List[str]) -> Dict[str, Dict[str, str]]:
+    """--profile openai:error_rate=0.1,latency_ms=800 -> {"openai": {...}}"""
+    overrides: Dict[str, Dict[str, str]] = {}
+    for value in values:
+        name, _, settings = value.partition(":")
+        if name not in UPSTREAMS:
+            raise ValueError(f"Unknown upstream '{name}' (expected one of {', '.join(UPSTREAMS)})")
+        for item in filter(None, settings.split(",")):
+            key, _, setting = item.partition("=")
+            overrides.setdefault(name, {})[key.strip()] = setting.strip()
+    return overrides
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the local OpenAI/AstroAPI/Prokerala stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--seed", type=int, default=0, help="seed for latency and fault decisions")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="median latency")
+    parser.add_argument("--latency-p95-ms", type=float, default=150.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of 200s with a body that is not valid JSON")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="chance per request of starting a burst of 429s")
+    parser.add_argument("--throttle-burst", type=int, default=5, help="429s per burst")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--profile", action="append", default=[], metavar="UPSTREAM:KEY=VALUE,...",
+                        help="per-upstream override, e.g. openai:latency_ms=2000,latency_p95_ms=8000")
+    args = parser.parse_args()
+
+    defaults = {
+        "latency_ms": args.latency_ms, "latency_p95_ms": args.latency_p95_ms, "error_rate": args.error_rate,
+        "malformed_rate": args.malformed_rate, "throttle_rate": args.throttle_rate,
+        "throttle_burst": args.throttle_burst, "retry_after": args.retry_after
+    }
+    profiles = {name: FaultProfile(**defaults) for name in UPSTREAMS}
+    for name, values in _parse_overrides(args.profile).items():
+        profiles[name].update(values)
+
+    import uvicorn
+    uvicorn.run(create_app(profiles, args.seed), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
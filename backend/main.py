@@ -1,16 +1,44 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import os
 from dotenv import load_dotenv
-from app.api import astro, personality, auth
+from app.api import astro, personality, auth, geo
+from app.services.circuit_breaker import circuit_breakers
+from app.services.http_client import http_clients
+from app.core.config import settings
+from app.services.llm_service import llm_service
+from app.services.persistence import persistent_store
+from app.services.personality_engine import personality_engine
+from app.services.prokerala_service import prokerala_service
 
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: open pooled upstream HTTP clients and the persistent store,
+    # and start the circuit breaker probes and the Prokerala token refresher
+    await http_clients.startup()
+    await persistent_store.initialize()
+    circuit_breakers.register_probe("prokerala", prokerala_service.probe)
+    await circuit_breakers.start()
+    await prokerala_service.start_token_refresh()
+    if settings.RULE_TABLE_PRECOMPUTE:
+        personality_engine.rule_table().precompute()
+    yield
+    # Shutdown: stop background work, close pooled connections and the database
+    await prokerala_service.stop_token_refresh()
+    await llm_service.shutdown()
+    await circuit_breakers.stop()
+    await http_clients.shutdown()
+    await persistent_store.close()
+
 app = FastAPI(
     title="The Oracle API",
     description="Personality evaluation API using astrological data",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -24,6 +52,7 @@ app.add_middleware(
 app.include_router(astro.router, prefix="/api/astro", tags=["astrology"])
 app.include_router(personality.router, prefix="/api/personality", tags=["personality"])
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
+app.include_router(geo.router, prefix="/api/geo", tags=["geo"])
 
 @app.get("/")
 async def root():
@@ -9,24 +9,46 @@ import { personalityApi } from './services/api';
 function App() {
   const [assessment, setAssessment] = useState<PersonalityAssessment | null>(null);
   const [loading, setLoading] = useState(false);
+  const [complete, setComplete] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [astroData, setAstroData] = useState<any>(null);
   const [showDialog, setShowDialog] = useState(false);
 
   const handleFormSubmit = async (birthData: BirthData) => {
     setLoading(true);
+    setComplete(false);
     setError(null);
 
     try {
-      // Instead of getting full assessment, just fetch astrological data
-      const result = await personalityApi.getFullAssessment(birthData);
-      
+      // Stream the assessment so each test renders as soon as it is ready
+      let current: PersonalityAssessment | null = null;
+      await personalityApi.streamFullAssessment(birthData, (event) => {
+        if (event.event === 'chart') {
+          current = {
+            user_id: '',
+            birth_data: event.birth_chart,
+            sources: {},
+            created_at: new Date().toISOString(),
+            confidence_score: 0,
+          };
+        } else if (event.event === 'result' && current) {
+          current = {
+            ...current,
+            [event.test_type]: event.result,
+            sources: { ...current.sources, [event.test_type]: event.source },
+          };
+        } else if (event.event === 'summary' && current) {
+          current = { ...current, user_id: event.user_id, confidence_score: event.confidence_score, sources: event.sources };
+          setComplete(true);
+        } else if (event.event === 'error') {
+          throw new Error(event.detail);
+        }
+        setAssessment(current);
+      });
+
       // For now, display the raw data in a dialog
-      setAstroData(result);
+      setAstroData(current);
       setShowDialog(true);
-      
-      // Still set assessment for the existing flow
-      setAssessment(result);
     } catch (err) {
       setError('Failed to fetch astrological data. Please check your birth data and try again.');
       console.error('Astro data error:', err);
@@ -37,6 +59,7 @@ function App() {
 
   const handleReset = () => {
     setAssessment(null);
+    setComplete(false);
     setError(null);
     setAstroData(null);
     setShowDialog(false);
@@ -79,7 +102,7 @@ function App() {
           </div>
         ) : (
           <div className="results-container">
-            <AssessmentResults assessment={assessment} />
+            <AssessmentResults assessment={assessment} complete={complete} />
             <div className="reset-container">
               <button onClick={handleReset} className="reset-button">
                 Get New Astrological Data
@@ -3,17 +3,28 @@ import { PersonalityAssessment } from '../types/personality';
 
 interface AssessmentResultsProps {
   assessment: PersonalityAssessment;
+  // False while results are still streaming in
+  complete?: boolean;
 }
 
-const AssessmentResults: React.FC<AssessmentResultsProps> = ({ assessment }) => {
+const TOTAL_TESTS = 9;
+
+const AssessmentResults: React.FC<AssessmentResultsProps> = ({ assessment, complete = true }) => {
+  const received = Object.keys(assessment.sources || {}).length;
   return (
     <div className="assessment-results">
       <div className="results-header">
         <h1>Your Personality Profile</h1>
         <p>Based on your astrological birth chart</p>
-        <div className="confidence-score">
-          Confidence Score: {Math.round(assessment.confidence_score * 100)}%
-        </div>
+        {complete ? (
+          <div className="confidence-score">
+            Confidence Score: {Math.round(assessment.confidence_score * 100)}%
+          </div>
+        ) : (
+          <div className="confidence-score">
+            Analyzing your chart... {received} of {TOTAL_TESTS} assessments ready
+          </div>
+        )}
       </div>
 
       {/* MBTI Results */}
@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import { BirthData } from '../types/astro';
+import { geoApi } from '../services/api';
 
 interface BirthDataFormProps {
   onSubmit: (data: BirthData) => void;
@@ -35,84 +36,6 @@ const BirthDataForm: React.FC<BirthDataFormProps> = ({ onSubmit, loading }) => {
     console.log(`Selected suggestion: ${suggestion.name}`);
   };
 
-  // Function to get timezone from coordinates
-  const getTimezoneForCoords = async (lat: number, lng: number): Promise<string> => {
-    try {
-      // Using WorldTimeAPI (completely free, no API key required)
-      const response = await fetch(
-        `https://worldtimeapi.org/api/timezone`
-      );
-      
-      if (response.ok) {
-        const timezones = await response.json();
-        // Use a simple geographic approximation to find closest timezone
-        return estimateTimezoneFromCoords(lat, lng, timezones);
-      }
-    } catch (error) {
-      console.log('WorldTimeAPI failed, using geographic estimation...');
-    }
-    
-    // Fallback: Geographic timezone estimation
-    return estimateTimezoneFromCoords(lat, lng);
-  };
-
-  // Function to estimate timezone based on coordinates
-  const estimateTimezoneFromCoords = (lat: number, lng: number, availableTimezones?: string[]): string => {
-    // Specific city mappings for better accuracy
-    const cityTimezones = [
-      { name: 'Mumbai', lat: 19.0760, lng: 72.8777, timezone: 'Asia/Kolkata' },
-      { name: 'Delhi', lat: 28.7041, lng: 77.1025, timezone: 'Asia/Kolkata' },
-      { name: 'Bangkok', lat: 13.7563, lng: 100.5018, timezone: 'Asia/Bangkok' },
-      { name: 'Singapore', lat: 1.3521, lng: 103.8198, timezone: 'Asia/Singapore' },
-      { name: 'Hong Kong', lat: 22.3193, lng: 114.1694, timezone: 'Asia/Hong_Kong' },
-      { name: 'Beijing', lat: 39.9042, lng: 116.4074, timezone: 'Asia/Shanghai' },
-      { name: 'Shanghai', lat: 31.2304, lng: 121.4737, timezone: 'Asia/Shanghai' },
-      { name: 'Jakarta', lat: -6.2088, lng: 106.8456, timezone: 'Asia/Jakarta' },
-      { name: 'Manila', lat: 14.5995, lng: 120.9842, timezone: 'Asia/Manila' },
-      { name: 'Karachi', lat: 24.8607, lng: 67.0011, timezone: 'Asia/Karachi' },
-      { name: 'Dubai', lat: 25.2048, lng: 55.2708, timezone: 'Asia/Dubai' },
-      { name: 'Istanbul', lat: 41.0082, lng: 28.9784, timezone: 'Europe/Istanbul' },
-      { name: 'Cairo', lat: 30.0444, lng: 31.2357, timezone: 'Africa/Cairo' },
-      { name: 'Lagos', lat: 6.5244, lng: 3.3792, timezone: 'Africa/Lagos' },
-      { name: 'Mexico City', lat: 19.4326, lng: -99.1332, timezone: 'America/Mexico_City' },
-      { name: 'São Paulo', lat: -23.5505, lng: -46.6333, timezone: 'America/Sao_Paulo' },
-      { name: 'Buenos Aires', lat: -34.6037, lng: -58.3816, timezone: 'America/Argentina/Buenos_Aires' }
-    ];
-    
-    // Find closest city match (within 2 degrees)
-    for (const city of cityTimezones) {
-      const latDiff = Math.abs(lat - city.lat);
-      const lngDiff = Math.abs(lng - city.lng);
-      if (latDiff < 2 && lngDiff < 2) {
-        console.log(`Matched timezone for nearby city: ${city.name} -> ${city.timezone}`);
-        return city.timezone;
-      }
-    }
-    
-    // Fallback to geographic regions
-    if (lng >= -180 && lng < -157.5) return 'Pacific/Honolulu';
-    if (lng >= -157.5 && lng < -135) return 'America/Anchorage';
-    if (lng >= -135 && lng < -120) return 'America/Los_Angeles';
-    if (lng >= -120 && lng < -105) return 'America/Denver';
-    if (lng >= -105 && lng < -90) return 'America/Chicago';
-    if (lng >= -90 && lng < -75) return 'America/New_York';
-    if (lng >= -75 && lng < -60) return 'America/Halifax';
-    if (lng >= -60 && lng < -45) return 'America/Sao_Paulo';
-    if (lng >= -45 && lng < -15) return 'Atlantic/Azores';
-    if (lng >= -15 && lng < 15) return 'Europe/London';
-    if (lng >= 15 && lng < 30) return 'Europe/Paris';
-    if (lng >= 30 && lng < 45) return 'Europe/Moscow';
-    if (lng >= 45 && lng < 75) return 'Asia/Dubai';
-    if (lng >= 75 && lng < 90) return 'Asia/Kolkata';
-    if (lng >= 90 && lng < 105) return 'Asia/Bangkok';
-    if (lng >= 105 && lng < 120) return 'Asia/Shanghai';
-    if (lng >= 120 && lng < 135) return 'Asia/Tokyo';
-    if (lng >= 135 && lng < 150) return 'Pacific/Sydney';
-    if (lng >= 150 && lng <= 180) return 'Pacific/Auckland';
-    
-    return 'UTC'; // Default fallback
-  };
-
   const handleSubmit = (e: React.FormEvent) => {
     e.preventDefault();
     onSubmit(formData);
@@ -241,44 +164,26 @@ const BirthDataForm: React.FC<BirthDataFormProps> = ({ onSubmit, loading }) => {
       }
     }
     
-    // If we have fewer than 5 suggestions, try geocoding service for more
+    // If we have fewer than 5 suggestions, ask the backend's offline gazetteer for more
     if (allSuggestions.length < 5) {
-      console.log('Adding geocoding suggestions...');
+      console.log('Adding gazetteer suggestions...');
       try {
-        const encodedPlace = encodeURIComponent(place);
-        const geocodeUrl = `https://nominatim.openstreetmap.org/search?format=json&limit=5&q=${encodedPlace}`;
-        
-        const response = await fetch(geocodeUrl, {
-          headers: {
-            'User-Agent': 'The Oracle Personality App'
-          }
-        });
-        
-        const data = await response.json();
-        
-        if (data && data.length > 0) {
-          for (const result of data) {
-            const lat = parseFloat(result.lat);
-            const lng = parseFloat(result.lon);
-            const displayName = result.display_name.split(',').slice(0, 2).join(', ');
-            
-            // Get timezone for the coordinates
-            const timezone = await getTimezoneForCoords(lat, lng);
-            
-            allSuggestions.push({
-              name: displayName,
-              lat: lat,
-              lng: lng,
-              timezone: timezone
-            });
-            
-            // Limit to 5 total suggestions
-            if (allSuggestions.length >= 5) break;
-          }
-          console.log(`Geocoding found ${data.length} suggestions`);
+        const places = await geoApi.searchPlaces(place, 5);
+        for (const result of places) {
+          if (allSuggestions.some(s => s.name.toLowerCase() === result.label.toLowerCase())) continue;
+          allSuggestions.push({
+            name: result.label,
+            lat: result.latitude,
+            lng: result.longitude,
+            timezone: result.timezone
+          });
+          
+          // Limit to 5 total suggestions
+          if (allSuggestions.length >= 5) break;
         }
+        console.log(`Gazetteer found ${places.length} suggestions`);
       } catch (error) {
-        console.error('Geocoding error:', error);
+        console.error('Place search error:', error);
       }
     }
 
@@ -1,6 +1,6 @@
 import axios from 'axios';
 import { BirthData } from '../types/astro';
-import { PersonalityAssessment, PersonalityTestType } from '../types/personality';
+import { AssessmentStreamEvent, PersonalityAssessment, PersonalityTestType } from '../types/personality';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
 
@@ -18,12 +18,58 @@ export const astroApi = {
   },
 };
 
+export interface Place {
+  name: string;
+  label: string;
+  country_code: string;
+  country: string;
+  admin1: string;
+  latitude: number;
+  longitude: number;
+  timezone: string;
+  population: number;
+}
+
+export const geoApi = {
+  searchPlaces: async (query: string, limit: number = 5): Promise<Place[]> => {
+    const response = await api.get('/api/geo/search', { params: { q: query, limit } });
+    return response.data.results;
+  },
+};
+
 export const personalityApi = {
   getFullAssessment: async (birthData: BirthData): Promise<PersonalityAssessment> => {
     const response = await api.post('/api/personality/full-assessment', birthData);
     return response.data;
   },
 
+  // Calls onEvent for the chart, each test result as it completes, and the final summary
+  streamFullAssessment: async (birthData: BirthData, onEvent: (event: AssessmentStreamEvent) => void): Promise<void> => {
+    const response = await fetch(`${API_BASE_URL}/api/personality/full-assessment/stream?format=ndjson`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(birthData),
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Assessment stream failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffered += decoder.decode(value, { stream: true });
+      const lines = buffered.split('\n');
+      buffered = lines.pop() || '';
+      lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)));
+    }
+    if (buffered.trim()) {
+      onEvent(JSON.parse(buffered));
+    }
+  },
+
   getSingleAssessment: async (testType: PersonalityTestType, birthData: BirthData) => {
     const response = await api.post(`/api/personality/assessment/${testType}`, birthData);
     return response.data;
@@ -80,10 +80,20 @@ export interface PersonalityAssessment {
   attachment_styles?: AttachmentStyleResult;
   emotional_intelligence?: EmotionalIntelligenceResult;
   career_personality?: CareerPersonalityResult;
+  sources?: Record<string, AssessmentSource>;
   created_at: string;
   confidence_score: number;
 }
 
+export type AssessmentSource = 'llm' | 'rule_based';
+
+// Events of /api/personality/full-assessment/stream (NDJSON); elapsed_ms is time since the request started
+export type AssessmentStreamEvent =
+  | { event: 'chart'; elapsed_ms: number; birth_chart: Record<string, any> }
+  | { event: 'result'; elapsed_ms: number; test_type: PersonalityTestType; source: AssessmentSource; result: any }
+  | { event: 'summary'; elapsed_ms: number; user_id: string; confidence_score: number; sources: Record<string, AssessmentSource> }
+  | { event: 'error'; elapsed_ms: number; detail: string };
+
 export type PersonalityTestType = 
   | 'mbti'
   | 'big_five'